@@ -19,7 +19,7 @@ import numpy as np
 from betting_simulation.charts.base import (
     ChartGenerator, ChartConfig, format_currency, format_percentage
 )
-from betting_simulation.models import SimulationResult, TicketType
+from betting_simulation.models import BetLog, SimulationResult, TicketType
 
 
 class ProfitChartGenerator(ChartGenerator):
@@ -66,17 +66,13 @@ class ProfitChartGenerator(ChartGenerator):
         fig, ax = self._create_figure()
         
         # 累積ROIを計算
-        total_bet = 0
-        total_return = 0
-        rois = []
+        bets = BetLog.coerce(result.bet_history)
+        total_bet = np.cumsum(bets.column("amount"))
+        total_return = np.cumsum(bets.column("payout"))
+        rois = np.zeros(len(bets))
+        np.divide(total_return * 100, total_bet, out=rois, where=total_bet > 0)
         
-        for record in result.bet_history:
-            total_bet += record.ticket.amount
-            total_return += record.payout
-            roi = (total_return / total_bet * 100) if total_bet > 0 else 0
-            rois.append(roi)
-        
-        if not rois:
+        if len(rois) == 0:
             ax.text(0.5, 0.5, "データなし", transform=ax.transAxes, ha="center", va="center")
             return fig
         
@@ -90,10 +86,10 @@ class ProfitChartGenerator(ChartGenerator):
         
         # 利益/損失ゾーンの塗りつぶし
         ax.fill_between(x, rois, 100,
-                        where=[r >= 100 for r in rois],
+                        where=rois >= 100,
                         color=self.profit_color, alpha=0.3)
         ax.fill_between(x, rois, 100,
-                        where=[r < 100 for r in rois],
+                        where=rois < 100,
                         color=self.loss_color, alpha=0.3)
         
         # 最終ROI表示
@@ -118,18 +114,10 @@ class ProfitChartGenerator(ChartGenerator):
         fig, ax = self._create_figure()
         
         # 累積的中率を計算
-        total_bets = 0
-        total_hits = 0
-        hit_rates = []
-        
-        for record in result.bet_history:
-            total_bets += 1
-            if record.is_hit:
-                total_hits += 1
-            hit_rate = (total_hits / total_bets * 100) if total_bets > 0 else 0
-            hit_rates.append(hit_rate)
+        hits = BetLog.coerce(result.bet_history).column("is_hit")
+        hit_rates = np.cumsum(hits) * 100 / np.arange(1, len(hits) + 1)
         
-        if not hit_rates:
+        if len(hit_rates) == 0:
             ax.text(0.5, 0.5, "データなし", transform=ax.transAxes, ha="center", va="center")
             return fig
         
@@ -16,7 +16,15 @@ import numpy as np
 from betting_simulation.charts.base import (
     ChartGenerator, ChartConfig, format_currency, format_percentage
 )
-from betting_simulation.models import SimulationResult
+from betting_simulation.models import BetLog, SimulationResult
+
+
+def _bet_returns(result: SimulationResult) -> np.ndarray:
+    """賭け金が正の賭けの個別リターン（倍率）を取得"""
+    bets = BetLog.coerce(result.bet_history)
+    amounts = bets.column("amount")
+    mask = amounts > 0
+    return (bets.column("payout")[mask] - amounts[mask]) / amounts[mask]
 
 
 class RiskChartGenerator(ChartGenerator):
@@ -265,13 +273,9 @@ class RiskChartGenerator(ChartGenerator):
         fig, ax = self._create_figure()
         
         # 個別リターンを計算
-        returns = []
-        for record in result.bet_history:
-            if record.ticket.amount > 0:
-                ret = (record.payout - record.ticket.amount) / record.ticket.amount * 100
-                returns.append(ret)
+        returns = _bet_returns(result) * 100
         
-        if not returns:
+        if len(returns) == 0:
             ax.text(0.5, 0.5, "データなし", transform=ax.transAxes, ha="center", va="center")
             return fig
         
@@ -289,7 +293,7 @@ class RiskChartGenerator(ChartGenerator):
                 patch.set_facecolor(self.loss_color)
         
         # 期待損失 (CVaR / Expected Shortfall)
-        cvar = np.mean([r for r in returns if r <= var_95])
+        cvar = np.mean(returns[returns <= var_95])
         ax.axvline(x=cvar, color=self._get_color(5), linestyle="--", linewidth=1.5,
                    label=f"CVaR: {cvar:.2f}%")
         
@@ -307,11 +311,7 @@ class RiskChartGenerator(ChartGenerator):
         fig, ax = self._create_figure()
         
         # リターンを計算
-        returns = []
-        for record in result.bet_history:
-            if record.ticket.amount > 0:
-                ret = (record.payout - record.ticket.amount) / record.ticket.amount
-                returns.append(ret)
+        returns = _bet_returns(result)
         
         if len(returns) < window:
             ax.text(0.5, 0.5, f"データ不足 (最低{window}件必要)", 
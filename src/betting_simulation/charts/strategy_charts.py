@@ -15,7 +15,10 @@ import numpy as np
 from betting_simulation.charts.base import (
     ChartGenerator, ChartConfig, format_currency, format_percentage
 )
-from betting_simulation.models import SimulationResult
+from betting_simulation.models import PnLMatrix, SimulationResult
+
+# 相関ヒートマップのセルに値を表示する戦略数の上限
+_MAX_ANNOTATED_STRATEGIES = 20
 
 
 class StrategyChartGenerator(ChartGenerator):
@@ -300,19 +303,59 @@ class StrategyChartGenerator(ChartGenerator):
         return fig
     
     def _generate_correlation(self, result: SimulationResult, results: list | None = None,
-                              strategy_names: list | None = None, **kwargs) -> plt.Figure:
-        """戦略相関ヒートマップ"""
+                              strategy_names: list | None = None,
+                              pnl_matrix: PnLMatrix | None = None, **kwargs) -> plt.Figure:
+        """戦略相関ヒートマップ
+        
+        pnl_matrix（StrategyComparator.pnl_matrix）を指定した場合は、レースで揃えた
+        損益の相関を使う（戦略名も pnl_matrix のものを使う）。
+        """
         fig, ax = self._create_figure(figsize=(10, 8))
         
-        if not results or len(results) < 2:
+        if pnl_matrix is not None and len(pnl_matrix.names) >= 2:
+            strategy_names = pnl_matrix.names
+            corr_matrix = pnl_matrix.correlation()
+        elif pnl_matrix is None and results and len(results) >= 2:
+            corr_matrix = self._fund_return_correlation(results)
+        else:
             ax.text(0.5, 0.5, "比較には2つ以上の戦略が必要", 
                     transform=ax.transAxes, ha="center", va="center", fontsize=14)
             return fig
         
+        n = len(corr_matrix)
         if not strategy_names:
-            strategy_names = [f"戦略{i+1}" for i in range(len(results))]
+            strategy_names = [f"戦略{i+1}" for i in range(n)]
+        
+        # ヒートマップ
+        im = ax.imshow(corr_matrix, cmap="RdYlGn", vmin=-1, vmax=1, aspect="auto")
+        
+        # カラーバー
+        cbar = plt.colorbar(im, ax=ax)
+        cbar.set_label("相関係数", fontsize=12)
         
-        # 各戦略のリターン系列を取得
+        # ラベル
+        ax.set_xticks(range(n))
+        ax.set_yticks(range(n))
+        ax.set_xticklabels(strategy_names, rotation=45, ha="right")
+        ax.set_yticklabels(strategy_names)
+        
+        # 値をセルに表示（戦略が多い場合は省略）
+        if n <= _MAX_ANNOTATED_STRATEGIES:
+            for i in range(n):
+                for j in range(n):
+                    value = corr_matrix[i][j]
+                    color = "white" if abs(value) > 0.5 else "black"
+                    ax.text(j, i, f"{value:.2f}", ha="center", va="center", 
+                            fontsize=10, color=color, fontweight="bold")
+        
+        self._apply_common_style(ax, title="戦略間相関ヒートマップ", xlabel="", ylabel="")
+        
+        plt.tight_layout()
+        return fig
+    
+    @staticmethod
+    def _fund_return_correlation(results: list) -> np.ndarray:
+        """資金推移のリターン系列（短い方の長さに揃える）の相関行列"""
         return_series = []
         min_len = min(len(r.fund_history) for r in results)
         
@@ -326,7 +369,6 @@ class StrategyChartGenerator(ChartGenerator):
                 returns.append(ret)
             return_series.append(returns)
         
-        # 相関行列を計算
         n = len(results)
         corr_matrix = np.zeros((n, n))
         
@@ -341,31 +383,7 @@ class StrategyChartGenerator(ChartGenerator):
                     else:
                         corr_matrix[i][j] = 0
         
-        # ヒートマップ
-        im = ax.imshow(corr_matrix, cmap="RdYlGn", vmin=-1, vmax=1, aspect="auto")
-        
-        # カラーバー
-        cbar = plt.colorbar(im, ax=ax)
-        cbar.set_label("相関係数", fontsize=12)
-        
-        # ラベル
-        ax.set_xticks(range(n))
-        ax.set_yticks(range(n))
-        ax.set_xticklabels(strategy_names, rotation=45, ha="right")
-        ax.set_yticklabels(strategy_names)
-        
-        # 値をセルに表示
-        for i in range(n):
-            for j in range(n):
-                value = corr_matrix[i][j]
-                color = "white" if abs(value) > 0.5 else "black"
-                ax.text(j, i, f"{value:.2f}", ha="center", va="center", 
-                        fontsize=10, color=color, fontweight="bold")
-        
-        self._apply_common_style(ax, title="戦略間相関ヒートマップ", xlabel="", ylabel="")
-        
-        plt.tight_layout()
-        return fig
+        return corr_matrix
     
     def generate_all(self, result: SimulationResult, results: list | None = None, 
                      output_dir: str = "charts") -> list[str]:
@@ -12,9 +12,25 @@ from betting_simulation.config import ConfigLoader, SimulationConfig
 from betting_simulation.data_loader import DataLoader
 from betting_simulation.evaluator import BetEvaluator
 from betting_simulation.fund_manager import FundManagerFactory
+from betting_simulation.halving import HALVING_OBJECTIVES, SuccessiveHalving
+from betting_simulation.planner import ExecutionPlanner, make_unique_names
+from betting_simulation.portfolio import (
+    PORTFOLIO_METHODS,
+    PORTFOLIO_OBJECTIVES,
+    PortfolioOptimizer,
+    build_returns_matrix,
+)
 from betting_simulation.race_filter import RaceFilter
 from betting_simulation.simulation_engine import SimulationEngine, StrategyComparator
 from betting_simulation.strategy import StrategyFactory
+from betting_simulation.sweep import (
+    SWEEP_METRICS,
+    run_sweep,
+    run_threshold_sweep,
+    sort_rows,
+    sweep_row,
+)
+from betting_simulation.ticket_cache import TicketCache, set_default_cache
 
 # ロギング設定
 logging.basicConfig(
@@ -27,9 +43,16 @@ logger = logging.getLogger(__name__)
 
 @click.group()
 @click.version_option(version=__version__)
-def main() -> None:
+@click.option(
+    "--ticket-cache",
+    type=click.Path(file_okay=False),
+    envvar="BETTING_SIM_TICKET_CACHE",
+    help="馬券キャッシュのディレクトリ（資金管理・初期資金だけを変えた再実行で馬券生成を省略）"
+)
+def main(ticket_cache: str | None) -> None:
     """競馬賭けシミュレーションシステム"""
-    pass
+    if ticket_cache:
+        set_default_cache(TicketCache(directory=ticket_cache))
 
 
 @main.command()
@@ -80,10 +103,11 @@ def run(config_path: str, monte_carlo: bool, output: str | None, quiet: bool) ->
             config.fund_constraints
         )
         evaluator = BetEvaluator()
-        engine = SimulationEngine(strategy, fund_manager, evaluator)
+        engine = SimulationEngine(strategy, fund_manager, evaluator, config.settlement)
         
         click.echo(f"Strategy: {config.strategy_name}")
         click.echo(f"Fund Manager: {config.fund_manager_name}")
+        click.echo(f"Settlement: {config.settlement}")
         click.echo(f"Initial Fund: {config.initial_fund:,}円")
         
         if monte_carlo:
@@ -217,6 +241,12 @@ def init_config(output_path: str) -> None:
     default=50,
     help="Walk-Forwardのステップサイズ（デフォルト: 50）"
 )
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="並列実行するプロセス数（デフォルト: 1）"
+)
 def compare(
     config_paths: tuple,
     output: str | None,
@@ -224,7 +254,8 @@ def compare(
     sort_by: str,
     walk_forward: bool,
     window_size: int,
-    step_size: int
+    step_size: int,
+    jobs: int
 ) -> None:
     """複数の戦略を比較
     
@@ -244,38 +275,34 @@ def compare(
             configs.append(config)
             click.echo(f"Loaded: {path} (strategy: {config.strategy_name})")
         
-        # 共通のデータを読み込み（最初の設定のdata_pathを使用）
-        base_config = configs[0]
-        click.echo(f"\nLoading data from: {base_config.data_path}")
-        loader = DataLoader()
-        races = loader.load(base_config.data_path)
-        click.echo(f"Loaded {len(races)} races")
-        
-        # レースフィルタリング
-        filter_instance = RaceFilter(base_config.filter_condition)
-        filtered_races = filter_instance.filter(races)
-        click.echo(f"Filtered to {len(filtered_races)} races")
+        # 実行計画（データセット・戦略ごとに共通の処理を1回だけ実行）
+        planner = ExecutionPlanner()
+        plan = planner.plan(configs)
+        num_runs = sum(len(dataset.strategies) for dataset in plan)
+        click.echo(
+            f"\nPlan: {len(plan)} dataset(s), {num_runs} strategy run(s) "
+            f"for {len(configs)} configs"
+        )
         
-        if not filtered_races:
+        datasets = planner.load_datasets(plan)
+        for dataset in plan:
+            click.echo(f"  {dataset.data_path}: {len(datasets[dataset.key])} races after filter")
+        if not any(datasets.values()):
             click.echo("Error: No races match the filter criteria", err=True)
             sys.exit(1)
         
         # 戦略比較を実行
         click.echo("\nComparing strategies...")
         comparator = StrategyComparator()
+        run_results = planner.execute(configs, workers=jobs, datasets=datasets)
         
-        # 戦略リストを作成
-        strategies = []
-        for config in configs:
-            strategy = StrategyFactory.create(config.strategy_name, config.strategy_params)
-            fund_manager = FundManagerFactory.create(config.fund_manager_name, config.fund_manager_params)
-            strategies.append((config.strategy_name, strategy, fund_manager))
-        
-        results = comparator.compare(
-            filtered_races,
-            strategies,
-            base_config.initial_fund
-        )
+        # 表示名（戦略名が重複する場合は設定ファイル名で区別）
+        names = [config.strategy_name for config in configs]
+        names = [
+            Path(path).stem if names.count(name) > 1 else name
+            for name, path in zip(names, config_paths)
+        ]
+        results = dict(zip(make_unique_names(names), run_results))
         
         # 結果をソート
         sort_key_map = {
@@ -417,6 +444,397 @@ def _save_comparison_csv(sorted_results: list, output_path: str) -> None:
     click.echo(f"Comparison result saved to: {output_path}")
 
 
+@main.command("sweep")
+@click.argument("config_path", type=click.Path(exists=True))
+@click.option(
+    "--output", "-o",
+    type=click.Path(),
+    help="結果表を保存するCSVファイルパス（デフォルト: <output_dir>/sweep_<設定名>.csv）"
+)
+@click.option(
+    "--sort-by", "-s",
+    type=click.Choice(list(SWEEP_METRICS.keys())),
+    default="roi",
+    help="ソート基準（デフォルト: roi）"
+)
+@click.option(
+    "--top", "-t",
+    type=click.IntRange(min=1),
+    default=20,
+    help="表示する上位の件数（デフォルト: 20）"
+)
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="並列実行するプロセス数（デフォルト: 1）"
+)
+@click.option(
+    "--mode", "-m",
+    type=click.Choice(["replay", "threshold"]),
+    default="replay",
+    help="replay: 全組み合わせを実行 / threshold: 閾値パラメータを累積和で一括集計（デフォルト: replay）"
+)
+def sweep(
+    config_path: str,
+    output: str | None,
+    sort_by: str,
+    top: int,
+    jobs: int,
+    mode: str
+) -> None:
+    """パラメータスイープを実行
+    
+    CONFIG_PATH: スイープ指定を含む設定ファイル（YAML）のパス
+    
+    戦略・資金管理・フィルターの各項目にリストまたは範囲を指定すると全組み合わせを実行する。
+    
+    \b
+    例:
+      strategy_params:
+        top_n: [1, 2, 3]
+      fund_manager_params:
+        bet_percentage: {start: 0.01, stop: 0.05, step: 0.01}
+    
+    threshold モードは min_odds / max_odds（favorite_win）、min_expected_value /
+    max_tickets（value_win）、min_hole_probability / min_odds（hole_win）の
+    1〜2個の軸を固定賭け金で集計する（ドローダウン等の経路に依存する指標は出力しない）。
+    """
+    try:
+        if mode == "threshold":
+            _run_threshold_sweep(config_path, output, sort_by, top)
+            return
+        
+        sweep_configs = ConfigLoader.load_sweep(config_path)
+        
+        # バリデーション（同じエラーは1回だけ表示）
+        errors: list[str] = []
+        for _, config in sweep_configs:
+            errors.extend(e for e in ConfigLoader.validate(config) if e not in errors)
+        if errors:
+            for error in errors:
+                click.echo(f"Error: {error}", err=True)
+            sys.exit(1)
+        
+        planner = ExecutionPlanner()
+        plan = planner.plan([config for _, config in sweep_configs])
+        num_runs = sum(len(dataset.strategies) for dataset in plan)
+        click.echo(f"Loaded: {config_path}")
+        click.echo(
+            f"Sweep: {len(sweep_configs)} combination(s), {len(plan)} dataset(s), "
+            f"{num_runs} strategy run(s)"
+        )
+        
+        click.echo("\nRunning sweep...")
+        rows = sort_rows(run_sweep(sweep_configs, workers=jobs, planner=planner), sort_by)
+        
+        _print_sweep_result(rows, list(sweep_configs[0][0].keys()), sort_by, top)
+        
+        if output is None:
+            output_dir = sweep_configs[0][1].output_dir
+            output = str(Path(output_dir) / f"sweep_{Path(config_path).stem}.csv")
+        _save_sweep_csv(rows, output)
+        
+        click.echo("\nSweep completed!")
+    
+    except FileNotFoundError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        logger.exception("Sweep failed")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+def _run_threshold_sweep(config_path: str, output: str | None, sort_by: str, top: int) -> None:
+    """閾値パラメータのスイープ（threshold モード）"""
+    axes, config = ConfigLoader.load_sweep_axes(config_path)
+    
+    errors = ConfigLoader.validate(config)
+    if errors:
+        for error in errors:
+            click.echo(f"Error: {error}", err=True)
+        sys.exit(1)
+    
+    click.echo(f"Loaded: {config_path}")
+    click.echo(
+        "Threshold sweep: "
+        + " x ".join(f"{name} ({len(values)})" for name, values in axes.items())
+    )
+    
+    grid = run_threshold_sweep(axes, config)
+    rows = grid.rows()
+    if sort_by not in rows[0]:
+        raise ValueError(f"Metric not available in threshold mode: {sort_by}")
+    rows = sort_rows(rows, sort_by)
+    
+    _print_sweep_result(rows, list(axes.keys()), sort_by, top)
+    
+    if output is None:
+        output = str(Path(config.output_dir) / f"sweep_{Path(config_path).stem}.csv")
+    _save_sweep_csv(rows, output)
+    
+    click.echo("\nSweep completed!")
+
+
+def _print_sweep_result(rows: list[dict], param_names: list[str], sort_by: str, top: int) -> None:
+    """スイープ結果の上位を表示"""
+    click.echo(f"\n{'=' * 80}")
+    click.echo(f"Sweep Results (top {min(top, len(rows))} of {len(rows)}, sorted by {sort_by})")
+    click.echo("=" * 80)
+    
+    for rank, row in enumerate(rows[:top], 1):
+        params = ", ".join(f"{name}={row[name]}" for name in param_names) or "(no sweep)"
+        line = (
+            f"{rank:<5} Hit {row['hit_rate']:6.2f}%  ROI {row['roi']:7.2f}%  "
+            f"Profit {row['profit']:+12,}"
+        )
+        # threshold モードは経路に依存する指標を持たない
+        if "max_drawdown" in row:
+            go_status = click.style("GO", fg="green") if row["is_go"] else click.style("NO", fg="red")
+            line += f"  DD {row['max_drawdown']:6.2f}%  {go_status}"
+        click.echo(f"{line}  {params}")
+    
+    click.echo("=" * 80)
+
+
+def _save_sweep_csv(rows: list[dict], output_path: str) -> None:
+    """スイープ結果をCSVで保存（ランク・スイープした値・指標の列）"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    import csv as csv_module
+    
+    columns = list(rows[0].keys()) if rows else []
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv_module.writer(f)
+        writer.writerow(["rank"] + columns)
+        for rank, row in enumerate(rows, 1):
+            writer.writerow([rank] + [
+                json.dumps(row[c], ensure_ascii=False) if isinstance(row[c], list) else row[c]
+                for c in columns
+            ])
+    
+    click.echo(f"Sweep result saved to: {output_path}")
+
+
+@main.command("optimize")
+@click.argument("config_path", type=click.Path(exists=True))
+@click.option(
+    "--objective",
+    type=click.Choice(list(HALVING_OBJECTIVES)),
+    default="roi",
+    help="目的指標（is_go: Go判定を満たす候補を優先。デフォルト: roi）"
+)
+@click.option(
+    "--eta",
+    type=click.IntRange(min=2),
+    default=3,
+    help="段ごとに候補を1/etaに絞り、サンプルをeta倍にする（デフォルト: 3）"
+)
+@click.option(
+    "--min-fraction",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    default=0.05,
+    help="最初の段で使うレースの割合の下限（デフォルト: 0.05）"
+)
+@click.option("--seed", type=int, default=0, help="層化サンプルの乱数シード（デフォルト: 0）")
+@click.option(
+    "--output", "-o",
+    type=click.Path(),
+    help="最終段の結果表を保存するCSVファイルパス（デフォルト: <output_dir>/optimize_<設定名>.csv）"
+)
+def optimize(
+    config_path: str,
+    objective: str,
+    eta: int,
+    min_fraction: float,
+    seed: int,
+    output: str | None
+) -> None:
+    """逐次半減法でパラメータを探索
+    
+    CONFIG_PATH: スイープ指定を含む設定ファイル（YAML）のパス
+    
+    全候補を少数の層化サンプルのレースで評価し、上位1/etaの候補だけを残して
+    サンプルを広げることを繰り返す。最後に残った候補を全レースで実行する。
+    """
+    try:
+        sweep_configs = ConfigLoader.load_sweep(config_path)
+        
+        errors: list[str] = []
+        for _, config in sweep_configs:
+            errors.extend(e for e in ConfigLoader.validate(config) if e not in errors)
+        if errors:
+            for error in errors:
+                click.echo(f"Error: {error}", err=True)
+            sys.exit(1)
+        
+        click.echo(f"Loaded: {config_path} ({len(sweep_configs)} candidate(s))")
+        
+        halving = SuccessiveHalving(
+            objective=objective, eta=eta, min_fraction=min_fraction, seed=seed
+        )
+        result = halving.run(sweep_configs)
+        
+        click.echo(f"\n{'Rung':<6} {'Races%':<8} {'Races':<8} {'Candidates':<12} {'Best ' + objective}")
+        click.echo("-" * 60)
+        for rung_number, rung in enumerate(result.rungs, 1):
+            click.echo(
+                f"{rung_number:<6} {rung.fraction * 100:<8.1f} {rung.num_races:<8} "
+                f"{len(rung.candidates):<12} {rung.scores[0]:.2f}"
+            )
+        
+        rows = [
+            sweep_row(sweep_configs[index][0], run_result)
+            for index, run_result in result.results.items()
+        ]
+        param_names = list(sweep_configs[0][0].keys())
+        _print_sweep_result(rows, param_names, objective, len(rows))
+        
+        best_params = sweep_configs[result.best][0]
+        click.echo(f"Best: {best_params or '(no sweep)'}")
+        
+        if output is None:
+            output_dir = sweep_configs[0][1].output_dir
+            output = str(Path(output_dir) / f"optimize_{Path(config_path).stem}.csv")
+        _save_sweep_csv(rows, output)
+        
+        click.echo("\nOptimization completed!")
+    
+    except FileNotFoundError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        logger.exception("Optimization failed")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@main.command("portfolio")
+@click.argument("config_paths", nargs=-1, type=click.Path(exists=True), required=True)
+@click.option(
+    "--objective",
+    type=click.Choice(list(PORTFOLIO_OBJECTIVES)),
+    default="log_growth",
+    help="目的指標（デフォルト: log_growth）"
+)
+@click.option(
+    "--max-drawdown",
+    type=click.FloatRange(min=0, max=100, min_open=True),
+    default=30.0,
+    help="合算資金の最大ドローダウンの上限（%、デフォルト: 30）"
+)
+@click.option(
+    "--max-total-weight",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    default=1.0,
+    help="1レースに賭ける資金の割合の合計の上限（デフォルト: 1.0）"
+)
+@click.option(
+    "--method",
+    type=click.Choice(list(PORTFOLIO_METHODS)),
+    default="gradient",
+    help="探索方法（gradient: ランダム探索 + 射影勾配法。デフォルト: gradient）"
+)
+@click.option("--seed", type=int, default=0, help="ランダム探索の乱数シード（デフォルト: 0）")
+@click.option(
+    "--output", "-o",
+    type=click.Path(),
+    help="合算資金の推移を保存するCSVファイルパス"
+)
+def portfolio(
+    config_paths: tuple,
+    objective: str,
+    max_drawdown: float,
+    max_total_weight: float,
+    method: str,
+    seed: int,
+    output: str | None
+) -> None:
+    """複数の戦略への資金の配分を最適化
+    
+    CONFIG_PATHS: 組み合わせる戦略の設定ファイル（YAML）のパス（複数指定可）
+    
+    戦略ごとに馬券ごとに同額を賭けたときのレースごとのリターンを求め、
+    合算資金の最大ドローダウンの上限の下で目的指標が最大になる配分を探索する。
+    初期資金は最初の設定ファイルの値を使う。
+    """
+    try:
+        if len(config_paths) < 2:
+            click.echo("Error: At least 2 config files are required for portfolio", err=True)
+            sys.exit(1)
+        
+        configs = []
+        for path in config_paths:
+            config = ConfigLoader.load(path)
+            configs.append(config)
+            click.echo(f"Loaded: {path} (strategy: {config.strategy_name})")
+        
+        names = [config.strategy_name for config in configs]
+        names = make_unique_names([
+            Path(path).stem if names.count(name) > 1 else name
+            for name, path in zip(names, config_paths)
+        ])
+        
+        outcomes = ExecutionPlanner().precompute(configs)
+        matrix = build_returns_matrix(list(zip(names, outcomes)))
+        click.echo(f"\nReturns matrix: {len(matrix.race_ids)} races x {len(names)} strategies")
+        
+        optimizer = PortfolioOptimizer(
+            objective=objective,
+            max_drawdown=max_drawdown,
+            max_total_weight=max_total_weight,
+            method=method,
+            seed=seed
+        )
+        allocation = optimizer.optimize(matrix, configs[0].initial_fund)
+        
+        click.echo(f"\n{'Strategy':<30} {'Weight':<10} {'Bet races':<10} {'Mean return'}")
+        click.echo("-" * 65)
+        for column, (name, weight) in enumerate(zip(allocation.names, allocation.weights)):
+            active = matrix.active[:, column]
+            mean = matrix.returns[active, column].mean() if active.any() else 0.0
+            click.echo(f"{name:<30} {weight:<10.4f} {int(active.sum()):<10} {mean:.4f}")
+        
+        click.echo(f"\nLog growth per race: {allocation.log_growth:.6f}")
+        click.echo(f"Sharpe ratio:        {allocation.sharpe_ratio:.4f}")
+        click.echo(f"Max drawdown:        {allocation.max_drawdown:.2f}%")
+        click.echo(
+            f"Final fund:          {allocation.equity_curve[0]:,.0f} -> "
+            f"{allocation.equity_curve[-1]:,.0f}"
+        )
+        
+        if output:
+            _save_equity_curve_csv(allocation, output)
+        
+        click.echo("\nPortfolio optimization completed!")
+    
+    except FileNotFoundError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        logger.exception("Portfolio optimization failed")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+def _save_equity_curve_csv(allocation, output_path: str) -> None:
+    """合算資金の推移をCSVで保存（1行目は初期資金）"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    import csv as csv_module
+    
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv_module.writer(f)
+        writer.writerow(["race_id", "fund"])
+        for race_id, fund in zip([""] + allocation.race_ids, allocation.equity_curve):
+            writer.writerow([race_id, round(fund, 2)])
+    
+    click.echo(f"Equity curve saved to: {output_path}")
+
+
 def _print_simple_result(result) -> None:
     """シンプルシミュレーション結果を表示"""
     metrics = result.metrics
@@ -466,6 +884,31 @@ def _print_monte_carlo_result(result, initial_fund: int) -> None:
     click.echo("-" * 50)
     click.echo(f"Profit Rate:     {result.profit_rate:>12.2f}%")
     click.echo(f"Bankruptcy Rate: {result.bankruptcy_rate:>12.2f}%")
+    click.echo(f"Ruin Rate:       {result.ruin_rate:>12.2f}%")
+    
+    dists = result.metric_distributions
+    if dists:
+        click.echo("-" * 50)
+        click.echo(f"{'Distribution':<16} {'P5':>10} {'Median':>10} {'P95':>10}")
+        labels = {
+            "max_drawdown": "Max DD (%)",
+            "max_consecutive_losses": "Max Loss Streak",
+            "min_fund": "Min Fund",
+            "sharpe_ratio": "Sharpe",
+            "time_to_ruin": "Bets to Ruin",
+        }
+        for key, label in labels.items():
+            if key in dists:
+                d = dists[key]
+                click.echo(f"{label:<16} {d['p5']:>10,.2f} {d['p50']:>10,.2f} {d['p95']:>10,.2f}")
+    
+    rates = result.go_nogo_rates
+    if rates:
+        click.echo("-" * 50)
+        click.echo(f"P(ROI >= 100%):  {rates['roi']:>12.2f}%")
+        click.echo(f"P(Max DD <= 30%):{rates['max_drawdown']:>12.2f}%")
+        click.echo(f"P(Hit >= 10%):   {rates['hit_rate']:>12.2f}%")
+        click.echo(f"P(GO):           {rates['is_go']:>12.2f}%")
     click.echo("=" * 50)
 
 
@@ -515,6 +958,10 @@ def _save_monte_carlo_result(result, output_path: str) -> None:
         "percentile_95": result.percentile_95,
         "profit_rate": result.profit_rate,
         "bankruptcy_rate": result.bankruptcy_rate,
+        "ruin_rate": result.ruin_rate,
+        "mean_time_to_ruin": result.mean_time_to_ruin,
+        "metric_distributions": result.metric_distributions,
+        "go_nogo_rates": result.go_nogo_rates,
     }
     
     with open(output_path, "w", encoding="utf-8") as f:
@@ -3,6 +3,8 @@
 YAML設定ファイルの読み込みとバリデーション。
 """
 
+import copy
+import itertools
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
@@ -11,6 +13,144 @@ import yaml
 
 from betting_simulation.fund_manager import FundConstraints
 from betting_simulation.race_filter import FilterCondition
+from betting_simulation.strategy import StrategyFactory
+
+# リスト値をとるフィルター項目（スイープはリストのリストで指定する）
+LIST_FILTER_FIELDS = ("tracks", "surfaces", "years", "race_numbers")
+
+
+def _is_range(value: Any) -> bool:
+    """{start, stop, step} 形式の範囲指定か"""
+    return isinstance(value, dict) and "start" in value and "stop" in value
+
+
+def expand_range(spec: dict) -> list:
+    """範囲指定を値のリストに展開（stopを含む）
+    
+    Args:
+        spec: {"start": 1, "stop": 5, "step": 1}（stepは省略時1）
+    
+    Returns:
+        値のリスト（start・stepがすべて整数なら整数）
+    
+    Raises:
+        ValueError: stepが正でない、またはstopがstartより小さい場合
+    """
+    start, stop = spec["start"], spec["stop"]
+    step = spec.get("step", 1)
+    if step <= 0:
+        raise ValueError(f"Sweep step must be positive: {spec}")
+    if stop < start:
+        raise ValueError(f"Sweep stop must be >= start: {spec}")
+    
+    count = int((stop - start) / step + 1e-9) + 1
+    if all(isinstance(v, int) for v in (start, stop, step)):
+        return [start + i * step for i in range(count)]
+    # 浮動小数点の誤差（0.1 * 3 = 0.30000000000000004）を丸める
+    return [round(start + i * step, 10) for i in range(count)]
+
+
+def _sweep_values(value: Any, list_field: bool = False) -> list | None:
+    """スイープ指定なら値のリストを返す（スイープ指定でなければNone）
+    
+    - 範囲指定 {start, stop, step}
+    - リスト（リスト値の項目ではリストのリスト）
+    """
+    if _is_range(value):
+        return expand_range(value)
+    if isinstance(value, list):
+        if not list_field:
+            return value
+        if value and all(isinstance(v, list) for v in value):
+            return value
+    return None
+
+
+def _sweep_sections(data: dict) -> list[tuple[str, dict, bool, tuple[str, ...]]]:
+    """スイープ指定を探すセクション
+    
+    Returns:
+        (キーの接頭辞, セクションの辞書, リスト値の項目を含むか, スイープしない項目) のリスト
+    """
+    sections = []
+    
+    strategy = data.get("strategy")
+    if isinstance(strategy, dict):
+        strategy_name = strategy.get("name")
+        strategy_params = strategy.get("params") or {}
+    else:
+        strategy_name = data.get("strategy_name")
+        strategy_params = data.get("strategy_params") or {}
+    strategy_class = StrategyFactory._strategies.get(strategy_name)
+    structured = strategy_class.structured_params if strategy_class else ()
+    sections.append(("strategy", strategy_params, False, structured))
+    
+    fund_manager = data.get("fund_manager")
+    if isinstance(fund_manager, dict):
+        sections.append(("fund_manager", fund_manager.get("params") or {}, False, ()))
+        sections.append(
+            ("fund_manager.constraints", fund_manager.get("constraints") or {}, False, ())
+        )
+    else:
+        sections.append(("fund_manager", data.get("fund_manager_params") or {}, False, ()))
+    
+    sections.append(("filter", data.get("filter") or {}, True, ()))
+    return sections
+
+
+def _sweep_axes(data: dict) -> list[tuple[str, str, dict, list]]:
+    """スイープ指定の軸 (名前, 項目名, セクションの辞書, 値のリスト) を取り出す"""
+    axes = []
+    for prefix, section, has_list_fields, structured in _sweep_sections(data):
+        for key, value in section.items():
+            if key in structured:
+                continue
+            values = _sweep_values(value, has_list_fields and key in LIST_FILTER_FIELDS)
+            if values is None:
+                continue
+            if not values:
+                raise ValueError(f"Empty sweep: {prefix}.{key}")
+            axes.append((f"{prefix}.{key}", key, section, values))
+    return axes
+
+
+def expand_sweep(data: dict) -> list[tuple[dict[str, Any], dict]]:
+    """スイープ指定を含む設定辞書を、全組み合わせの設定辞書に展開
+    
+    戦略パラメータ・資金管理パラメータ・資金制約・フィルターの各項目に
+    リストまたは {start, stop, step} の範囲を指定できる。
+    リスト値のフィルター項目（tracks など）はリストのリストでスイープする。
+    
+    Args:
+        data: 設定辞書（YAMLの内容）
+    
+    Returns:
+        (スイープした値 {"strategy.top_n": 3, ...}, 展開後の設定辞書) のリスト
+    """
+    data = copy.deepcopy(data)
+    axes = _sweep_axes(data)
+    
+    expanded = []
+    for combination in itertools.product(*[values for *_, values in axes]):
+        # 各セクションに組み合わせの値を書き込んでから複製する
+        for (_, key, section, _), value in zip(axes, combination):
+            section[key] = value
+        swept = {name: value for (name, *_), value in zip(axes, combination)}
+        expanded.append((swept, copy.deepcopy(data)))
+    return expanded
+
+
+def split_sweep(data: dict) -> tuple[dict[str, list], dict]:
+    """スイープ指定を軸と基準の設定辞書に分ける（組み合わせを展開しない）
+    
+    Returns:
+        (軸 {"strategy.min_odds": [値, ...], ...}, 各軸を先頭の値にした設定辞書)
+    """
+    data = copy.deepcopy(data)
+    axes = _sweep_axes(data)
+    for _, key, section, values in axes:
+        section[key] = values[0]
+    return {name: values for name, _, _, values in axes}, data
 
 
 @dataclass
@@ -35,6 +175,9 @@ class SimulationConfig:
     fund_manager_params: dict[str, Any] = field(default_factory=dict)
     fund_constraints: FundConstraints = field(default_factory=FundConstraints)
     
+    # 精算の単位（"ticket" | "race" | "day"）
+    settlement: str = "ticket"
+    
     # モンテカルロ設定
     monte_carlo_trials: int = 10000
     random_seed: int | None = None
@@ -79,6 +222,8 @@ class SimulationConfig:
             config.fund_manager_name = data.get("fund_manager_name", "fixed")
             config.fund_manager_params = data.get("fund_manager_params", {})
         
+        config.settlement = data.get("settlement", "ticket")
+        
         # モンテカルロ設定
         if "monte_carlo" in data:
             mc = data["monte_carlo"]
@@ -93,6 +238,18 @@ class SimulationConfig:
         
         return config
     
+    @classmethod
+    def from_sweep_dict(cls, data: dict) -> list[tuple[dict[str, Any], "SimulationConfig"]]:
+        """スイープ指定を含む辞書から、全組み合わせの設定を作成
+        
+        Returns:
+            (スイープした値, 設定) のリスト（スイープ指定がなければ1件）
+        """
+        return [
+            (swept, cls.from_dict(expanded))
+            for swept, expanded in expand_sweep(data)
+        ]
+    
     def to_dict(self) -> dict:
         """辞書に変換"""
         return {
@@ -124,6 +281,7 @@ class SimulationConfig:
                     "bet_unit": self.fund_constraints.bet_unit,
                 },
             },
+            "settlement": self.settlement,
             "monte_carlo": {
                 "trials": self.monte_carlo_trials,
                 "random_seed": self.random_seed,
@@ -152,6 +310,37 @@ class ConfigLoader:
             FileNotFoundError: ファイルが存在しない場合
             ValueError: 設定が不正な場合
         """
+        return SimulationConfig.from_dict(ConfigLoader._read(file_path))
+    
+    @staticmethod
+    def load_sweep(file_path: str | Path) -> list[tuple[dict[str, Any], SimulationConfig]]:
+        """スイープ指定を含むYAMLファイルから全組み合わせの設定を読み込む
+        
+        Args:
+            file_path: YAMLファイルパス
+        
+        Returns:
+            (スイープした値, SimulationConfig) のリスト
+        
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+            ValueError: 設定が不正な場合
+        """
+        return SimulationConfig.from_sweep_dict(ConfigLoader._read(file_path))
+    
+    @staticmethod
+    def load_sweep_axes(file_path: str | Path) -> tuple[dict[str, list], SimulationConfig]:
+        """スイープ指定を含むYAMLファイルから、軸と基準の設定を読み込む（組み合わせを展開しない）
+        
+        Returns:
+            (軸 {"strategy.min_odds": [値, ...], ...}, 各軸を先頭の値にしたSimulationConfig)
+        """
+        axes, data = split_sweep(ConfigLoader._read(file_path))
+        return axes, SimulationConfig.from_dict(data)
+    
+    @staticmethod
+    def _read(file_path: str | Path) -> dict:
+        """YAMLファイルを辞書として読み込む"""
         file_path = Path(file_path)
         
         if not file_path.exists():
@@ -163,7 +352,7 @@ class ConfigLoader:
         if data is None:
             raise ValueError("Empty config file")
         
-        return SimulationConfig.from_dict(data)
+        return data
     
     @staticmethod
     def validate(config: SimulationConfig) -> list[str]:
@@ -200,6 +389,13 @@ class ConfigLoader:
         except ValueError as e:
             errors.append(str(e))
         
+        # 精算の単位チェック
+        from betting_simulation.simulation_engine import SETTLEMENT_MODES
+        if config.settlement not in SETTLEMENT_MODES:
+            errors.append(
+                f"Unknown settlement: {config.settlement}. Available: {list(SETTLEMENT_MODES)}"
+            )
+        
         return errors
     
     @staticmethod
@@ -15,6 +15,7 @@ from betting_simulation.simulation_engine import SimulationEngine, StrategyCompa
 from betting_simulation.strategy import StrategyFactory
 from betting_simulation.fund_manager import FundManagerFactory
 from betting_simulation.models import SimulationResult
+from betting_simulation.ticket_cache import TicketCache, get_default_cache, set_default_cache
 
 # キャッシュディレクトリ
 CACHE_DIR = Path(__file__).parent / ".cache"
@@ -32,6 +33,9 @@ def init_session_state():
         st.session_state.result = None
     if "comparison_results" not in st.session_state:
         st.session_state.comparison_results = None
+    # 設定を変えて再実行するたびに同じレースの馬券を生成し直さないよう、馬券キャッシュを使う
+    if get_default_cache() is None:
+        set_default_cache(TicketCache())
 
 
 def save_races_to_cache(races) -> bool:
@@ -98,6 +98,7 @@ def _render_simulation_settings():
     fund_manager_options = {
         "定額方式": "fixed",
         "ケリー基準": "kelly",
+        "同時ケリー基準（単勝）": "joint_kelly_win",
         "定率方式": "percentage",
     }
     
@@ -230,7 +231,7 @@ def _get_fund_params(fund_method: str) -> dict:
             min_value=100,
         )
     
-    elif fund_method == "kelly":
+    elif fund_method in ("kelly", "joint_kelly_win"):
         col1, col2 = st.columns(2)
         with col1:
             params["fraction"] = st.slider("ケリー係数", 0.1, 1.0, 0.5, 0.1)
@@ -162,6 +162,10 @@ def _render_comparison_results():
     fund_df = pd.DataFrame(fund_data)
     st.line_chart(fund_df, x="レース", y=list(results.keys()), use_container_width=True)
     
+    # 戦略間の相関（レースで揃えた損益）
+    if len(results) >= 2:
+        _render_correlation(results)
+    
     # ランキング
     st.subheader("🏆 総合ランキング")
     
@@ -182,6 +186,29 @@ def _render_comparison_results():
         st.markdown(f"{medal} **{r['戦略']}** - スコア: {r['スコア']:.1f}, ROI: {r['ROI']:.1f}%")
 
 
+def _render_correlation(results: Dict[str, SimulationResult]):
+    """戦略間の損益の相関とドローダウンの重なり"""
+    st.subheader("戦略間の相関")
+    
+    matrix = StrategyComparator().pnl_matrix(results)
+    names = matrix.names
+    
+    tab_corr, tab_overlap = st.tabs(["損益の相関", "ドローダウンの重なり"])
+    with tab_corr:
+        corr_df = pd.DataFrame(matrix.correlation(), index=names, columns=names)
+        st.dataframe(corr_df.round(2), use_container_width=True)
+    with tab_overlap:
+        overlap_df = pd.DataFrame(matrix.drawdown_overlap(), index=names, columns=names)
+        st.dataframe(overlap_df.round(2), use_container_width=True)
+    
+    st.download_button(
+        "📥 レース × 戦略の損益をCSVでダウンロード",
+        matrix.to_dataframe().to_csv().encode("utf-8-sig"),
+        file_name="pnl_matrix.csv",
+        mime="text/csv",
+    )
+
+
 def _render_monte_carlo(races):
     """モンテカルロ分析"""
     st.subheader("モンテカルロシミュレーション")
@@ -19,8 +19,28 @@ class BetEvaluator:
         Returns:
             (的中フラグ, 払戻金額)
         """
+        is_hit, odds = self.evaluate_odds(ticket, race)
+        return is_hit, self.payout(ticket.amount, odds)
+    
+    @staticmethod
+    def payout(amount: int, odds: float) -> int:
+        """賭け金と払戻倍率から払戻金額を計算"""
+        return int(amount * odds)
+    
+    def evaluate_odds(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
+        """馬券の的中判定と払戻倍率
+        
+        賭け金に依存しないため、レースごとに1回だけ評価して使い回せる。
+        
+        Args:
+            ticket: 馬券
+            race: レースデータ（結果を含む）
+        
+        Returns:
+            (的中フラグ, 払戻倍率（不的中は0）)
+        """
         if race.payouts is None:
-            return False, 0
+            return False, 0.0
         
         match ticket.ticket_type:
             case TicketType.WIN:
@@ -34,31 +54,30 @@ class BetEvaluator:
             case TicketType.TRIO:
                 return self._evaluate_trio(ticket, race)
             case _:
-                return False, 0
+                return False, 0.0
     
-    def _evaluate_win(self, ticket: Ticket, race: Race) -> tuple[bool, int]:
+    def _evaluate_win(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
         """単勝の的中判定"""
         payouts = race.payouts
         if payouts is None:
-            return False, 0
+            return False, 0.0
         
         horse_number = ticket.horse_numbers[0]
         
         # 1着馬と一致するか
         if horse_number == payouts.win_horse:
-            # 払戻計算（馬のオッズを使用）
+            # 払戻倍率（馬のオッズを使用）
             horse = race.get_horse_by_number(horse_number)
             if horse:
-                payout = int(ticket.amount * horse.odds)
-                return True, payout
+                return True, horse.odds
         
-        return False, 0
+        return False, 0.0
     
-    def _evaluate_place(self, ticket: Ticket, race: Race) -> tuple[bool, int]:
+    def _evaluate_place(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
         """複勝の的中判定"""
         payouts = race.payouts
         if payouts is None:
-            return False, 0
+            return False, 0.0
         
         horse_number = ticket.horse_numbers[0]
         
@@ -67,17 +86,15 @@ class BetEvaluator:
             if horse_number == place_horse:
                 # 対応する払戻オッズを使用
                 if i < len(payouts.place_payouts):
-                    odds = payouts.place_payouts[i]
-                    payout = int(ticket.amount * odds)
-                    return True, payout
+                    return True, payouts.place_payouts[i]
         
-        return False, 0
+        return False, 0.0
     
-    def _evaluate_quinella(self, ticket: Ticket, race: Race) -> tuple[bool, int]:
+    def _evaluate_quinella(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
         """馬連の的中判定"""
         payouts = race.payouts
         if payouts is None:
-            return False, 0
+            return False, 0.0
         
         # 馬番をソートして比較
         ticket_numbers = set(ticket.horse_numbers)
@@ -85,16 +102,15 @@ class BetEvaluator:
         
         if ticket_numbers == result_numbers:
             # オッズは倍率形式（11.7 = 11.7倍）
-            payout = int(ticket.amount * payouts.quinella_payout)
-            return True, payout
+            return True, payouts.quinella_payout
         
-        return False, 0
+        return False, 0.0
     
-    def _evaluate_wide(self, ticket: Ticket, race: Race) -> tuple[bool, int]:
+    def _evaluate_wide(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
         """ワイドの的中判定"""
         payouts = race.payouts
         if payouts is None:
-            return False, 0
+            return False, 0.0
         
         ticket_numbers = set(ticket.horse_numbers)
         
@@ -103,23 +119,21 @@ class BetEvaluator:
             if ticket_numbers == set(wide_pair):
                 if i < len(payouts.wide_payouts):
                     # オッズは倍率形式（4.2 = 4.2倍）
-                    payout = int(ticket.amount * payouts.wide_payouts[i])
-                    return True, payout
+                    return True, payouts.wide_payouts[i]
         
-        return False, 0
+        return False, 0.0
     
-    def _evaluate_trio(self, ticket: Ticket, race: Race) -> tuple[bool, int]:
+    def _evaluate_trio(self, ticket: Ticket, race: Race) -> tuple[bool, float]:
         """三連複の的中判定"""
         payouts = race.payouts
         if payouts is None:
-            return False, 0
+            return False, 0.0
         
         ticket_numbers = set(ticket.horse_numbers)
         result_numbers = set(payouts.trio_horses)
         
         if ticket_numbers == result_numbers:
             # オッズは倍率形式（11.5 = 11.5倍）
-            payout = int(ticket.amount * payouts.trio_payout)
-            return True, payout
+            return True, payouts.trio_payout
         
-        return False, 0
+        return False, 0.0
@@ -3,11 +3,19 @@
 賭け金の計算と資金管理を行う。
 """
 
+import math
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Any
 
-from betting_simulation.models import Ticket
+import numpy as np
+
+from betting_simulation.models import Ticket, TicketType
+
+# 資金残高による制約を外して賭け金を計算するときの仮の資金
+_UNLIMITED_FUND = 10 ** 15
+# 同時ケリー基準の賭け比率の合計の上限（全額を賭けると負けたときの対数成長率が発散する）
+_MAX_TOTAL_FRACTION = 1 - 1e-6
 
 
 @dataclass
@@ -36,6 +44,10 @@ class FundManager(ABC):
     
     name: str = "base"
     description: str = ""
+    # 制約適用前の賭け金が現在資金に依存しないか（固定賭け金の高速化に使用）
+    fixed_stake: bool = False
+    # 制約適用前の賭け金が int(現在資金 * percentage) か（資金比率方式の高速化に使用）
+    proportional_stake: bool = False
     
     def __init__(
         self, 
@@ -66,6 +78,24 @@ class FundManager(ABC):
         """制約適用前の賭け金を計算（サブクラスで実装）"""
         pass
     
+    def _calculate_raw_amounts(self, tickets: list[Ticket]) -> list[int]:
+        """1レースの全馬券の制約適用前の賭け金（既定は馬券ごとに計算）"""
+        return [self._calculate_raw_amount(ticket) for ticket in tickets]
+    
+    @classmethod
+    def _calculate_raw_amounts_grid(
+        cls, managers: list["FundManager"], tickets: list[Ticket], funds: np.ndarray
+    ) -> np.ndarray:
+        """設定ごとの資金 (C,) に対する1レースの全馬券の制約適用前の賭け金 (C, T)
+        
+        既定は設定ごとに資金を設定して _calculate_raw_amounts を呼ぶ（サブクラスで配列化）。
+        """
+        rows = []
+        for manager, fund in zip(managers, funds.tolist()):
+            manager.set_fund(fund)
+            rows.append(manager._calculate_raw_amounts(tickets))
+        return np.array(rows, dtype=np.int64).reshape(len(managers), len(tickets))
+    
     def calculate_bet_amount(self, ticket: Ticket) -> int:
         """制約を適用した賭け金を計算
         
@@ -75,8 +105,12 @@ class FundManager(ABC):
         Returns:
             賭け金（円）
         """
-        # 基本金額を計算
-        raw_amount = self._calculate_raw_amount(ticket)
+        return self._constrained_amount(ticket, self._calculate_raw_amount(ticket))
+    
+    def _constrained_amount(self, ticket: Ticket, raw_amount: int) -> int:
+        """制約適用前の賭け金に馬券の配分の倍率と制約を適用"""
+        if ticket.weight != 1.0:
+            raw_amount = int(raw_amount * ticket.weight)
         
         # 制約を適用
         amount = self._apply_constraints(raw_amount)
@@ -114,8 +148,8 @@ class FundManager(ABC):
         amounts = []
         total = 0
         
-        for ticket in tickets:
-            amount = self.calculate_bet_amount(ticket)
+        for ticket, raw_amount in zip(tickets, self._calculate_raw_amounts(tickets)):
+            amount = self._constrained_amount(ticket, raw_amount)
             
             # レース単位の制約
             if total + amount > self.constraints.max_bet_per_race:
@@ -126,6 +160,41 @@ class FundManager(ABC):
             total += amount
         
         return amounts
+    
+    def calculate_unconstrained_amounts(self, tickets: list[Ticket]) -> list[int]:
+        """資金残高による制約（資金不足・最大比率）を受けない場合の賭け金
+        
+        fixed_stakeの資金管理では、資金が十分にある限り実際の賭け金と一致する。
+        """
+        saved_fund = self._current_fund
+        self._current_fund = _UNLIMITED_FUND
+        try:
+            return self.calculate_bet_amounts(tickets)
+        finally:
+            self._current_fund = saved_fund
+    
+    def required_fund(self, amount: int) -> int:
+        """賭け金が資金残高による制約で減額されない最低資金
+        
+        Args:
+            amount: 賭け金（単位に丸め済み）
+        
+        Returns:
+            この資金以上なら _apply_constraints で amount が変わらない
+        """
+        if amount <= 0:
+            return 0
+        ratio = self.constraints.max_bet_ratio
+        if ratio <= 0:
+            return _UNLIMITED_FUND
+        
+        # int(fund * ratio) >= amount となる最小の資金（浮動小数の丸めを考慮して補正）
+        fund = max(amount, math.ceil(amount / ratio))
+        while fund > amount and int((fund - 1) * ratio) >= amount:
+            fund -= 1
+        while int(fund * ratio) < amount:
+            fund += 1
+        return fund
 
 
 class FixedFundManager(FundManager):
@@ -136,9 +205,17 @@ class FixedFundManager(FundManager):
     
     name = "fixed"
     description = "毎回固定金額を賭ける"
+    fixed_stake = True
     
     def _calculate_raw_amount(self, ticket: Ticket) -> int:
         return self.params.get("bet_amount", 1000)
+    
+    @classmethod
+    def _calculate_raw_amounts_grid(
+        cls, managers: list[FundManager], tickets: list[Ticket], funds: np.ndarray
+    ) -> np.ndarray:
+        bet_amounts = np.array([m.params.get("bet_amount", 1000) for m in managers], dtype=np.int64)
+        return np.repeat(bet_amounts[:, np.newaxis], len(tickets), axis=1)
 
 
 class PercentageFundManager(FundManager):
@@ -149,10 +226,23 @@ class PercentageFundManager(FundManager):
     
     name = "percentage"
     description = "現在資金の一定割合を賭ける"
+    proportional_stake = True
+    
+    @property
+    def percentage(self) -> float:
+        """資金に対する賭け比率"""
+        return self.params.get("bet_percentage", 0.02)
     
     def _calculate_raw_amount(self, ticket: Ticket) -> int:
-        percentage = self.params.get("bet_percentage", 0.02)
-        return int(self._current_fund * percentage)
+        return int(self._current_fund * self.percentage)
+    
+    @classmethod
+    def _calculate_raw_amounts_grid(
+        cls, managers: list[FundManager], tickets: list[Ticket], funds: np.ndarray
+    ) -> np.ndarray:
+        percentages = np.array([m.params.get("bet_percentage", 0.02) for m in managers])
+        amounts = (funds * percentages).astype(np.int64)
+        return np.repeat(amounts[:, np.newaxis], len(tickets), axis=1)
 
 
 class KellyFundManager(FundManager):
@@ -167,6 +257,32 @@ class KellyFundManager(FundManager):
     def _calculate_raw_amount(self, ticket: Ticket) -> int:
         kelly_fraction = self.params.get("kelly_fraction", 0.25)  # 1/4 Kelly
         
+        kelly = self._full_kelly(ticket)
+        
+        # 負の場合は賭けない
+        if kelly <= 0:
+            return 0
+        
+        # kelly_fraction を適用
+        kelly *= kelly_fraction
+        
+        # 資金に対する金額を計算
+        amount = int(self._current_fund * kelly)
+        
+        return amount
+    
+    @classmethod
+    def _calculate_raw_amounts_grid(
+        cls, managers: list[FundManager], tickets: list[Ticket], funds: np.ndarray
+    ) -> np.ndarray:
+        kelly = np.array([max(cls._full_kelly(ticket), 0.0) for ticket in tickets])
+        kelly_fractions = np.array([m.params.get("kelly_fraction", 0.25) for m in managers])
+        fractions = kelly[np.newaxis, :] * kelly_fractions[:, np.newaxis]
+        return (funds[:, np.newaxis] * fractions).astype(np.int64)
+    
+    @staticmethod
+    def _full_kelly(ticket: Ticket) -> float:
+        """馬券1枚のケリー基準の賭け比率（kelly_fraction 適用前。賭けない場合は0）"""
         # 期待値から勝率を推定
         # expected_value = win_prob * odds
         # win_prob = expected_value / odds
@@ -187,19 +303,239 @@ class KellyFundManager(FundManager):
         p = win_prob
         q = 1 - p
         
-        kelly = (b * p - q) / b if b > 0 else 0
+        return (b * p - q) / b if b > 0 else 0
+
+
+def joint_kelly_fractions(
+    probabilities: np.ndarray,
+    odds: np.ndarray,
+    max_iter: int = 50,
+    tol: float = 1e-10
+) -> np.ndarray:
+    """1レースの全馬券の賭け比率を同時に求めるケリー基準
+    
+    的中は互いに排他的（1レースで高々1枚が的中）と仮定し、資金に対する賭け比率
+    f (f >= 0, sum(f) <= 1) について期待対数成長率
         
-        # 負の場合は賭けない
-        if kelly <= 0:
-            return 0
+        sum_i p_i * log(1 - F + f_i * o_i) + (1 - sum_i p_i) * log(1 - F)    (F = sum(f))
+    
+    を射影ニュートン法で最大化する（賭け比率の合計は 1 未満に保つ）。シナリオ（どの馬券が的中するか）× 馬券の行列で
+    勾配とヘッセ行列をまとめて計算するため、100枚程度の馬券でも数回の反復で収束する。
+    
+    Args:
+        probabilities: 馬券ごとの的中確率（合計が1を超える場合は1に正規化）
+        odds: 馬券ごとの払戻倍率（賭け金を含む）
+        max_iter: 反復回数の上限
+        tol: 収束判定（賭け比率の変化の最大値）
+    
+    Returns:
+        馬券ごとの賭け比率（確率・オッズが正でない馬券は0）
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    odds = np.asarray(odds, dtype=np.float64)
+    fractions = np.zeros(len(odds))
+    candidates = np.nonzero((probabilities > 0) & (odds > 0))[0]
+    if len(candidates) == 0:
+        return fractions
+    
+    p = probabilities[candidates]
+    if p.sum() > 1:
+        p = p / p.sum()
+    # シナリオごとの確率（馬券 i が的中, どれも的中しない）と、賭け比率に対する資金の変化
+    scenario_prob = np.append(p, max(0.0, 1 - p.sum()))
+    scenarios = -np.ones((len(p) + 1, len(p)))
+    scenarios[np.arange(len(p)), np.arange(len(p))] += odds[candidates]
+    possible = scenario_prob > 0
+    
+    def growth(f: np.ndarray) -> float:
+        wealth = 1 + scenarios[possible] @ f
+        if wealth.min() <= 0 or f.sum() > _MAX_TOTAL_FRACTION:
+            return -np.inf
+        return float(scenario_prob[possible] @ np.log(wealth))
+    
+    def project(f: np.ndarray) -> np.ndarray:
+        """非負にし、合計が _MAX_TOTAL_FRACTION を超える場合は縮小する"""
+        f = np.maximum(f, 0)
+        total = f.sum()
+        return f * (_MAX_TOTAL_FRACTION / total) if total > _MAX_TOTAL_FRACTION else f
+    
+    f = np.zeros(len(p))
+    value = 0.0
+    for _ in range(max_iter):
+        wealth = 1 + scenarios @ f
+        gradient = scenarios.T @ np.where(possible, scenario_prob / wealth, 0)
+        # 0 で止まっていて増やしても改善しない馬券は固定し、残りでニュートン方向を求める
+        free = (f > 0) | (gradient > 0)
+        if not free.any():
+            break
+        curvature = np.where(possible, scenario_prob / wealth ** 2, 0)
+        columns = scenarios[:, free]
+        hessian = (columns * curvature[:, None]).T @ columns
+        # 的中しないシナリオの確率が0だとヘッセ行列が退化しうるため最小二乗で解く
+        direction = np.zeros(len(p))
+        direction[free] = np.linalg.lstsq(hessian, gradient[free], rcond=None)[0]
         
-        # kelly_fraction を適用
-        kelly *= kelly_fraction
+        # 実行可能な範囲に射影し、対数成長率が十分に増えるまで歩幅を半分にする
+        # （最適解の近くでは増分が丸め誤差に埋もれるため、その範囲の減少は許容する）
+        step = 1.0
+        while step > 1e-10:
+            candidate = project(f + step * direction)
+            candidate_value = growth(candidate)
+            if candidate_value >= value + 1e-4 * gradient @ (candidate - f) - 1e-12:
+                break
+            step /= 2
+        else:
+            break
+        change = np.abs(candidate - f).max()
+        f, value = candidate, candidate_value
+        if change < tol:
+            break
+    
+    fractions[candidates] = f
+    return fractions
+
+
+class JointKellyFundManager(FundManager):
+    """単勝の同時ケリー基準方式
+    
+    1レースの単勝（高々1枚しか的中しない）の賭け金を、期待対数成長率の最大化で
+    まとめて決める（joint_kelly_fractions）。馬券ごとに独立に計算する kelly と異なり、
+    同じレースで複数の馬の単勝を買っても合計が過大にならない。
+    単勝以外の馬券は kelly と同じく馬券ごとに計算する。的中確率は kelly と同じく
+    expected_value / odds で推定し、払戻時にオッズが決まる馬券（odds が0）には賭けない。
+    ボックス・流し・フォーメーションの馬連・3連複は事前のオッズを持たないため、
+    この方式でも賭け金は0になる。
+    """
+    
+    name = "joint_kelly_win"
+    description = "1レースの複数の単勝をまとめてケリー基準で配分（単勝以外は馬券ごと）"
+    
+    def _calculate_raw_amount(self, ticket: Ticket) -> int:
+        return self._calculate_raw_amounts([ticket])[0]
+    
+    def _calculate_raw_amounts(self, tickets: list[Ticket]) -> list[int]:
+        kelly_fraction = self.params.get("kelly_fraction", 0.25)  # 1/4 Kelly
+        fractions = self._full_fractions(tickets) * kelly_fraction
+        return [int(self._current_fund * fraction) for fraction in fractions.tolist()]
+    
+    @classmethod
+    def _calculate_raw_amounts_grid(
+        cls, managers: list[FundManager], tickets: list[Ticket], funds: np.ndarray
+    ) -> np.ndarray:
+        kelly_fractions = np.array([m.params.get("kelly_fraction", 0.25) for m in managers])
+        fractions = cls._full_fractions(tickets)[np.newaxis, :] * kelly_fractions[:, np.newaxis]
+        return (funds[:, np.newaxis] * fractions).astype(np.int64)
+    
+    @staticmethod
+    def _full_fractions(tickets: list[Ticket]) -> np.ndarray:
+        """1レースの全馬券の賭け比率（kelly_fraction 適用前）"""
+        odds = np.array([ticket.odds for ticket in tickets], dtype=np.float64)
+        expected_values = np.array([ticket.expected_value for ticket in tickets], dtype=np.float64)
+        probabilities = np.zeros(len(tickets))
+        np.divide(expected_values, odds, out=probabilities, where=odds > 0)
+        # 勝率が1以上なら賭けない（kelly と同じ）
+        probabilities[probabilities >= 1] = 0
         
-        # 資金に対する金額を計算
-        amount = int(self._current_fund * kelly)
+        # 単勝はまとめて、それ以外（同時に的中しうる複勝・ワイドなど）は馬券ごとに計算する
+        win = np.array([ticket.ticket_type == TicketType.WIN for ticket in tickets], dtype=bool)
+        fractions = np.array([
+            0.0 if is_win else max(KellyFundManager._full_kelly(ticket), 0.0)
+            for ticket, is_win in zip(tickets, win.tolist())
+        ])
+        if win.any():
+            fractions[win] = joint_kelly_fractions(probabilities[win], odds[win])
+        return fractions
+
+
+class FundManagerGrid:
+    """同じ方式の資金管理を設定の軸に並べたもの
+    
+    設定ごとの資金 (C,) から1レースの全馬券の賭け金を (設定数, 馬券数) の配列で計算する
+    （FundManager.calculate_bet_amounts の配列版）。パラメータと制約は設定ごとに異なってよい。
+    """
+    
+    def __init__(self, managers: list[FundManager]) -> None:
+        """初期化
         
-        return amount
+        Args:
+            managers: 設定ごとの資金管理（同じクラス）
+        
+        Raises:
+            ValueError: 空、またはクラスが異なる資金管理を含む場合
+        """
+        if not managers:
+            raise ValueError("managers must not be empty")
+        names = sorted({manager.name for manager in managers})
+        if len({type(manager) for manager in managers}) > 1:
+            raise ValueError(f"Fund managers must be of the same class: {names}")
+        self.managers = managers
+        self.manager_class = type(managers[0])
+        
+        # 制約は (設定数, 1) の列にして馬券の軸にブロードキャストする
+        def column(name: str) -> np.ndarray:
+            return np.array([getattr(m.constraints, name) for m in managers])[:, np.newaxis]
+        
+        self.min_bet = column("min_bet")
+        self.max_bet_per_ticket = column("max_bet_per_ticket")
+        self.max_bet_per_race = column("max_bet_per_race")
+        self.max_bet_ratio = column("max_bet_ratio")
+        self.bet_unit = column("bet_unit")
+    
+    def __len__(self) -> int:
+        return len(self.managers)
+    
+    def calculate_bet_amounts(self, tickets: list[Ticket], funds: np.ndarray) -> np.ndarray:
+        """1レースの全馬券の賭け金を設定ごとに計算
+        
+        Args:
+            tickets: 馬券リスト
+            funds: 設定ごとの現在資金 (C,)
+        
+        Returns:
+            賭け金 (C, T)
+        """
+        funds = np.asarray(funds, dtype=np.int64)
+        amounts = self.manager_class._calculate_raw_amounts_grid(self.managers, tickets, funds)
+        
+        # 馬券の配分の倍率（_constrained_amount と同じく1以外の馬券だけ切り捨て）
+        weights = np.array([ticket.weight for ticket in tickets], dtype=np.float64)
+        scaled = weights != 1.0
+        if scaled.any():
+            amounts = np.where(scaled, (amounts * weights).astype(np.int64), amounts)
+        
+        amounts = self._apply_constraints(amounts, funds[:, np.newaxis])
+        return self._apply_race_limit(amounts)
+    
+    def _apply_constraints(self, amounts: np.ndarray, funds: np.ndarray) -> np.ndarray:
+        """FundManager._apply_constraints の配列版"""
+        amounts = np.minimum(amounts, funds)
+        amounts = np.minimum(amounts, (funds * self.max_bet_ratio).astype(np.int64))
+        amounts = np.minimum(amounts, self.max_bet_per_ticket)
+        amounts = (amounts // self.bet_unit) * self.bet_unit
+        return np.where(amounts < self.min_bet, 0, amounts)
+    
+    def _apply_race_limit(self, amounts: np.ndarray) -> np.ndarray:
+        """1レースあたりの上限（calculate_bet_amounts と同じく馬券順に減額）"""
+        over = np.cumsum(amounts, axis=1) > self.max_bet_per_race
+        if not over.any():
+            return amounts
+        
+        # 上限に掛かる設定だけ馬券順に計算
+        rows = np.flatnonzero(over.any(axis=1))
+        limited = amounts[rows]
+        limits = self.max_bet_per_race[rows, 0]
+        units = self.bet_unit[rows, 0]
+        total = np.zeros(len(rows), dtype=np.int64)
+        for j in range(limited.shape[1]):
+            amount = limited[:, j]
+            exceeded = total + amount > limits
+            amount = np.where(exceeded, np.maximum(0, limits - total) // units * units, amount)
+            limited[:, j] = amount
+            total += amount
+        
+        amounts = amounts.copy()
+        amounts[rows] = limited
+        return amounts
 
 
 class FundManagerFactory:
@@ -209,6 +545,7 @@ class FundManagerFactory:
         "fixed": FixedFundManager,
         "percentage": PercentageFundManager,
         "kelly": KellyFundManager,
+        "joint_kelly_win": JointKellyFundManager,
     }
     
     @classmethod
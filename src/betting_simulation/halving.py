@@ -0,0 +1,228 @@
+"""逐次半減法によるパラメータ探索
+
+全候補を少数の層化サンプルのレースで評価し、目的指標の上位 1/eta だけを残して
+サンプルを eta 倍に広げることを繰り返す。最後に残った候補は全レースで実行する。
+
+- サンプルは入れ子（小さいサンプルは大きいサンプルに含まれる）で、
+  層（競馬場 × 芝/ダート）ごとのレース数の比率を保つ
+- 馬券生成と的中判定の結果はレース単位でキャッシュし、次の段では追加されたレースのみ計算する
+- 同じ割合での評価結果もキャッシュし、割合が下限で揃った段では再計算しない
+"""
+
+import logging
+import math
+import random
+from typing import Any
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.fund_manager import FundManagerFactory
+from betting_simulation.models import (
+    HalvingResult,
+    HalvingRung,
+    Race,
+    SimulationMetrics,
+    SimulationResult,
+)
+from betting_simulation.planner import ExecutionPlanner
+from betting_simulation.precompute import RaceOutcome, precompute_outcomes
+from betting_simulation.simulation_engine import OPTIMIZE_OBJECTIVES, SimulationEngine
+from betting_simulation.strategy import Strategy, StrategyFactory
+
+logger = logging.getLogger(__name__)
+
+# 目的指標（is_go は Go判定を満たす候補を優先し、同じならROIで比べる）
+HALVING_OBJECTIVES = OPTIMIZE_OBJECTIVES + ("is_go",)
+
+
+def objective_score(metrics: SimulationMetrics, objective: str) -> tuple[float, ...]:
+    """並べ替え用の目的指標（大きいほど良い）"""
+    if objective == "is_go":
+        return (float(metrics.is_go), metrics.roi)
+    return (float(getattr(metrics, objective)),)
+
+
+def stratified_order(races: list[Race], seed: int | None = None) -> list[list[int]]:
+    """層（競馬場 × 芝/ダート）ごとにレースの位置をシャッフルした順序
+    
+    stratified_sample で各層の先頭から取り出すため、割合を大きくしたサンプルは
+    小さいサンプルを含む。
+    """
+    strata: dict[tuple[str, str], list[int]] = {}
+    for i, race in enumerate(races):
+        strata.setdefault((race.track, race.surface.value), []).append(i)
+    
+    rng = random.Random(seed)
+    orders = []
+    for key in sorted(strata):
+        indices = strata[key]
+        rng.shuffle(indices)
+        orders.append(indices)
+    return orders
+
+
+def stratified_sample(strata: list[list[int]], fraction: float) -> list[int]:
+    """各層から割合 fraction（切り上げ）ずつ取り出したレースの位置（時系列順）"""
+    if fraction >= 1.0:
+        return sorted(i for indices in strata for i in indices)
+    sample = []
+    for indices in strata:
+        sample.extend(indices[:math.ceil(len(indices) * fraction)])
+    return sorted(sample)
+
+
+class SuccessiveHalving:
+    """逐次半減法によるパラメータ探索"""
+    
+    def __init__(
+        self,
+        planner: ExecutionPlanner | None = None,
+        objective: str = "roi",
+        eta: int = 3,
+        min_fraction: float = 0.05,
+        seed: int | None = 0
+    ) -> None:
+        """初期化
+        
+        Args:
+            planner: データの読み込みに使う実行計画（省略時はデフォルト）
+            objective: 目的指標（"roi", "profit", "hit_rate", "sharpe_ratio", "is_go"）
+            eta: 段ごとに候補を 1/eta に絞り、サンプルを eta 倍にする
+            min_fraction: 最初の段のサンプルの割合の下限
+            seed: 層化サンプルの乱数シード
+        
+        Raises:
+            ValueError: 目的指標・eta・min_fraction が不正な場合
+        """
+        if objective not in HALVING_OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}. Available: {list(HALVING_OBJECTIVES)}")
+        if eta < 2:
+            raise ValueError(f"eta must be >= 2: {eta}")
+        if not 0 < min_fraction <= 1:
+            raise ValueError(f"min_fraction must be in (0, 1]: {min_fraction}")
+        
+        self.planner = planner or ExecutionPlanner()
+        self.objective = objective
+        self.eta = eta
+        self.min_fraction = min_fraction
+        self.seed = seed
+    
+    def fractions(self, num_candidates: int) -> list[float]:
+        """段ごとのサンプルの割合（最後の段は1.0）
+        
+        候補が eta 件以下になるまで 1/eta ずつ絞る段数を求め、
+        最後の段から1段戻るごとに割合を 1/eta にする（min_fraction で下限を切る）。
+        """
+        num_rungs = 0
+        remaining = num_candidates
+        while remaining > self.eta:
+            remaining = math.ceil(remaining / self.eta)
+            num_rungs += 1
+        return [
+            max(self.min_fraction, float(self.eta) ** (rung - num_rungs))
+            for rung in range(num_rungs + 1)
+        ]
+    
+    def run(self, sweep: list[tuple[dict[str, Any], SimulationConfig]]) -> HalvingResult:
+        """全候補を逐次半減法で評価
+        
+        Args:
+            sweep: (スイープした値, 設定) のリスト（ConfigLoader.load_sweep の戻り値）
+        
+        Returns:
+            HalvingResult
+        
+        Raises:
+            ValueError: 候補がない場合
+        """
+        if not sweep:
+            raise ValueError("No candidates to optimize")
+        configs = [config for _, config in sweep]
+        
+        plan = self.planner.plan(configs)
+        self._configs = configs
+        self._datasets = self.planner.load_datasets(plan)
+        self._strata = {
+            key: stratified_order(races, self.seed) for key, races in self._datasets.items()
+        }
+        
+        # 候補ごとの (データセット, 戦略グループ) と、グループごとの戦略・レース単位のキャッシュ
+        self._slots: dict[int, tuple[str, int]] = {}
+        self._strategies: dict[tuple[str, int], Strategy] = {}
+        self._outcome_cache: dict[tuple[str, int], dict[int, RaceOutcome]] = {}
+        for dataset in plan:
+            for group_id, group in enumerate(dataset.strategies):
+                slot = (dataset.key, group_id)
+                self._strategies[slot] = StrategyFactory.create(
+                    group.strategy_name, group.strategy_params
+                )
+                self._outcome_cache[slot] = {}
+                for index in group.members:
+                    self._slots[index] = slot
+        
+        self._samples: dict[tuple[str, float], list[int]] = {}
+        self._result_cache: dict[tuple[int, float], SimulationResult] = {}
+        
+        halving = HalvingResult(objective=self.objective)
+        survivors = list(range(len(configs)))
+        fractions = self.fractions(len(configs))
+        
+        for rung, fraction in enumerate(fractions):
+            results = {index: self._evaluate(index, fraction) for index in survivors}
+            ranked = sorted(
+                survivors,
+                key=lambda i: objective_score(results[i].metrics, self.objective),
+                reverse=True
+            )
+            dataset_keys = {self._slots[index][0] for index in survivors}
+            num_races = sum(len(self._samples[(key, fraction)]) for key in dataset_keys)
+            halving.rungs.append(HalvingRung(
+                fraction=fraction,
+                num_races=num_races,
+                candidates=ranked,
+                scores=[objective_score(results[i].metrics, self.objective)[0] for i in ranked],
+            ))
+            logger.info(
+                f"Rung {rung + 1}/{len(fractions)}: {len(ranked)} candidate(s) "
+                f"on {num_races} races ({fraction:.1%})"
+            )
+            
+            if rung == len(fractions) - 1:
+                halving.results = {index: results[index] for index in ranked}
+                halving.best = ranked[0]
+            else:
+                survivors = ranked[:math.ceil(len(ranked) / self.eta)]
+        
+        return halving
+    
+    def _evaluate(self, index: int, fraction: float) -> SimulationResult:
+        """候補を割合 fraction のサンプルで評価（評価済みならキャッシュを返す）"""
+        if (index, fraction) in self._result_cache:
+            return self._result_cache[(index, fraction)]
+        
+        config = self._configs[index]
+        slot = self._slots[index]
+        dataset_key = slot[0]
+        if (dataset_key, fraction) not in self._samples:
+            self._samples[(dataset_key, fraction)] = stratified_sample(
+                self._strata[dataset_key], fraction
+            )
+        sample = self._samples[(dataset_key, fraction)]
+        
+        # サンプルのうち未計算のレースだけ馬券生成と的中判定を行う
+        cache = self._outcome_cache[slot]
+        races = self._datasets[dataset_key]
+        missing = [i for i in sample if i not in cache]
+        computed = precompute_outcomes(
+            self._strategies[slot], self.planner.evaluator, [races[i] for i in missing]
+        )
+        cache.update(zip(missing, computed))
+        
+        fund_manager = FundManagerFactory.create(
+            config.fund_manager_name, config.fund_manager_params, config.fund_constraints
+        )
+        engine = SimulationEngine(
+            self._strategies[slot], fund_manager, self.planner.evaluator, config.settlement
+        )
+        result, _ = engine._replay([cache[i] for i in sample], config.initial_fund, None, "none")
+        self._result_cache[(index, fraction)] = result
+        return result
@@ -4,8 +4,12 @@
 """
 
 from dataclasses import dataclass, field
+from datetime import date
 from enum import Enum
-from typing import Optional
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
 
 
 class TicketType(Enum):
@@ -106,6 +110,11 @@ class Race:
         """レース一意識別子"""
         return f"{self.track}_{self.year}_{self.kaisai_date:04d}_{self.race_number:02d}"
     
+    @property
+    def race_date(self) -> date:
+        """開催日（年とMMDD形式の開催日から）"""
+        return date(self.year, self.kaisai_date // 100, self.kaisai_date % 100)
+    
     @property
     def num_horses(self) -> int:
         """出走頭数"""
@@ -172,6 +181,7 @@ class Ticket:
     amount: int = 0  # 賭け金（円）
     odds: float = 0.0  # オッズ（単勝/複勝のみ）
     expected_value: float = 0.0  # 期待値
+    weight: float = 1.0  # 賭け金の倍率（ポートフォリオ戦略での配分）
     
     @property
     def numbers_str(self) -> str:
@@ -205,6 +215,224 @@ class BetRecord:
         return (self.payout / self.ticket.amount) * 100
 
 
+# BetLogで使用する馬券種別コード（TicketTypeの定義順）
+TICKET_TYPE_ORDER: tuple[TicketType, ...] = tuple(TicketType)
+TICKET_TYPE_CODES: dict[TicketType, int] = {t: i for i, t in enumerate(TICKET_TYPE_ORDER)}
+
+
+def combo_to_mask(horse_numbers: Iterable[int]) -> int:
+    """馬番の組み合わせをビットマスクに変換（馬番nをビットnに対応）"""
+    mask = 0
+    for number in horse_numbers:
+        mask |= 1 << number
+    return mask
+
+
+def mask_to_combo(mask: int) -> tuple[int, ...]:
+    """ビットマスクを昇順の馬番タプルに変換"""
+    numbers = []
+    number = 0
+    while mask:
+        if mask & 1:
+            numbers.append(number)
+        mask >>= 1
+        number += 1
+    return tuple(numbers)
+
+
+class BetLog:
+    """列指向の賭け履歴
+    
+    list[BetRecord] の代わりに、列ごとのNumPy配列で賭け履歴を保持する。
+    容量は倍々で確保して追記するため、1件ごとのオブジェクト生成が不要。
+    to_dataframe() は列をコピーせずにDataFrameを作成し、
+    反復やインデックスアクセスでは BetRecord のビューを返す（既存コードとの互換用）。
+    """
+    
+    # 列名とdtype
+    COLUMNS: dict[str, type] = {
+        "race_index": np.int32,  # races リスト内のインデックス
+        "ticket_type": np.int8,  # TICKET_TYPE_CODES のコード
+        "combo_mask": np.uint64,  # 馬番のビットマスク
+        "amount": np.int64,  # 賭け金
+        "odds": np.float64,  # 馬券のオッズ
+        "expected_value": np.float64,  # 期待値
+        "is_hit": np.bool_,  # 的中フラグ
+        "payout": np.int64,  # 払戻金
+        "fund_before": np.int64,  # 賭け前資金
+        "fund_after": np.int64,  # 賭け後資金
+    }
+    
+    def __init__(self, capacity: int = 256) -> None:
+        """初期化
+        
+        Args:
+            capacity: 初期確保件数
+        """
+        self.races: list[Race] = []
+        self._size = 0
+        self._capacity = max(1, capacity)
+        self._columns: dict[str, np.ndarray] = {
+            name: np.empty(self._capacity, dtype=dtype)
+            for name, dtype in self.COLUMNS.items()
+        }
+    
+    @classmethod
+    def from_records(cls, records: Iterable[BetRecord]) -> "BetLog":
+        """BetRecordの列からBetLogを作成"""
+        records = list(records)
+        log = cls(capacity=len(records))
+        for record in records:
+            log.append(
+                record.race,
+                record.ticket,
+                record.ticket.amount,
+                record.is_hit,
+                record.payout,
+                record.fund_before,
+                record.fund_after,
+            )
+        return log
+    
+    @classmethod
+    def coerce(cls, history: "BetLog | Iterable[BetRecord]") -> "BetLog":
+        """BetLogまたはBetRecordの列をBetLogとして扱う"""
+        if isinstance(history, cls):
+            return history
+        return cls.from_records(history)
+    
+    @classmethod
+    def concat(cls, logs: Iterable["BetLog"]) -> "BetLog":
+        """複数のBetLogを順に連結（レースのインデックスは振り直す）"""
+        logs = list(logs)
+        merged = cls(capacity=sum(len(log) for log in logs))
+        for log in logs:
+            size = len(log)
+            for name in cls.COLUMNS:
+                merged._columns[name][merged._size:merged._size + size] = log.column(name)
+            merged._columns["race_index"][merged._size:merged._size + size] += len(merged.races)
+            merged.races.extend(log.races)
+            merged._size += size
+        return merged
+    
+    def rebind_races(self, races: Iterable[Race]) -> None:
+        """保持しているレースを、同じrace_idを持つ races のオブジェクトに置き換える
+        
+        プロセス間で受け渡した結果のレースの複製を、元のレースに戻すために使う。
+        """
+        race_by_id = {race.race_id: race for race in races}
+        self.races = [race_by_id.get(race.race_id, race) for race in self.races]
+    
+    def _race_index(self, race: Race) -> int:
+        """レースのインデックスを取得（直前と同じレースなら再利用）"""
+        if not self.races or self.races[-1] is not race:
+            self.races.append(race)
+        return len(self.races) - 1
+    
+    def _reserve(self, size: int) -> None:
+        """指定件数を格納できるよう容量を確保"""
+        if size <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < size:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+    
+    def append(
+        self,
+        race: Race,
+        ticket: Ticket,
+        amount: int,
+        is_hit: bool,
+        payout: int,
+        fund_before: int,
+        fund_after: int
+    ) -> None:
+        """1件の賭けを追記"""
+        self._reserve(self._size + 1)
+        i = self._size
+        cols = self._columns
+        cols["race_index"][i] = self._race_index(race)
+        cols["ticket_type"][i] = TICKET_TYPE_CODES[ticket.ticket_type]
+        cols["combo_mask"][i] = combo_to_mask(ticket.horse_numbers)
+        cols["amount"][i] = amount
+        cols["odds"][i] = ticket.odds
+        cols["expected_value"][i] = ticket.expected_value
+        cols["is_hit"][i] = is_hit
+        cols["payout"][i] = payout
+        cols["fund_before"][i] = fund_before
+        cols["fund_after"][i] = fund_after
+        self._size += 1
+    
+    def column(self, name: str) -> np.ndarray:
+        """列のビュー（コピーなし）を取得"""
+        return self._columns[name][:self._size]
+    
+    @property
+    def profits(self) -> np.ndarray:
+        """各賭けの損益"""
+        return self.column("payout") - self.column("amount")
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """DataFrameに変換
+        
+        数値列は内部配列のビューをそのまま使う（コピーなし）。
+        race_id と ticket_type はカテゴリ列として付与する。
+        """
+        data: dict[str, object] = {
+            name: self.column(name) for name in self.COLUMNS
+        }
+        
+        race_ids = [race.race_id for race in self.races]
+        race_index = self.column("race_index")
+        if len(set(race_ids)) == len(race_ids):
+            data["race_id"] = pd.Categorical.from_codes(race_index, race_ids)
+        else:
+            # 同一レースが離れて複数回現れた場合はカテゴリを統合
+            categories, codes = np.unique(np.array(race_ids, dtype=object), return_inverse=True)
+            data["race_id"] = pd.Categorical.from_codes(codes[race_index], categories)
+        
+        data["ticket_type_name"] = pd.Categorical.from_codes(
+            self.column("ticket_type"), [str(t) for t in TICKET_TYPE_ORDER]
+        )
+        
+        return pd.DataFrame(data, copy=False)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, index: int) -> BetRecord:
+        """BetRecordのビューを取得"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("BetLog index out of range")
+        cols = self._columns
+        ticket = Ticket(
+            ticket_type=TICKET_TYPE_ORDER[int(cols["ticket_type"][index])],
+            horse_numbers=mask_to_combo(int(cols["combo_mask"][index])),
+            amount=int(cols["amount"][index]),
+            odds=float(cols["odds"][index]),
+            expected_value=float(cols["expected_value"][index]),
+        )
+        return BetRecord(
+            race=self.races[int(cols["race_index"][index])],
+            ticket=ticket,
+            is_hit=bool(cols["is_hit"][index]),
+            payout=int(cols["payout"][index]),
+            fund_before=int(cols["fund_before"][index]),
+            fund_after=int(cols["fund_after"][index]),
+        )
+    
+    def __iter__(self) -> Iterator[BetRecord]:
+        for i in range(self._size):
+            yield self[i]
+
+
 @dataclass
 class SimulationMetrics:
     """シミュレーション評価指標"""
@@ -233,7 +461,7 @@ class SimulationResult:
     """シミュレーション結果"""
     initial_fund: int
     final_fund: int
-    bet_history: list[BetRecord] = field(default_factory=list)
+    bet_history: BetLog | list[BetRecord] = field(default_factory=list)
     fund_history: list[int] = field(default_factory=list)
     metrics: Optional[SimulationMetrics] = None
     
@@ -250,6 +478,60 @@ class SimulationResult:
         return (self.final_fund / self.initial_fund) * 100
 
 
+@dataclass
+class PnLMatrix:
+    """レース × 戦略の損益行列
+    
+    行はいずれかの戦略が賭けたレース（整数のレースキーの昇順 = 開催日順）で、
+    戦略が賭けなかったレースの損益は0。
+    """
+    names: list[str]  # 戦略名 (S,)
+    race_keys: np.ndarray  # 整数のレースキー (T,)
+    race_ids: list[str]  # レースID (T,)
+    pnl: np.ndarray  # 損益（円） (T, S)
+    active: np.ndarray  # 賭けたレースのフラグ (T, S)
+    
+    def covariance(self) -> np.ndarray:
+        """戦略間の損益の共分散行列 (S, S)（標本共分散）"""
+        num_races, num_strategies = self.pnl.shape
+        if num_races < 2:
+            return np.zeros((num_strategies, num_strategies))
+        centered = self.pnl - self.pnl.mean(axis=0)
+        return centered.T @ centered / (num_races - 1)
+    
+    def correlation(self) -> np.ndarray:
+        """戦略間の損益の相関行列 (S, S)（分散0の戦略との相関は0、対角は1）"""
+        covariance = self.covariance()
+        std = np.sqrt(np.diag(covariance))
+        scale = np.outer(std, std)
+        correlation = np.zeros(covariance.shape)
+        np.divide(covariance, scale, out=correlation, where=scale > 0)
+        np.fill_diagonal(correlation, 1.0)
+        return np.clip(correlation, -1.0, 1.0)
+    
+    def drawdown_overlap(self) -> np.ndarray:
+        """戦略間のドローダウンの重なり (S, S)
+        
+        累積損益が直前までの高値（開始時の0を含む）を下回っているレースの集合について、
+        2つの戦略の共通部分 / 和集合（どちらもドローダウンがなければ0）。
+        """
+        equity = np.cumsum(self.pnl, axis=0)
+        peaks = np.maximum.accumulate(np.maximum(equity, 0), axis=0)
+        in_drawdown = (equity < peaks).astype(np.float64)
+        both = in_drawdown.T @ in_drawdown
+        counts = np.diag(both)
+        either = counts[:, None] + counts[None, :] - both
+        overlap = np.zeros(both.shape)
+        np.divide(both, either, out=overlap, where=either > 0)
+        return overlap
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """レースIDを行、戦略名を列とするDataFrameに変換"""
+        return pd.DataFrame(
+            self.pnl, index=pd.Index(self.race_ids, name="race_id"), columns=self.names
+        )
+
+
 @dataclass 
 class MonteCarloResult:
     """モンテカルロシミュレーション結果"""
@@ -272,3 +554,69 @@ class MonteCarloResult:
     # 破産確率
     bankruptcy_rate: float = 0.0  # 資金が一定以下になる確率
     profit_rate: float = 0.0  # 利益が出る確率
+    
+    # 指標の分布（{指標名: {"mean", "p5", "p25", "p50", "p75", "p95"}}）
+    # max_drawdown / max_consecutive_losses / min_fund / sharpe_ratio / time_to_ruin（破産試行のみ）
+    metric_distributions: dict[str, dict[str, float]] = field(default_factory=dict)
+    
+    # 破産ライン到達（途中停止）
+    ruin_rate: float = 0.0  # 途中停止した試行の割合（%）
+    mean_time_to_ruin: float = 0.0  # 停止までの平均賭け数
+    
+    # Go/No-Go基準ごとの成立確率（%）: roi / max_drawdown / hit_rate / is_go
+    go_nogo_rates: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class WalkForwardOptimizationResult:
+    """Walk-Forward最適化結果
+    
+    ウィンドウごとに学習区間でパラメータを選び、直後の検証区間に適用した結果。
+    検証区間は資金を引き継いで順に実行し、つなげたものを out_of_sample とする。
+    """
+    objective: str  # 最適化の目的指標（SimulationMetricsの属性名）
+    # (学習開始, 学習終了, 検証開始, 検証終了) の時系列インデックス上の位置
+    windows: list[tuple[int, int, int, int]] = field(default_factory=list)
+    # 選ばれたパラメータ {"strategy": {...}, "fund_manager": {...}}
+    chosen_params: list[dict[str, dict[str, Any]]] = field(default_factory=list)
+    train_scores: list[float] = field(default_factory=list)  # 学習区間での目的指標
+    test_results: list[SimulationResult] = field(default_factory=list)  # 検証区間ごとの結果
+    out_of_sample: Optional[SimulationResult] = None  # 検証区間をつないだ結果
+
+
+@dataclass
+class HalvingRung:
+    """逐次半減法の1段分の評価"""
+    fraction: float  # 評価に使ったレースの割合
+    num_races: int  # 評価に使ったレース数（データセットの合計）
+    candidates: list[int] = field(default_factory=list)  # 評価した候補（目的指標の良い順）
+    scores: list[float] = field(default_factory=list)  # 候補ごとの目的指標
+
+
+@dataclass
+class HalvingResult:
+    """逐次半減法によるパラメータ探索結果
+    
+    最終段は全レースで実行した結果で、best はその中で目的指標が最も良い候補。
+    """
+    objective: str  # 目的指標
+    rungs: list[HalvingRung] = field(default_factory=list)
+    results: dict[int, SimulationResult] = field(default_factory=dict)  # 最終段の結果（候補ごと）
+    best: int = 0  # 最良の候補のインデックス
+
+
+@dataclass
+class PortfolioAllocation:
+    """ポートフォリオの配分の最適化結果
+    
+    重みは各戦略がレースごとに賭ける資金の割合（馬券ごとに同額で配分）。
+    """
+    objective: str  # 目的指標
+    names: list[str] = field(default_factory=list)  # 戦略名
+    weights: list[float] = field(default_factory=list)  # 戦略ごとの重み
+    score: float = 0.0  # 目的指標の値
+    log_growth: float = 0.0  # 1レースあたりの期待対数成長率
+    sharpe_ratio: float = 0.0  # レースごとのリターンのシャープレシオ
+    max_drawdown: float = 0.0  # 合算資金の最大ドローダウン（%）
+    race_ids: list[str] = field(default_factory=list)  # レースID（開催日順）
+    equity_curve: list[float] = field(default_factory=list)  # 合算資金の推移（初期資金 + レースごと）
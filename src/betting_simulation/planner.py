@@ -0,0 +1,275 @@
+"""複数設定の実行計画
+
+複数の設定ファイルを、データセット（data_path + filter）と戦略（名前 + パラメータ）で
+グループ化し、共通の処理を1回だけ実行する。
+
+- データの読み込みは data_path ごとに1回
+- フィルタリングは (data_path, filter) ごとに1回
+- 馬券生成と的中判定は (データセット, 戦略) ごとに1回
+- 資金管理の再生のみ設定ごとに実行（制約・初期資金も設定どおり）
+"""
+
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.data_loader import DataLoader
+from betting_simulation.evaluator import BetEvaluator
+from betting_simulation.fund_manager import FundManagerFactory
+from betting_simulation.models import BetLog, Race, SimulationResult
+from betting_simulation.precompute import RaceOutcome, precompute_outcomes
+from betting_simulation.race_filter import RaceFilter
+from betting_simulation.race_table import RaceTable
+from betting_simulation.simulation_engine import SimulationEngine, _validate_record_mode
+from betting_simulation.strategy import StrategyFactory
+from betting_simulation.ticket_cache import (
+    TicketCache,
+    get_default_cache,
+    set_default_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(value: Any) -> str:
+    """グループ化用の正規化したキー"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+@dataclass
+class StrategyGroup:
+    """同じデータセット・同じ戦略の設定のグループ"""
+    strategy_name: str
+    strategy_params: dict[str, Any]
+    members: list[int] = field(default_factory=list)  # 設定のインデックス
+
+
+@dataclass
+class DatasetGroup:
+    """同じデータセット（data_path + filter）の設定のグループ"""
+    data_path: str
+    config: SimulationConfig  # filter_condition の参照用（先頭の設定）
+    strategies: list[StrategyGroup] = field(default_factory=list)
+    
+    @property
+    def key(self) -> str:
+        """データセットのキー"""
+        return _canonical([self.data_path, self.config.to_dict()["filter"]])
+
+
+def make_unique_names(names: list[str]) -> list[str]:
+    """重複する名前に連番を付けて一意にする（"name", "name (2)", ...）"""
+    seen: dict[str, int] = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        unique.append(name if count == 1 else f"{name} ({count})")
+    return unique
+
+
+# ワーカープロセスごとの共有状態（データセットごとのレースは初期化時に1回だけ受け取る）
+_planner_state: dict = {}
+
+
+def _init_planner_worker(
+    datasets: dict[str, list[Race]],
+    configs: list[SimulationConfig],
+    evaluator: BetEvaluator,
+    record: str = "full",
+    cache: TicketCache | None = None
+) -> None:
+    """実行計画ワーカーの初期化（馬券キャッシュは親プロセスの既定のキャッシュを引き継ぐ）"""
+    set_default_cache(cache)
+    _planner_state["datasets"] = datasets
+    _planner_state["configs"] = configs
+    _planner_state["evaluator"] = evaluator
+    _planner_state["record"] = record
+
+
+def _dataset_table(dataset_key: str) -> RaceTable:
+    """データセットのレーステーブル（ワーカー内で戦略グループ間で共有）"""
+    tables = _planner_state.setdefault("tables", {})
+    if dataset_key not in tables:
+        tables[dataset_key] = RaceTable(_planner_state["datasets"][dataset_key])
+    return tables[dataset_key]
+
+
+def _run_strategy_group(task: tuple[str, StrategyGroup]) -> list[SimulationResult]:
+    """1つの戦略グループを実行（馬券生成は1回、資金管理の再生は設定ごと）"""
+    dataset_key, group = task
+    races = _planner_state["datasets"][dataset_key]
+    evaluator = _planner_state["evaluator"]
+    
+    strategy = StrategyFactory.create(group.strategy_name, group.strategy_params)
+    table = _dataset_table(dataset_key) if strategy.has_batch else None
+    outcomes = precompute_outcomes(strategy, evaluator, races, table)
+    
+    results = []
+    for index in group.members:
+        config = _planner_state["configs"][index]
+        fund_manager = FundManagerFactory.create(
+            config.fund_manager_name,
+            config.fund_manager_params,
+            config.fund_constraints
+        )
+        engine = SimulationEngine(strategy, fund_manager, evaluator, config.settlement)
+        result, _ = engine._replay(
+            outcomes, config.initial_fund, None, _planner_state["record"]
+        )
+        results.append(result)
+    return results
+
+
+class ExecutionPlanner:
+    """複数設定の実行計画"""
+    
+    def __init__(
+        self,
+        loader: DataLoader | None = None,
+        evaluator: BetEvaluator | None = None
+    ) -> None:
+        """初期化
+        
+        Args:
+            loader: データローダー（省略時はデフォルト）
+            evaluator: 的中判定（省略時はデフォルト）
+        """
+        self.loader = loader or DataLoader()
+        self.evaluator = evaluator or BetEvaluator()
+    
+    def plan(self, configs: list[SimulationConfig]) -> list[DatasetGroup]:
+        """設定をデータセット・戦略ごとにグループ化
+        
+        Args:
+            configs: 設定のリスト
+        
+        Returns:
+            データセットごとのグループ（設定の出現順）
+        """
+        datasets: dict[str, DatasetGroup] = {}
+        strategies: dict[tuple[str, str], StrategyGroup] = {}
+        
+        for index, config in enumerate(configs):
+            dataset = DatasetGroup(data_path=config.data_path, config=config)
+            dataset = datasets.setdefault(dataset.key, dataset)
+            
+            strategy_key = (dataset.key, _canonical([config.strategy_name, config.strategy_params]))
+            if strategy_key not in strategies:
+                strategies[strategy_key] = StrategyGroup(
+                    strategy_name=config.strategy_name,
+                    strategy_params=config.strategy_params
+                )
+                dataset.strategies.append(strategies[strategy_key])
+            strategies[strategy_key].members.append(index)
+        
+        return list(datasets.values())
+    
+    def load_datasets(self, plan: list[DatasetGroup]) -> dict[str, list[Race]]:
+        """データセットごとにレースを読み込んでフィルタリング（ファイルの読み込みはパスごとに1回）"""
+        loaded: dict[str, list[Race]] = {}
+        datasets: dict[str, list[Race]] = {}
+        for dataset in plan:
+            if dataset.data_path not in loaded:
+                loaded[dataset.data_path] = self.loader.load(dataset.data_path)
+                logger.info(f"Loaded {len(loaded[dataset.data_path])} races from {dataset.data_path}")
+            races = RaceFilter(dataset.config.filter_condition).filter(loaded[dataset.data_path])
+            logger.info(f"Filtered to {len(races)} races ({dataset.data_path})")
+            datasets[dataset.key] = races
+        return datasets
+    
+    def precompute(
+        self,
+        configs: list[SimulationConfig],
+        datasets: dict[str, list[Race]] | None = None
+    ) -> list[list[RaceOutcome]]:
+        """全設定の馬券と的中結果を事前計算（同じデータセット・戦略の設定では共有）
+        
+        Args:
+            configs: 設定のリスト
+            datasets: load_datasets で読み込み済みのデータセット（省略時は読み込む）
+        
+        Returns:
+            設定と同じ順序の、データセットのレースごとの事前計算結果
+        """
+        plan = self.plan(configs)
+        if datasets is None:
+            datasets = self.load_datasets(plan)
+        
+        outcomes: list[list[RaceOutcome] | None] = [None] * len(configs)
+        for dataset in plan:
+            races = datasets[dataset.key]
+            table = None
+            for group in dataset.strategies:
+                strategy = StrategyFactory.create(group.strategy_name, group.strategy_params)
+                if strategy.has_batch and table is None:
+                    table = RaceTable(races)
+                group_outcomes = precompute_outcomes(
+                    strategy, self.evaluator, races, table if strategy.has_batch else None
+                )
+                for index in group.members:
+                    outcomes[index] = group_outcomes
+        return outcomes
+    
+    def execute(
+        self,
+        configs: list[SimulationConfig],
+        workers: int = 1,
+        datasets: dict[str, list[Race]] | None = None,
+        record: str = "full"
+    ) -> list[SimulationResult]:
+        """全設定を実行
+        
+        Args:
+            configs: 設定のリスト
+            workers: 戦略グループを並列実行するプロセス数（1なら逐次実行）
+            datasets: load_datasets で読み込み済みのデータセット（省略時は読み込む）
+            record: 履歴の記録モード（"none" | "summary" | "full"）
+        
+        Returns:
+            設定と同じ順序のシミュレーション結果
+        
+        Raises:
+            ValueError: workersが1未満、または記録モードが不正な場合
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1: {workers}")
+        _validate_record_mode(record)
+        
+        plan = self.plan(configs)
+        if datasets is None:
+            datasets = self.load_datasets(plan)
+        tasks = [(dataset.key, group) for dataset in plan for group in dataset.strategies]
+        logger.info(
+            f"Execution plan: {len(plan)} dataset(s), {len(tasks)} strategy run(s) "
+            f"for {len(configs)} config(s)"
+        )
+        
+        if workers == 1 or len(tasks) <= 1:
+            _init_planner_worker(datasets, configs, self.evaluator, record, get_default_cache())
+            try:
+                outputs = [_run_strategy_group(task) for task in tasks]
+            finally:
+                _planner_state.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                initializer=_init_planner_worker,
+                initargs=(datasets, configs, self.evaluator, record, get_default_cache())
+            ) as executor:
+                outputs = list(executor.map(_run_strategy_group, tasks))
+            
+            # ワーカーから戻ったレースの複製を元のレースに置き換える
+            for (dataset_key, _), group_results in zip(tasks, outputs):
+                for result in group_results:
+                    if isinstance(result.bet_history, BetLog):
+                        result.bet_history.rebind_races(datasets[dataset_key])
+        
+        results: list[SimulationResult | None] = [None] * len(configs)
+        for (_, group), group_results in zip(tasks, outputs):
+            for index, result in zip(group.members, group_results):
+                results[index] = result
+        return results
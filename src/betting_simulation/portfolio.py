@@ -0,0 +1,342 @@
+"""ポートフォリオの配分の最適化
+
+複数の戦略への資金の配分を、レース × 戦略のリターン行列の上で探索する。
+
+- リターンは事前計算の結果から、馬券ごとに同額（Ticket.weight 倍）を賭けたときの
+  レースごとの 払戻 / 賭け金 - 1（賭けなかったレースは0）
+- 戦略ごとのレースは race_id で揃え、いずれかの戦略にあるレースを開催日順に並べる
+- 重み w は各戦略がレースごとに賭ける資金の割合で、合算資金はレースごとに 1 + R @ w 倍になる
+- 目的指標（1レースあたりの期待対数成長率 または シャープレシオ）を、合算資金の
+  最大ドローダウンの制約の下でランダム探索と射影勾配法で最大化する
+
+候補の評価は (レース数, 候補数) の行列演算でまとめて行う。賭け金の単位への丸めや
+資金制約は考慮しないため、実際のシミュレーションとは多少異なる。
+"""
+
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from betting_simulation.models import PortfolioAllocation, Race
+from betting_simulation.precompute import RaceOutcome
+
+logger = logging.getLogger(__name__)
+
+# 目的指標
+PORTFOLIO_OBJECTIVES = ("log_growth", "sharpe_ratio")
+# 探索方法（gradient はランダム探索の最良の候補から射影勾配法で改善する）
+PORTFOLIO_METHODS = ("gradient", "random")
+
+# 1回に評価する (レース数 × 候補数) の要素数の上限（メモリ使用量を抑える）
+_CHUNK_ELEMENTS = 4_000_000
+# 対数を取る資金倍率の下限（全額を失う配分を -inf ではなく非常に小さい値として扱う）
+_MIN_GROWTH = 1e-12
+
+
+@dataclass
+class ReturnsMatrix:
+    """レース × 戦略のリターン行列
+    
+    Attributes:
+        names: 戦略名 (S,)
+        race_ids: レースID (T,)（開催日順）
+        returns: 賭け金あたりのリターン (T, S)（賭けなかったレースは0）
+        active: 賭けたレースのフラグ (T, S)
+    """
+    names: list[str]
+    race_ids: list[str]
+    returns: np.ndarray
+    active: np.ndarray
+
+
+def race_returns(outcomes: list[RaceOutcome]) -> tuple[np.ndarray, np.ndarray]:
+    """馬券ごとに同額を賭けたときのレースごとのリターン
+    
+    Returns:
+        (払戻 / 賭け金 - 1 (T,)（賭けなかったレースは0）, 賭けたレースのフラグ (T,))
+    """
+    stakes = np.array(
+        [sum(ticket.weight for ticket in outcome.tickets) for outcome in outcomes], dtype=float
+    )
+    payouts = np.array(
+        [
+            sum(ticket.weight * odds for ticket, odds in zip(outcome.tickets, outcome.odds))
+            for outcome in outcomes
+        ],
+        dtype=float
+    )
+    active = stakes > 0
+    returns = np.zeros(len(outcomes))
+    np.divide(payouts, stakes, out=returns, where=active)
+    returns[active] -= 1
+    return returns, active
+
+
+def build_returns_matrix(runs: list[tuple[str, list[RaceOutcome]]]) -> ReturnsMatrix:
+    """戦略ごとの事前計算結果からリターン行列を作成
+    
+    Args:
+        runs: (戦略名, レースごとの事前計算結果) のリスト
+    
+    Returns:
+        race_id で揃えたリターン行列（戦略にないレースは賭けなかったものとして0）
+    """
+    races: dict[str, Race] = {}
+    for _, outcomes in runs:
+        for outcome in outcomes:
+            races.setdefault(outcome.race.race_id, outcome.race)
+    race_ids = sorted(
+        races,
+        key=lambda i: (races[i].year, races[i].kaisai_date, races[i].race_number, races[i].track)
+    )
+    positions = {race_id: row for row, race_id in enumerate(race_ids)}
+    
+    returns = np.zeros((len(race_ids), len(runs)))
+    active = np.zeros((len(race_ids), len(runs)), dtype=bool)
+    for column, (_, outcomes) in enumerate(runs):
+        values, flags = race_returns(outcomes)
+        rows = np.array([positions[outcome.race.race_id] for outcome in outcomes], dtype=np.int64)
+        returns[rows, column] = values
+        active[rows, column] = flags
+    
+    return ReturnsMatrix(
+        names=[name for name, _ in runs], race_ids=race_ids, returns=returns, active=active
+    )
+
+
+def _log_growth(growth: np.ndarray) -> np.ndarray:
+    """列ごとの1レースあたりの期待対数成長率（growth: 資金倍率 (T, K)）"""
+    if len(growth) == 0:
+        return np.zeros(growth.shape[1])
+    return np.log(np.maximum(growth, _MIN_GROWTH)).mean(axis=0)
+
+
+def _sharpe_ratio(growth: np.ndarray) -> np.ndarray:
+    """列ごとのレースごとのリターンのシャープレシオ（MetricsCalculatorと同じく標本標準偏差）"""
+    if len(growth) < 2:
+        return np.zeros(growth.shape[1])
+    mean = growth.mean(axis=0) - 1
+    std = growth.std(axis=0, ddof=1)
+    sharpe = np.zeros(growth.shape[1])
+    np.divide(mean, std, out=sharpe, where=std > 0)
+    return sharpe
+
+
+def _max_drawdown(growth: np.ndarray) -> np.ndarray:
+    """列ごとの合算資金の最大ドローダウン（%、初期資金も高値に含める）"""
+    if len(growth) == 0:
+        return np.zeros(growth.shape[1])
+    log_equity = np.cumsum(np.log(np.maximum(growth, _MIN_GROWTH)), axis=0)
+    peaks = np.maximum.accumulate(np.maximum(log_equity, 0), axis=0)
+    return (1 - np.exp(log_equity - peaks)).max(axis=0) * 100
+
+
+def _project(weights: np.ndarray, budget: float) -> np.ndarray:
+    """{w >= 0, sum(w) <= budget} への射影"""
+    clipped = np.maximum(weights, 0)
+    if clipped.sum() <= budget:
+        return clipped
+    # 和が budget の単体への射影（降順に並べた値から閾値を求める）
+    ordered = np.sort(weights)[::-1]
+    excess = np.cumsum(ordered) - budget
+    rho = np.nonzero(ordered - excess / np.arange(1, len(ordered) + 1) > 0)[0][-1]
+    return np.maximum(weights - excess[rho] / (rho + 1), 0)
+
+
+class PortfolioOptimizer:
+    """ポートフォリオの配分の最適化"""
+    
+    def __init__(
+        self,
+        objective: str = "log_growth",
+        max_drawdown: float = 30.0,
+        max_total_weight: float = 1.0,
+        method: str = "gradient",
+        num_samples: int = 2000,
+        max_iter: int = 200,
+        seed: int | None = 0
+    ) -> None:
+        """初期化
+        
+        Args:
+            objective: 目的指標（"log_growth", "sharpe_ratio"）
+            max_drawdown: 合算資金の最大ドローダウンの上限（%）
+            max_total_weight: 1レースに賭ける資金の割合の合計の上限（0より大きく1以下）
+            method: 探索方法（"gradient", "random"）
+            num_samples: ランダム探索の候補数
+            max_iter: 射影勾配法の反復回数の上限
+            seed: 乱数シード
+        
+        Raises:
+            ValueError: 目的指標・探索方法・各上限が不正な場合
+        """
+        if objective not in PORTFOLIO_OBJECTIVES:
+            raise ValueError(
+                f"Unknown objective: {objective}. Available: {list(PORTFOLIO_OBJECTIVES)}"
+            )
+        if method not in PORTFOLIO_METHODS:
+            raise ValueError(f"Unknown method: {method}. Available: {list(PORTFOLIO_METHODS)}")
+        if max_drawdown <= 0:
+            raise ValueError(f"max_drawdown must be > 0: {max_drawdown}")
+        if not 0 < max_total_weight <= 1:
+            raise ValueError(f"max_total_weight must be in (0, 1]: {max_total_weight}")
+        if num_samples < 1:
+            raise ValueError(f"num_samples must be >= 1: {num_samples}")
+        
+        self.objective = objective
+        self.max_drawdown = max_drawdown
+        self.max_total_weight = max_total_weight
+        self.method = method
+        self.num_samples = num_samples
+        self.max_iter = max_iter
+        self.seed = seed
+    
+    def optimize(self, matrix: ReturnsMatrix, initial_fund: int = 100000) -> PortfolioAllocation:
+        """最大ドローダウンの制約の下で目的指標が最大になる配分を探索
+        
+        シャープレシオは重みの大きさに依存しないため、sharpe_ratio では最後に
+        重みの合計の上限と最大ドローダウンの制約を満たす範囲で重みを最大まで拡大する。
+        
+        Args:
+            matrix: リターン行列
+            initial_fund: 合算資金の推移の初期資金
+        
+        Returns:
+            PortfolioAllocation
+        
+        Raises:
+            ValueError: 戦略がない場合
+        """
+        returns = matrix.returns
+        if returns.shape[1] == 0:
+            raise ValueError("No strategies to optimize")
+        
+        candidates = self._candidates(returns.shape[1])
+        scores, drawdowns = self._evaluate(returns, candidates)
+        # 重み0の候補（ドローダウン0）を含むため、制約を満たす候補は必ずある
+        best = int(np.argmax(np.where(drawdowns <= self.max_drawdown, scores, -np.inf)))
+        weights = candidates[best]
+        logger.info(
+            f"Random search: {len(candidates)} candidate(s), "
+            f"best {self.objective}={scores[best]:.6f}"
+        )
+        
+        if self.method == "gradient":
+            weights = self._ascend(returns, weights)
+        if self.objective == "sharpe_ratio":
+            weights = self._scale_up(returns, weights)
+        
+        return self._allocation(matrix, weights, initial_fund)
+    
+    def _candidates(self, num_strategies: int) -> np.ndarray:
+        """ランダム探索の候補 (K, S)
+        
+        重み0・単独の戦略に加え、配分の比率をディリクレ分布、重みの合計を
+        上限の 1e-4 倍から1倍までの対数一様分布から選ぶ（最適な重みは小さいことが多い）。
+        """
+        rng = np.random.default_rng(self.seed)
+        directions = rng.dirichlet(np.ones(num_strategies), size=self.num_samples)
+        totals = 10.0 ** rng.uniform(-4, 0, size=(self.num_samples, 1))
+        return np.vstack([
+            np.zeros((1, num_strategies)),
+            np.eye(num_strategies),
+            directions * totals,
+        ]) * self.max_total_weight
+    
+    def _score(self, growth: np.ndarray) -> np.ndarray:
+        """列ごとの目的指標"""
+        if self.objective == "log_growth":
+            return _log_growth(growth)
+        return _sharpe_ratio(growth)
+    
+    def _evaluate(self, returns: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """候補 (K, S) ごとの目的指標と最大ドローダウン（候補をまとめて行列演算で評価）"""
+        scores = np.empty(len(weights))
+        drawdowns = np.empty(len(weights))
+        chunk = max(1, _CHUNK_ELEMENTS // max(len(returns), 1))
+        for start in range(0, len(weights), chunk):
+            growth = 1 + returns @ weights[start:start + chunk].T
+            scores[start:start + chunk] = self._score(growth)
+            drawdowns[start:start + chunk] = _max_drawdown(growth)
+        return scores, drawdowns
+    
+    def _gradient(self, returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """目的指標の重みについての勾配"""
+        growth = 1 + returns @ weights
+        if self.objective == "log_growth":
+            if len(returns) == 0:
+                return np.zeros(len(weights))
+            return (returns / np.maximum(growth, _MIN_GROWTH)[:, None]).mean(axis=0)
+        
+        if len(returns) < 2:
+            return np.zeros(len(weights))
+        profit = growth - 1
+        mean, std = profit.mean(), profit.std(ddof=1)
+        mean_gradient = returns.mean(axis=0)
+        if std == 0:
+            return mean_gradient
+        std_gradient = (returns - mean_gradient).T @ (profit - mean) / ((len(returns) - 1) * std)
+        return (mean_gradient * std - mean * std_gradient) / std ** 2
+    
+    def _ascend(self, returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """射影勾配法（目的指標が改善し制約を満たすまで歩幅を半分にする）"""
+        score = self._evaluate(returns, weights[None, :])[0][0]
+        step = 0.1 * self.max_total_weight
+        min_step = 1e-6 * self.max_total_weight
+        
+        for _ in range(self.max_iter):
+            gradient = self._gradient(returns, weights)
+            norm = np.linalg.norm(gradient)
+            if norm == 0:
+                break
+            while step >= min_step:
+                candidate = _project(weights + step * gradient / norm, self.max_total_weight)
+                scores, drawdowns = self._evaluate(returns, candidate[None, :])
+                if drawdowns[0] <= self.max_drawdown and scores[0] > score:
+                    break
+                step /= 2
+            else:
+                break
+            weights, score = candidate, scores[0]
+            step *= 2
+        
+        return weights
+    
+    def _scale_up(self, returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """重みの向きを保ったまま、合計の上限とドローダウンの制約の範囲で最大まで拡大"""
+        total = weights.sum()
+        if total == 0:
+            return weights
+        
+        def feasible(scale: float) -> bool:
+            return self._evaluate(returns, weights[None, :] * scale)[1][0] <= self.max_drawdown
+        
+        low, high = 1.0, self.max_total_weight / total
+        if feasible(high):
+            return weights * high
+        for _ in range(30):
+            middle = (low + high) / 2
+            if feasible(middle):
+                low = middle
+            else:
+                high = middle
+        return weights * low
+    
+    def _allocation(
+        self, matrix: ReturnsMatrix, weights: np.ndarray, initial_fund: int
+    ) -> PortfolioAllocation:
+        """配分と合算資金の推移"""
+        growth = (1 + matrix.returns @ weights)[:, None]
+        equity = initial_fund * np.concatenate([[1.0], np.cumprod(growth[:, 0])])
+        return PortfolioAllocation(
+            objective=self.objective,
+            names=list(matrix.names),
+            weights=weights.tolist(),
+            score=float(self._score(growth)[0]),
+            log_growth=float(_log_growth(growth)[0]),
+            sharpe_ratio=float(_sharpe_ratio(growth)[0]),
+            max_drawdown=float(_max_drawdown(growth)[0]),
+            race_ids=list(matrix.race_ids),
+            equity_curve=equity.tolist(),
+        )
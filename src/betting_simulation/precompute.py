@@ -0,0 +1,100 @@
+"""レース結果の事前計算
+
+戦略の馬券生成と的中判定は資金に依存しないため、レースごとに1回だけ計算して
+複数のシミュレーション（Walk-Forwardの各ウィンドウなど）で使い回す。
+"""
+
+from dataclasses import dataclass, field
+
+from betting_simulation.evaluator import BetEvaluator
+from betting_simulation.models import Race, Ticket
+from betting_simulation.race_table import RaceTable
+from betting_simulation.strategy import Strategy
+from betting_simulation.ticket_cache import (
+    TicketCache,
+    get_default_cache,
+    race_key,
+    strategy_fingerprint,
+)
+
+
+@dataclass
+class RaceOutcome:
+    """1レース分の事前計算結果
+    
+    Attributes:
+        race: レース
+        tickets: 戦略が生成した馬券（賭け金は未設定）
+        hits: 馬券ごとの的中フラグ
+        odds: 馬券ごとの払戻倍率（不的中は0）
+    """
+    race: Race
+    tickets: list[Ticket] = field(default_factory=list)
+    hits: list[bool] = field(default_factory=list)
+    odds: list[float] = field(default_factory=list)
+
+
+def _generate_tickets(
+    strategy: Strategy,
+    races: list[Race],
+    table: RaceTable | None = None
+) -> list[list[Ticket]]:
+    """全レースの馬券を生成（戦略が generate_batch に対応していれば列指向でまとめて生成）"""
+    if not strategy.has_batch:
+        return [strategy.generate_tickets(race) for race in races]
+    if table is None:
+        table = RaceTable(races)
+    return strategy.generate_batch(table).split(len(races))
+
+
+def precompute_outcomes(
+    strategy: Strategy,
+    evaluator: BetEvaluator,
+    races: list[Race],
+    table: RaceTable | None = None,
+    cache: TicketCache | None = None
+) -> list[RaceOutcome]:
+    """全レースの馬券と的中結果を事前計算
+    
+    馬券が生成されなかったレースも空のRaceOutcomeとして残すため、
+    戻り値はracesと同じ長さ・同じ順序になる。
+    戦略が generate_batch に対応していれば、全レースの馬券を列指向でまとめて生成する。
+    馬券キャッシュがあれば、キャッシュにないレースの馬券だけを生成する。
+    
+    Args:
+        strategy: 賭け戦略
+        evaluator: 的中判定
+        races: レースリスト
+        table: races のレーステーブル（複数の戦略で共有する場合。省略時は作成する）
+        cache: 馬券キャッシュ（省略時は既定のキャッシュ。未設定なら使わない）
+    
+    Returns:
+        レースごとの事前計算結果
+    """
+    cache = cache if cache is not None else get_default_cache()
+    if cache is None or not strategy.cacheable:
+        tickets_by_race = _generate_tickets(strategy, races, table)
+    else:
+        fingerprint = strategy_fingerprint(strategy)
+        keys = [race_key(race) for race in races]
+        tickets_by_race = cache.get_many(fingerprint, keys)
+        missing = [i for i, tickets in enumerate(tickets_by_race) if tickets is None]
+        if missing:
+            generated = _generate_tickets(
+                strategy,
+                [races[i] for i in missing],
+                table if len(missing) == len(races) else None
+            )
+            cache.put_many(fingerprint, [keys[i] for i in missing], generated)
+            for i, tickets in zip(missing, generated):
+                tickets_by_race[i] = tickets
+    
+    outcomes = []
+    for race, tickets in zip(races, tickets_by_race):
+        outcome = RaceOutcome(race=race, tickets=tickets)
+        for ticket in tickets:
+            is_hit, odds = evaluator.evaluate_odds(ticket, race)
+            outcome.hits.append(is_hit)
+            outcome.odds.append(odds)
+        outcomes.append(outcome)
+    return outcomes
@@ -0,0 +1,207 @@
+"""レースの時系列インデックス
+
+レースを開催日順に1回だけ並べ替え、日付範囲の切り出しを二分探索で行う。
+Walk-Forwardのウィンドウを月・週などの暦上の期間で指定するために使う。
+"""
+
+import calendar
+import re
+from datetime import date, timedelta
+
+import numpy as np
+
+from betting_simulation.models import Race
+
+# 期間指定の単位（"6M" や "2W" の末尾）
+PERIOD_UNITS = {
+    "D": "日",
+    "W": "週",
+    "M": "月",
+    "Y": "年",
+}
+
+_PERIOD_PATTERN = re.compile(r"^\s*(\d+)\s*([A-Za-z])\s*$")
+
+
+def parse_period(text: str) -> tuple[int, str]:
+    """期間指定文字列を解析
+    
+    Args:
+        text: "6M"（6ヶ月）、"2W"（2週）、"10D"（10日）、"1Y"（1年）など
+    
+    Returns:
+        (数, 単位)
+    
+    Raises:
+        ValueError: 形式または単位が不正な場合
+    """
+    match = _PERIOD_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid period: {text}. Expected e.g. '6M', '2W'")
+    count, unit = int(match.group(1)), match.group(2).upper()
+    if unit not in PERIOD_UNITS:
+        raise ValueError(f"Unknown period unit: {unit}. Available: {list(PERIOD_UNITS.keys())}")
+    if count <= 0:
+        raise ValueError(f"Period must be positive: {text}")
+    return count, unit
+
+
+def add_period(day: date, count: int, unit: str) -> date:
+    """日付に期間を加算（月・年は月末に丸める）"""
+    if unit == "D":
+        return day + timedelta(days=count)
+    if unit == "W":
+        return day + timedelta(weeks=count)
+    
+    months = count * 12 if unit == "Y" else count
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, min(day.day, last_day))
+
+
+def _date_key(day: date) -> int:
+    """日付の比較用キー（YYYYMMDD）"""
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+class RaceIndex:
+    """レースの時系列インデックス
+    
+    開催日（年+MMDD）・レース番号・競馬場の順で安定に並べ替えて保持する。
+    日付はYYYYMMDDの整数配列として持ち、範囲検索はnp.searchsortedで行う。
+    """
+    
+    def __init__(self, races: list[Race]) -> None:
+        """初期化
+        
+        Args:
+            races: レースリスト（順不同）
+        """
+        self.races: list[Race] = sorted(
+            races, key=lambda r: (r.year, r.kaisai_date, r.race_number, r.track)
+        )
+        self.date_keys = np.array(
+            [r.year * 10000 + r.kaisai_date for r in self.races], dtype=np.int64
+        )
+    
+    def __len__(self) -> int:
+        return len(self.races)
+    
+    @property
+    def first_date(self) -> date:
+        """最初の開催日"""
+        return self.races[0].race_date
+    
+    @property
+    def last_date(self) -> date:
+        """最後の開催日"""
+        return self.races[-1].race_date
+    
+    def locate(self, start: date, end: date) -> tuple[int, int]:
+        """開催日が[start, end)のレースの位置を二分探索で取得
+        
+        Returns:
+            racesに対する[開始位置, 終了位置)
+        """
+        lo = int(np.searchsorted(self.date_keys, _date_key(start), side="left"))
+        hi = int(np.searchsorted(self.date_keys, _date_key(end), side="left"))
+        return lo, max(lo, hi)
+    
+    def between(self, start: date, end: date) -> list[Race]:
+        """開催日が[start, end)のレースを取得"""
+        lo, hi = self.locate(start, end)
+        return self.races[lo:hi]
+    
+    def count_windows(self, window_size: int, step_size: int) -> list[tuple[int, int]]:
+        """レース数で区切ったウィンドウ[開始位置, 終了位置)のリスト"""
+        return [
+            (start, start + window_size)
+            for start in range(0, len(self.races) - window_size + 1, step_size)
+        ]
+    
+    def calendar_windows(self, window: str, step: str) -> list[tuple[int, int]]:
+        """暦上の期間で区切ったウィンドウ[開始位置, 終了位置)のリスト
+        
+        最初の開催日を起点に step ずつずらし、期間全体がデータの範囲に収まる
+        ウィンドウのみを返す（レース数指定で端数のウィンドウを作らないのと同じ扱い）。
+        
+        Args:
+            window: ウィンドウの長さ（例: "6M"）
+            step: ずらす幅（例: "1M"）
+        
+        Returns:
+            ウィンドウのリスト
+        """
+        window_count, window_unit = parse_period(window)
+        step_count, step_unit = parse_period(step)
+        if not self.races:
+            return []
+        
+        origin = self.first_date
+        data_end = self.last_date + timedelta(days=1)
+        
+        windows = []
+        k = 0
+        while True:
+            # 起点から毎回計算して月末丸めの誤差を累積させない
+            start = add_period(origin, step_count * k, step_unit)
+            end = add_period(start, window_count, window_unit)
+            if end > data_end:
+                break
+            windows.append(self.locate(start, end))
+            k += 1
+        return windows
+    
+    def count_train_test_windows(
+        self, train_size: int, test_size: int
+    ) -> list[tuple[int, int, int, int]]:
+        """レース数で区切った学習・検証ウィンドウのリスト
+        
+        学習区間の直後を検証区間とし、検証区間が重ならないよう test_size ずつずらす。
+        
+        Returns:
+            (学習開始, 学習終了, 検証開始, 検証終了) のリスト
+        """
+        return [
+            (start, start + train_size, start + train_size, start + train_size + test_size)
+            for start in range(0, len(self.races) - train_size - test_size + 1, test_size)
+        ]
+    
+    def calendar_train_test_windows(
+        self, train_window: str, test_window: str
+    ) -> list[tuple[int, int, int, int]]:
+        """暦上の期間で区切った学習・検証ウィンドウのリスト
+        
+        最初の開催日を起点に検証期間ずつずらし、検証期間の終わりが
+        データの範囲に収まるウィンドウのみを返す。
+        
+        Args:
+            train_window: 学習期間（例: "6M"）
+            test_window: 検証期間（例: "1M"）
+        
+        Returns:
+            (学習開始, 学習終了, 検証開始, 検証終了) のリスト
+        """
+        train_count, train_unit = parse_period(train_window)
+        test_count, test_unit = parse_period(test_window)
+        if not self.races:
+            return []
+        
+        origin = self.first_date
+        data_end = self.last_date + timedelta(days=1)
+        
+        windows = []
+        k = 0
+        while True:
+            train_start = add_period(origin, test_count * k, test_unit)
+            test_start = add_period(train_start, train_count, train_unit)
+            test_end = add_period(test_start, test_count, test_unit)
+            if test_end > data_end:
+                break
+            windows.append(
+                self.locate(train_start, test_start) + self.locate(test_start, test_end)
+            )
+            k += 1
+        return windows
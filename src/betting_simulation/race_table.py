@@ -0,0 +1,274 @@
+"""列指向のレーステーブル
+
+レースのリストを (レース数, 最大頭数) の配列にまとめ、戦略の馬券生成を
+レースごとのPythonループではなく配列演算で行えるようにする。
+頭数が最大頭数に満たないレースの余りは valid=False の埋め草とする。
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable
+
+import numpy as np
+
+from betting_simulation.models import (
+    TICKET_TYPE_CODES,
+    TICKET_TYPE_ORDER,
+    Race,
+    Ticket,
+    TicketType,
+)
+
+# 馬券種別ごとの馬番の数
+TICKET_WIDTHS: dict[TicketType, int] = {
+    TicketType.WIN: 1,
+    TicketType.PLACE: 1,
+    TicketType.QUINELLA: 2,
+    TicketType.WIDE: 2,
+    TicketType.TRIO: 3,
+}
+
+# 埋め草の順位・人気（実在の値より後ろに並ぶ）
+_PAD_RANK = np.iinfo(np.int64).max
+
+
+def slice_count(length: np.ndarray, stop: int) -> np.ndarray:
+    """長さ length のリストを [:stop] で切り出したときの要素数（負の stop も Python と同じ扱い）"""
+    if stop >= 0:
+        return np.minimum(length, stop)
+    return np.maximum(length + stop, 0)
+
+
+class RaceTable:
+    """列指向のレーステーブル
+    
+    Attributes:
+        races: 元のレースリスト（行の順序）
+        num_horses: レースごとの頭数 (R,)
+        valid: 実在する馬のフラグ (R, H)
+        number, popularity, predicted_rank: 馬番・人気・予測順位 (R, H)
+        odds, predicted_score, hole_probability: オッズ・予測スコア・穴馬確率 (R, H)
+    """
+    
+    def __init__(self, races: list[Race]) -> None:
+        """初期化
+        
+        Args:
+            races: レースリスト
+        """
+        self.races = races
+        self.num_horses = np.array([len(race.horses) for race in races], dtype=np.int64)
+        width = int(self.num_horses.max()) if len(races) else 0
+        shape = (len(races), width)
+        
+        # 馬ごとの値を1列に並べてから (レース, 馬) の位置に配置する
+        horses = [horse for race in races for horse in race.horses]
+        offsets = np.cumsum(self.num_horses) - self.num_horses
+        rows = np.repeat(np.arange(len(races)), self.num_horses)
+        cols = np.arange(len(horses)) - np.repeat(offsets, self.num_horses)
+        
+        def column(values: list, dtype: type, pad: float | int) -> np.ndarray:
+            array = np.full(shape, pad, dtype=dtype)
+            array[rows, cols] = np.array(values, dtype=dtype)
+            return array
+        
+        self.valid = np.zeros(shape, dtype=bool)
+        self.valid[rows, cols] = True
+        self.number = column([h.number for h in horses], np.int64, 0)
+        self.popularity = column([h.popularity for h in horses], np.int64, _PAD_RANK)
+        self.predicted_rank = column([h.predicted_rank for h in horses], np.int64, _PAD_RANK)
+        self.odds = column([h.odds for h in horses], np.float64, 0.0)
+        self.predicted_score = column([h.predicted_score for h in horses], np.float64, 0.0)
+        self.hole_probability = column([h.hole_probability for h in horses], np.float64, 0.0)
+    
+    def __len__(self) -> int:
+        return len(self.races)
+    
+    @property
+    def width(self) -> int:
+        """最大頭数"""
+        return self.valid.shape[1]
+    
+    def order_by(self, key: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+        """mask の馬を key の昇順に安定ソートした馬の位置 (R, H)
+        
+        sorted() と同じく同値は元の順序を保ち、mask 外の馬は末尾に並ぶ。
+        """
+        mask = self.valid if mask is None else mask
+        return np.lexsort((key, ~mask), axis=1)
+    
+    @cached_property
+    def predicted_order(self) -> np.ndarray:
+        """予測順位順の馬の位置（Race.get_top_predicted と同じ順序）"""
+        return self.order_by(self.predicted_rank)
+    
+    @cached_property
+    def popularity_order(self) -> np.ndarray:
+        """人気順の馬の位置（Race.get_top_by_popularity と同じ順序）"""
+        return self.order_by(self.popularity)
+    
+    def has_duplicate_predicted_rank(self, up_to_rank: int) -> np.ndarray:
+        """レースごとに、指定順位までに予測順位の重複があるか (R,)"""
+        ranks = np.take_along_axis(self.predicted_rank, self.predicted_order, axis=1)
+        duplicated = (ranks[:, 1:] == ranks[:, :-1]) & (ranks[:, :-1] <= up_to_rank)
+        return duplicated.any(axis=1)
+    
+    def top_predicted_safe(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """Race.get_top_predicted_safe(n) の配列版
+        
+        Returns:
+            (予測順位順の馬の位置 (R, H), 対象馬の数 (R,)。重複でスキップするレースは-1)
+        """
+        counts = slice_count(self.num_horses, n)
+        counts[self.has_duplicate_predicted_rank(n)] = -1
+        return self.predicted_order, counts
+
+
+@dataclass
+class TicketArrays:
+    """列指向の馬券リスト（賭け金は未設定）
+    
+    馬券はレース順、同じレース内では per-race の generate_tickets と同じ順序で並ぶ。
+    
+    Attributes:
+        race_index: RaceTable の行 (N,)
+        ticket_type: TICKET_TYPE_CODES のコード (N,)
+        horse_numbers: 馬番 (N, 3)。馬券種別の馬番の数より後ろは0
+        odds: 馬券のオッズ (N,)
+        expected_value: 期待値 (N,)
+        weight: 賭け金の倍率 (N,)
+    """
+    race_index: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    ticket_type: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int8))
+    horse_numbers: np.ndarray = field(default_factory=lambda: np.empty((0, 3), dtype=np.int64))
+    odds: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    expected_value: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    weight: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    
+    def __len__(self) -> int:
+        return len(self.race_index)
+    
+    @classmethod
+    def build(
+        cls,
+        ticket_type: TicketType,
+        race_index: np.ndarray,
+        horse_numbers: np.ndarray,
+        odds: np.ndarray | None = None,
+        expected_value: np.ndarray | None = None
+    ) -> "TicketArrays":
+        """1種類の馬券から作成
+        
+        Args:
+            ticket_type: 馬券種別
+            race_index: RaceTable の行 (N,)
+            horse_numbers: 馬番 (N, 馬番の数)
+            odds: オッズ（省略時は0）
+            expected_value: 期待値（省略時は0）
+        """
+        size = len(race_index)
+        numbers = np.zeros((size, 3), dtype=np.int64)
+        numbers[:, :horse_numbers.shape[1]] = horse_numbers
+        return cls(
+            race_index=np.asarray(race_index, dtype=np.int64),
+            ticket_type=np.full(size, TICKET_TYPE_CODES[ticket_type], dtype=np.int8),
+            horse_numbers=numbers,
+            odds=np.zeros(size) if odds is None else np.asarray(odds, dtype=np.float64),
+            expected_value=(
+                np.zeros(size) if expected_value is None
+                else np.asarray(expected_value, dtype=np.float64)
+            ),
+            weight=np.ones(size),
+        )
+    
+    @classmethod
+    def concat(cls, parts: list["TicketArrays"]) -> "TicketArrays":
+        """複数の馬券リストを連結し、レース順に並べ替え（同じレース内は parts の順）"""
+        merged = cls(**{
+            name: np.concatenate([getattr(cls(), name)] + [getattr(p, name) for p in parts])
+            for name in cls.__dataclass_fields__
+        })
+        return merged.take(np.argsort(merged.race_index, kind="stable"))
+    
+    def take(self, indices: np.ndarray) -> "TicketArrays":
+        """指定した位置の馬券を取り出す"""
+        return TicketArrays(**{
+            name: getattr(self, name)[indices] for name in self.__dataclass_fields__
+        })
+    
+    def split(self, num_races: int) -> list[list[Ticket]]:
+        """レースごとの Ticket のリストに変換"""
+        horse_numbers: list[tuple[int, ...]] = [()] * len(self)
+        for code in np.unique(self.ticket_type).tolist():
+            selected = np.nonzero(self.ticket_type == code)[0]
+            width = TICKET_WIDTHS[TICKET_TYPE_ORDER[code]]
+            numbers = zip(*self.horse_numbers[selected, :width].T.tolist())
+            for index, combo in zip(selected.tolist(), numbers):
+                horse_numbers[index] = combo
+        
+        tickets = [
+            Ticket(TICKET_TYPE_ORDER[code], combo, 0, odds, expected_value, weight)
+            for code, combo, odds, expected_value, weight in zip(
+                self.ticket_type.tolist(), horse_numbers,
+                self.odds.tolist(), self.expected_value.tolist(), self.weight.tolist()
+            )
+        ]
+        # レース順に並んでいるため、レースごとの範囲で切り出す
+        bounds = np.searchsorted(self.race_index, np.arange(num_races + 1)).tolist()
+        return [tickets[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def select_ranked(
+    order: np.ndarray, counts: np.ndarray, mask: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """順序付けた馬の先頭 counts 頭のうち mask を満たす馬（レース順・順序どおり）
+    
+    Args:
+        order: 馬の位置 (R, H)
+        counts: レースごとの対象頭数 (R,)（負ならレースをスキップ）
+        mask: order と同じ並びの条件 (R, H)（省略時は条件なし）
+    
+    Returns:
+        (行, 馬の位置)
+    """
+    selected = np.arange(order.shape[1]) < counts[:, None]
+    if mask is not None:
+        selected &= mask
+    rows, ranks = np.nonzero(selected)
+    return rows, order[rows, ranks]
+
+
+def gather_combinations(
+    table: RaceTable,
+    order: np.ndarray,
+    counts: np.ndarray,
+    combinations_for: Callable[[int], np.ndarray]
+) -> tuple[np.ndarray, np.ndarray]:
+    """対象頭数ごとの組み合わせ表（順位の位置の組）から馬番を取り出す
+    
+    Args:
+        table: レーステーブル
+        order: 順位順の馬の位置 (R, H)
+        counts: レースごとの対象頭数 (R,)（負ならレースをスキップ）
+        combinations_for: 対象頭数 m から順位の位置の組 (K, 馬番の数) を返す関数
+    
+    Returns:
+        (行 (N,), 馬番 (N, 馬番の数))。レース順、同じレース内は組み合わせ表の順
+    """
+    rows_parts, numbers_parts = [], []
+    for m in np.unique(counts[counts >= 0]).tolist():
+        combos = combinations_for(m)
+        if len(combos) == 0:
+            continue
+        rows = np.nonzero(counts == m)[0]
+        positions = order[rows][:, combos]  # (r, K, 馬番の数)
+        numbers = table.number[rows[:, None, None], positions]
+        rows_parts.append(np.repeat(rows, len(combos)))
+        numbers_parts.append(numbers.reshape(-1, combos.shape[1]))
+    if not rows_parts:
+        return np.empty(0, dtype=np.int64), np.empty((0, 1), dtype=np.int64)
+    
+    rows = np.concatenate(rows_parts)
+    numbers = np.concatenate(numbers_parts)
+    order_by_race = np.argsort(rows, kind="stable")
+    return rows[order_by_race], numbers[order_by_race]
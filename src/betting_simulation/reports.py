@@ -10,7 +10,10 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-from betting_simulation.models import SimulationResult
+import numpy as np
+import pandas as pd
+
+from betting_simulation.models import BetLog, SimulationResult
 
 
 class ReportExporter(ABC):
@@ -155,22 +158,19 @@ class CSVExporter(ReportExporter):
 
     def _export_bets(self, result: SimulationResult, path: Path):
         """賭け履歴をCSVでエクスポート"""
-        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerow(["No", "レースID", "券種", "金額", "オッズ", "的中", "払戻金", "損益"])
-            
-            for i, record in enumerate(result.bet_history, 1):
-                profit = record.payout - record.ticket.amount
-                writer.writerow([
-                    i,
-                    record.race.race_id,
-                    str(record.ticket.ticket_type),
-                    record.ticket.amount,
-                    record.ticket.odds,
-                    "○" if record.is_hit else "×",
-                    record.payout,
-                    profit,
-                ])
+        bets = BetLog.coerce(result.bet_history).to_dataframe()
+        
+        table = pd.DataFrame({
+            "No": np.arange(1, len(bets) + 1),
+            "レースID": bets["race_id"],
+            "券種": bets["ticket_type_name"],
+            "金額": bets["amount"],
+            "オッズ": bets["odds"],
+            "的中": np.where(bets["is_hit"], "○", "×"),
+            "払戻金": bets["payout"],
+            "損益": bets["payout"] - bets["amount"],
+        })
+        table.to_csv(path, index=False, encoding='utf-8-sig', lineterminator='\r\n')
     
     def _export_fund_history(self, result: SimulationResult, path: Path):
         """資金推移をCSVでエクスポート"""
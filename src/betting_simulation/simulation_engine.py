@@ -3,29 +3,244 @@
 賭けシミュレーションの実行と結果の集計を行う。
 """
 
+import itertools
 import logging
 import random
-from typing import Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
 
 import numpy as np
 
 from betting_simulation.evaluator import BetEvaluator
-from betting_simulation.fund_manager import FundManager
+from betting_simulation.fund_manager import FundManager, FundManagerGrid
 from betting_simulation.models import (
+    BetLog,
     BetRecord,
     MonteCarloResult,
+    PnLMatrix,
     Race,
     SimulationMetrics,
     SimulationResult,
+    WalkForwardOptimizationResult,
 )
+from betting_simulation.precompute import RaceOutcome, precompute_outcomes
+from betting_simulation.race_index import RaceIndex
 from betting_simulation.strategy import Strategy
+from betting_simulation.ticket_cache import (
+    TicketCache,
+    get_default_cache,
+    set_default_cache,
+)
 
 logger = logging.getLogger(__name__)
 
+# 履歴の記録モード
+# full: bet_history（BetLog）と fund_history を保持
+# summary: fund_history のみ保持
+# none: 履歴を保持しない（最終資金とオンライン集計した指標のみ）
+RECORD_MODES = ("none", "summary", "full")
+
+
+def _validate_record_mode(record: str) -> None:
+    """記録モードのバリデーション"""
+    if record not in RECORD_MODES:
+        raise ValueError(f"Unknown record mode: {record}. Available: {list(RECORD_MODES)}")
+
+
+# 精算の単位
+# ticket: 馬券ごとに精算（レースの馬券はレース開始時の資金で決め、破産は賭けごとに判定）
+# race: レースの全馬券をレース開始時の資金で決め、まとめて精算
+# day: 開催日の全レースの馬券をその日の開始時の資金で決め、まとめて精算
+SETTLEMENT_MODES = ("ticket", "race", "day")
+
+
+def _validate_settlement(settlement: str) -> None:
+    """精算の単位のバリデーション"""
+    if settlement not in SETTLEMENT_MODES:
+        raise ValueError(f"Unknown settlement: {settlement}. Available: {list(SETTLEMENT_MODES)}")
+
+
+def _settlement_groups(outcomes: list[RaceOutcome], settlement: str) -> list[list[RaceOutcome]]:
+    """まとめて精算するレースのグループ（race はレースごと、day は連続する同じ開催日）"""
+    if settlement == "race":
+        return [[outcome] for outcome in outcomes]
+    groups: list[list[RaceOutcome]] = []
+    previous = None
+    for outcome in outcomes:
+        day = (outcome.race.year, outcome.race.kaisai_date)
+        if day != previous:
+            groups.append([])
+            previous = day
+        groups[-1].append(outcome)
+    return groups
+
+
+def _limit_total_stake(amounts: np.ndarray, limit: int, unit: int) -> np.ndarray:
+    """賭け金の累計が limit を超えないよう馬券順に減額（1レースあたりの上限と同じ丸め）"""
+    if int(amounts.sum()) <= limit:
+        return amounts
+    amounts = amounts.copy()
+    total = 0
+    for i, amount in enumerate(amounts.tolist()):
+        if total + amount > limit:
+            amounts[i] = max(0, limit - total) // unit * unit
+        total += int(amounts[i])
+    return amounts
+
+
+def _summarize_distribution(values: np.ndarray) -> dict[str, float]:
+    """試行ごとの値の分布を要約（平均とパーセンタイル）"""
+    values = np.asarray(values, dtype=float)
+    summary = {"mean": float(np.mean(values))}
+    for q in (5, 25, 50, 75, 95):
+        summary[f"p{q}"] = float(np.percentile(values, q))
+    return summary
+
+
+# 固定賭け金のWalk-Forwardで一度に計算する行列の最大要素数（ウィンドウ数×賭け数）
+_WINDOW_BATCH_CELLS = 1 << 21
+# 資金設定の一括再生で一度に計算する行列の最大要素数（設定数×馬券数）
+_BANKROLL_BATCH_CELLS = 1 << 22
+# 資金比率方式の一括再生で、資金を推測してまとめて検証するレース数
+_PROPORTIONAL_CHUNK_RACES = 64
+# 推測した資金の上限（整数への変換で桁あふれしないように）
+_UNLIMITED_GUESS = 1e15
+
+
+def _sliding_min(values: np.ndarray, windows: list[tuple[int, int]]) -> np.ndarray:
+    """ウィンドウ[start, stop)ごとの最小値を単調dequeで計算
+    
+    開始・終了がともに単調非減少なウィンドウ列に対して全体でO(n)。
+    空のウィンドウはinfになる。
+    """
+    items = np.asarray(values, dtype=float).tolist()
+    mins = np.full(len(windows), np.inf)
+    candidates: deque[int] = deque()
+    pushed = 0
+    for w, (start, stop) in enumerate(windows):
+        while pushed < stop:
+            while candidates and items[candidates[-1]] >= items[pushed]:
+                candidates.pop()
+            candidates.append(pushed)
+            pushed += 1
+        while candidates and candidates[0] < start:
+            candidates.popleft()
+        if candidates:
+            mins[w] = items[candidates[0]]
+    return mins
+
+
+# Walk-Forwardのワーカープロセスごとの共有状態（初期化時に1回だけ受け取る）
+_walk_forward_state: dict = {}
+
+
+def _init_walk_forward_worker(
+    engine: "SimulationEngine",
+    outcomes: list[RaceOutcome],
+    initial_fund: int,
+    record: str
+) -> None:
+    """Walk-Forwardワーカーの初期化"""
+    _walk_forward_state["engine"] = engine
+    _walk_forward_state["outcomes"] = outcomes
+    _walk_forward_state["initial_fund"] = initial_fund
+    _walk_forward_state["record"] = record
+
+
+def _run_walk_forward_window(bounds: tuple[int, int]) -> SimulationResult:
+    """共有された事前計算結果の[start, stop)区間を再生"""
+    start, stop = bounds
+    engine = _walk_forward_state["engine"]
+    result, _ = engine._replay(
+        _walk_forward_state["outcomes"][start:stop],
+        _walk_forward_state["initial_fund"],
+        None,
+        _walk_forward_state["record"]
+    )
+    return result
+
+
+# パラメータグリッドのキーの接頭辞（"strategy.top_n" など）
+PARAM_TARGETS = ("strategy", "fund_manager")
+
+# Walk-Forward最適化の目的指標（大きいほど良いもの）
+OPTIMIZE_OBJECTIVES = ("roi", "profit", "hit_rate", "sharpe_ratio")
+
+
+def expand_param_grid(param_grid: dict[str, list[Any]]) -> list[dict[str, dict[str, Any]]]:
+    """パラメータグリッドを組み合わせのリストに展開
+    
+    Args:
+        param_grid: {"strategy.top_n": [1, 2], "fund_manager.bet_amount": [100, 200]} の形式
+    
+    Returns:
+        [{"strategy": {...}, "fund_manager": {...}}, ...]（グリッドの定義順）
+    
+    Raises:
+        ValueError: キーの接頭辞が不正な場合
+    """
+    keys = list(param_grid.keys())
+    for key in keys:
+        target = key.split(".", 1)[0]
+        if "." not in key or target not in PARAM_TARGETS:
+            raise ValueError(f"Unknown parameter target: {key}. Available: {list(PARAM_TARGETS)}")
+    
+    combos = []
+    for values in itertools.product(*(param_grid[key] for key in keys)):
+        combo: dict[str, dict[str, Any]] = {target: {} for target in PARAM_TARGETS}
+        for key, value in zip(keys, values):
+            target, name = key.split(".", 1)
+            combo[target][name] = value
+        combos.append(combo)
+    return combos
+
+
+# Walk-Forward最適化のワーカープロセスごとの共有状態
+_optimize_state: dict = {}
+
+
+def _init_optimize_worker(
+    engines: list["SimulationEngine"],
+    outcome_slots: list[int],
+    outcomes: list[list[RaceOutcome]],
+    initial_fund: int,
+    objective: str
+) -> None:
+    """Walk-Forward最適化ワーカーの初期化"""
+    _optimize_state["engines"] = engines
+    _optimize_state["outcome_slots"] = outcome_slots
+    _optimize_state["outcomes"] = outcomes
+    _optimize_state["initial_fund"] = initial_fund
+    _optimize_state["objective"] = objective
+
+
+def _score_train_window(bounds: tuple[int, int]) -> tuple[int, float]:
+    """学習区間[start, stop)で全組み合わせを評価し、最良の組み合わせと値を返す
+    
+    同点の場合はグリッドの定義順で先のものを選ぶ。
+    """
+    start, stop = bounds
+    best_index, best_score = 0, float("-inf")
+    for i, engine in enumerate(_optimize_state["engines"]):
+        outcomes = _optimize_state["outcomes"][_optimize_state["outcome_slots"][i]]
+        result, _ = engine._replay(
+            outcomes[start:stop], _optimize_state["initial_fund"], None, "none"
+        )
+        score = getattr(result.metrics, _optimize_state["objective"])
+        if score > best_score:
+            best_index, best_score = i, score
+    return best_index, best_score
+
 
 class MetricsCalculator:
     """評価指標計算"""
     
+    # Go/No-Go判定基準（要件定義書より）
+    GO_MIN_ROI = 100  # ROI（%）の下限
+    GO_MAX_DRAWDOWN = 30  # 最大DD（%）の上限
+    GO_MIN_HIT_RATE = 10  # 的中率（%）の下限
+    
     @staticmethod
     def calculate(result: SimulationResult) -> SimulationMetrics:
         """シミュレーション結果から評価指標を計算"""
@@ -34,6 +249,10 @@ class MetricsCalculator:
         if not result.bet_history:
             return metrics
         
+        # 列指向の履歴は配列演算で計算
+        if isinstance(result.bet_history, BetLog):
+            return MetricsCalculator._calculate_bet_log(result)
+        
         # 基本統計
         metrics.total_bets = len(result.bet_history)
         metrics.total_hits = sum(1 for b in result.bet_history if b.is_hit)
@@ -80,6 +299,228 @@ class MetricsCalculator:
         
         return metrics
     
+    @staticmethod
+    def _calculate_bet_log(result: SimulationResult) -> SimulationMetrics:
+        """BetLogの列から評価指標を計算"""
+        log = result.bet_history
+        fund_history = np.asarray(result.fund_history, dtype=np.int64)
+        
+        batch = MetricsCalculator.calculate_batch(
+            fund_history[np.newaxis, :] if len(fund_history) else None,
+            log.column("amount")[np.newaxis, :],
+            log.column("payout")[np.newaxis, :],
+            log.column("is_hit")[np.newaxis, :],
+        )
+        metrics = MetricsCalculator._metrics_from_batch(batch, 0)
+        
+        # レース数（重複除去）
+        race_index = np.unique(log.column("race_index"))
+        metrics.total_races = len({log.races[i].race_id for i in race_index})
+        
+        return metrics
+    
+    @staticmethod
+    def calculate_arrays(
+        fund_history: np.ndarray,
+        amounts: np.ndarray,
+        payouts: np.ndarray,
+        is_hit: np.ndarray
+    ) -> SimulationMetrics:
+        """1回分のシミュレーションの配列から評価指標を計算
+        
+        Args:
+            fund_history: 資金推移（先頭は初期資金、長さは賭け数+1）
+            amounts: 各賭けの賭け金
+            payouts: 各賭けの払戻金
+            is_hit: 各賭けの的中フラグ
+        
+        Returns:
+            評価指標（total_racesはレース情報がないため0のまま）
+        """
+        if len(amounts) == 0:
+            return SimulationMetrics()
+        
+        batch = MetricsCalculator.calculate_batch(
+            np.asarray(fund_history)[np.newaxis, :],
+            np.asarray(amounts)[np.newaxis, :],
+            np.asarray(payouts)[np.newaxis, :],
+            np.asarray(is_hit)[np.newaxis, :],
+        )
+        return MetricsCalculator._metrics_from_batch(batch, 0)
+    
+    @staticmethod
+    def calculate_batch(
+        fund_paths: np.ndarray | None,
+        amounts: np.ndarray,
+        payouts: np.ndarray,
+        is_hit: np.ndarray,
+        lengths: np.ndarray | None = None
+    ) -> dict[str, np.ndarray]:
+        """複数試行の評価指標を一括計算
+        
+        試行×賭けの行列から、試行ごとの指標を配列で返す。
+        破産などで賭け数が試行ごとに異なる場合は lengths で有効な列数を指定する
+        （それ以降の列は無視される）。
+        
+        Args:
+            fund_paths: 資金推移の行列（試行×(賭け数+1)、先頭列は初期資金）。Noneならドローダウンを計算しない
+            amounts: 賭け金の行列（試行×賭け数）
+            payouts: 払戻金の行列（試行×賭け数）
+            is_hit: 的中フラグの行列（試行×賭け数）
+            lengths: 各試行の有効な賭け数（省略時は全列）
+        
+        Returns:
+            {指標名: 試行ごとの値の配列}
+        """
+        amounts = np.asarray(amounts, dtype=np.int64)
+        payouts = np.asarray(payouts, dtype=np.int64)
+        is_hit = np.asarray(is_hit, dtype=bool)
+        num_trials, num_bets = amounts.shape
+        
+        if lengths is None:
+            lengths = np.full(num_trials, num_bets, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        valid = np.arange(num_bets)[np.newaxis, :] < lengths[:, np.newaxis]
+        
+        # 基本統計
+        total_bets = lengths
+        total_hits = np.count_nonzero(is_hit & valid, axis=1)
+        total_invested = np.where(valid, amounts, 0).sum(axis=1)
+        total_payout = np.where(valid, payouts, 0).sum(axis=1)
+        
+        hit_rate = np.zeros(num_trials)
+        np.divide(total_hits * 100, total_bets, out=hit_rate, where=total_bets > 0)
+        roi = np.zeros(num_trials)
+        np.divide(total_payout * 100, total_invested, out=roi, where=total_invested > 0)
+        
+        # 最大ドローダウン
+        if fund_paths is not None:
+            fund_paths = np.asarray(fund_paths, dtype=np.int64)
+            # 有効範囲以降は最終資金で埋める（ドローダウンに影響しない）
+            steps = np.arange(fund_paths.shape[1])[np.newaxis, :]
+            last = np.minimum(lengths, fund_paths.shape[1] - 1)
+            last_funds = fund_paths[np.arange(num_trials), last]
+            fund_paths = np.where(steps <= last[:, np.newaxis], fund_paths, last_funds[:, np.newaxis])
+            max_dd, dd_period = MetricsCalculator._max_drawdown_array(fund_paths)
+        else:
+            max_dd = np.zeros(num_trials)
+            dd_period = np.zeros(num_trials, dtype=np.int64)
+        
+        # 連勝・連敗
+        max_wins = MetricsCalculator._longest_runs(is_hit & valid)
+        max_losses = MetricsCalculator._longest_runs(~is_hit & valid)
+        
+        # シャープレシオ
+        returns_valid = valid & (amounts > 0)
+        returns = np.zeros(amounts.shape)
+        np.divide(payouts - amounts, amounts, out=returns, where=returns_valid)
+        sharpe = MetricsCalculator._sharpe_ratio_array(returns, returns_valid)
+        
+        batch = {
+            "total_bets": total_bets,
+            "total_hits": total_hits,
+            "total_invested": total_invested,
+            "total_payout": total_payout,
+            "hit_rate": hit_rate,
+            "roi": roi,
+            "profit": total_payout - total_invested,
+            "max_drawdown": max_dd,
+            "max_drawdown_period": dd_period,
+            "max_consecutive_wins": max_wins,
+            "max_consecutive_losses": max_losses,
+            "sharpe_ratio": sharpe,
+        }
+        batch["is_go"] = (
+            (roi >= MetricsCalculator.GO_MIN_ROI) &
+            (max_dd <= MetricsCalculator.GO_MAX_DRAWDOWN) &
+            (hit_rate >= MetricsCalculator.GO_MIN_HIT_RATE)
+        )
+        
+        return batch
+    
+    @staticmethod
+    def _metrics_from_batch(batch: dict[str, np.ndarray], index: int) -> SimulationMetrics:
+        """一括計算結果の1試行分をSimulationMetricsに変換"""
+        metrics = SimulationMetrics()
+        if batch["total_bets"][index] == 0:
+            return metrics
+        
+        metrics.total_bets = int(batch["total_bets"][index])
+        metrics.total_hits = int(batch["total_hits"][index])
+        metrics.total_invested = int(batch["total_invested"][index])
+        metrics.total_payout = int(batch["total_payout"][index])
+        metrics.hit_rate = float(batch["hit_rate"][index])
+        metrics.roi = float(batch["roi"][index])
+        metrics.profit = int(batch["profit"][index])
+        metrics.max_drawdown = float(batch["max_drawdown"][index])
+        metrics.max_drawdown_period = int(batch["max_drawdown_period"][index])
+        metrics.max_consecutive_wins = int(batch["max_consecutive_wins"][index])
+        metrics.max_consecutive_losses = int(batch["max_consecutive_losses"][index])
+        metrics.sharpe_ratio = float(batch["sharpe_ratio"][index])
+        metrics.is_go = bool(batch["is_go"][index])
+        return metrics
+    
+    @staticmethod
+    def _max_drawdown_array(fund_paths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """最大ドローダウンと期間を行ごとに計算（_calculate_max_drawdownの配列版）
+        
+        ピークは np.maximum.accumulate で求める。期間は「直近の高値更新からの経過数」で、
+        高値未更新の区間（ピーク以下のラン）の長さに相当する。
+        """
+        fund_paths = np.atleast_2d(fund_paths)
+        num_rows, num_steps = fund_paths.shape
+        if num_steps == 0:
+            return np.zeros(num_rows), np.zeros(num_rows, dtype=np.int64)
+        
+        peaks = np.maximum.accumulate(fund_paths, axis=1)
+        
+        # 高値更新点（直前までのピークを上回った点）
+        new_high = np.zeros(fund_paths.shape, dtype=bool)
+        new_high[:, 1:] = fund_paths[:, 1:] > peaks[:, :-1]
+        
+        steps = np.arange(num_steps)
+        last_high = np.maximum.accumulate(np.where(new_high, steps, -1), axis=1)
+        periods = steps - last_high
+        
+        # ループ版と同じく (peak - fund) / peak * 100 の順で計算
+        drawdowns = np.zeros(fund_paths.shape)
+        np.divide(peaks - fund_paths, peaks, out=drawdowns, where=peaks > 0)
+        drawdowns *= 100
+        
+        worst = np.argmax(drawdowns, axis=1)
+        rows = np.arange(num_rows)
+        max_dd = drawdowns[rows, worst]
+        dd_period = np.where(max_dd > 0, periods[rows, worst], 0)
+        
+        return max_dd, dd_period
+    
+    @staticmethod
+    def _longest_runs(mask: np.ndarray) -> np.ndarray:
+        """行ごとにTrueが連続する最長の長さを計算（ランレングス）"""
+        mask = np.atleast_2d(mask)
+        if mask.shape[1] == 0:
+            return np.zeros(mask.shape[0], dtype=np.int64)
+        counts = np.cumsum(mask, axis=1)
+        # Falseの位置で累積数をリセット
+        resets = np.maximum.accumulate(np.where(mask, 0, counts), axis=1)
+        return (counts - resets).max(axis=1)
+    
+    @staticmethod
+    def _sharpe_ratio_array(returns: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """行ごとのシャープレシオを計算（_calculate_sharpe_ratioの配列版）"""
+        n = valid.sum(axis=1)
+        mean = np.zeros(len(n))
+        np.divide(np.where(valid, returns, 0).sum(axis=1), n, out=mean, where=n > 0)
+        
+        deviations = np.where(valid, returns - mean[:, np.newaxis], 0)
+        variance = np.zeros(len(n))
+        np.divide((deviations ** 2).sum(axis=1), n - 1, out=variance, where=n >= 2)
+        std = np.sqrt(variance)
+        
+        sharpe = np.zeros(len(n))
+        np.divide(mean, std, out=sharpe, where=(n >= 2) & (std > 0))
+        return sharpe
+    
     @staticmethod
     def _calculate_max_drawdown(fund_history: list[int]) -> tuple[float, int]:
         """最大ドローダウンを計算"""
@@ -144,12 +585,218 @@ class MetricsCalculator:
         # 判定基準（要件定義書より）
         # ROI >= 100% AND 最大DD <= 30% AND 的中率 >= 10%
         return (
-            metrics.roi >= 100 and 
-            metrics.max_drawdown <= 30 and 
-            metrics.hit_rate >= 10
+            metrics.roi >= MetricsCalculator.GO_MIN_ROI and 
+            metrics.max_drawdown <= MetricsCalculator.GO_MAX_DRAWDOWN and 
+            metrics.hit_rate >= MetricsCalculator.GO_MIN_HIT_RATE
         )
 
 
+class MetricsAccumulator:
+    """評価指標のオンライン集計
+    
+    エンジンが賭けごとに更新し、シミュレーション終了時点で指標を確定する。
+    履歴（bet_history / fund_history）を保持しなくても
+    MetricsCalculator.calculate と同じ指標が得られる。
+    """
+    
+    def __init__(self, initial_fund: int) -> None:
+        """初期化
+        
+        Args:
+            initial_fund: 初期資金（ドローダウン計算の起点）
+        """
+        # 基本統計
+        self.total_races = 0
+        self.total_bets = 0
+        self.total_hits = 0
+        self.total_invested = 0
+        self.total_payout = 0
+        
+        # ドローダウン
+        self.max_drawdown = 0.0
+        self.max_drawdown_period = 0
+        self._peak_fund = initial_fund
+        self._dd_period = 0
+        
+        # 最低資金・破産ライン到達
+        self.min_fund = initial_fund
+        self.ruined_at_bet: int | None = None  # 破産ラインを下回った時点の賭け数
+        
+        # 連勝・連敗
+        self.max_consecutive_wins = 0
+        self.max_consecutive_losses = 0
+        self._current_wins = 0
+        self._current_losses = 0
+        
+        # シャープレシオ（Welford法による平均・分散）
+        self._return_count = 0
+        self._return_mean = 0.0
+        self._return_m2 = 0.0
+        
+        self._race_pending = False
+        
+        # fund_history の先頭（初期資金）と同じ扱いにする
+        self._update_fund(initial_fund)
+    
+    def begin_race(self) -> None:
+        """新しいレースの開始を通知（賭けが1件以上あればレース数に計上）"""
+        self._race_pending = True
+    
+    def add_bet(self, amount: int, payout: int, is_hit: bool, fund_after: int) -> None:
+        """1件の賭け結果を反映
+        
+        Args:
+            amount: 賭け金
+            payout: 払戻金
+            is_hit: 的中フラグ
+            fund_after: 賭け後資金
+        """
+        if self._race_pending:
+            self.total_races += 1
+            self._race_pending = False
+        
+        self.total_bets += 1
+        self.total_invested += amount
+        self.total_payout += payout
+        
+        # 連勝・連敗
+        if is_hit:
+            self.total_hits += 1
+            self._current_wins += 1
+            self._current_losses = 0
+            if self._current_wins > self.max_consecutive_wins:
+                self.max_consecutive_wins = self._current_wins
+        else:
+            self._current_losses += 1
+            self._current_wins = 0
+            if self._current_losses > self.max_consecutive_losses:
+                self.max_consecutive_losses = self._current_losses
+        
+        # リターン（Welford法）
+        if amount > 0:
+            r = (payout - amount) / amount
+            self._return_count += 1
+            delta = r - self._return_mean
+            self._return_mean += delta / self._return_count
+            self._return_m2 += delta * (r - self._return_mean)
+        
+        self._update_fund(fund_after)
+    
+    def add_bets(
+        self, amounts: np.ndarray, payouts: np.ndarray, is_hit: np.ndarray, fund_after: int
+    ) -> None:
+        """まとめて精算した複数の賭け結果を反映（add_bet を順に呼んだのと同じ集計）
+        
+        精算までの途中の資金はないため、資金推移は精算後の資金で賭け数分進む。
+        
+        Args:
+            amounts: 賭け金
+            payouts: 払戻金
+            is_hit: 的中フラグ
+            fund_after: 精算後資金
+        """
+        count = len(amounts)
+        if count == 0:
+            return
+        if self._race_pending:
+            self.total_races += 1
+            self._race_pending = False
+        
+        amounts = np.asarray(amounts, dtype=np.int64)
+        payouts = np.asarray(payouts, dtype=np.int64)
+        is_hit = np.asarray(is_hit, dtype=bool)
+        self.total_bets += count
+        self.total_hits += int(np.count_nonzero(is_hit))
+        self.total_invested += int(amounts.sum())
+        self.total_payout += int(payouts.sum())
+        
+        # 連勝・連敗（直前の賭けまでの連続数に続けて数える）
+        steps = np.arange(count)
+        last_miss = np.maximum.accumulate(np.where(is_hit, -1, steps))
+        last_hit = np.maximum.accumulate(np.where(is_hit, steps, -1))
+        wins = np.where(last_miss < 0, steps + 1 + self._current_wins, steps - last_miss)
+        losses = np.where(last_hit < 0, steps + 1 + self._current_losses, steps - last_hit)
+        self._current_wins = int(wins[-1])
+        self._current_losses = int(losses[-1])
+        self.max_consecutive_wins = max(self.max_consecutive_wins, int(wins.max()))
+        self.max_consecutive_losses = max(self.max_consecutive_losses, int(losses.max()))
+        
+        # リターン（Welford法の平均・偏差平方和をまとめて合成）
+        returns = (payouts - amounts)[amounts > 0] / amounts[amounts > 0]
+        if len(returns):
+            total = self._return_count + len(returns)
+            mean = float(returns.mean())
+            delta = mean - self._return_mean
+            self._return_m2 += (
+                float(((returns - mean) ** 2).sum())
+                + delta ** 2 * self._return_count * len(returns) / total
+            )
+            self._return_mean += delta * len(returns) / total
+            self._return_count = total
+        
+        # 同じ資金が賭け数分続く（2点目以降はドローダウンの期間だけが延びる）
+        self._update_fund(fund_after)
+        self._dd_period += count - 1
+    
+    def mark_ruin(self) -> None:
+        """破産ラインを下回ってシミュレーションが停止したことを通知"""
+        self.ruined_at_bet = self.total_bets
+    
+    def _update_fund(self, fund: int) -> None:
+        """資金推移1点分のドローダウン更新（_calculate_max_drawdownと同じ規則）"""
+        if fund < self.min_fund:
+            self.min_fund = fund
+        
+        if fund > self._peak_fund:
+            self._peak_fund = fund
+            self._dd_period = 0
+        else:
+            self._dd_period += 1
+            peak = self._peak_fund
+            drawdown = (peak - fund) / peak * 100 if peak > 0 else 0
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+                self.max_drawdown_period = self._dd_period
+    
+    @property
+    def sharpe_ratio(self) -> float:
+        """現時点のシャープレシオ"""
+        if self._return_count < 2:
+            return 0.0
+        std_return = (self._return_m2 / (self._return_count - 1)) ** 0.5
+        if std_return == 0:
+            return 0.0
+        return self._return_mean / std_return
+    
+    def to_metrics(self) -> SimulationMetrics:
+        """集計結果からSimulationMetricsを作成"""
+        metrics = SimulationMetrics()
+        
+        if self.total_bets == 0:
+            return metrics
+        
+        metrics.total_races = self.total_races
+        metrics.total_bets = self.total_bets
+        metrics.total_hits = self.total_hits
+        metrics.total_invested = self.total_invested
+        metrics.total_payout = self.total_payout
+        
+        metrics.hit_rate = (self.total_hits / self.total_bets) * 100
+        if self.total_invested > 0:
+            metrics.roi = (self.total_payout / self.total_invested) * 100
+        metrics.profit = self.total_payout - self.total_invested
+        
+        metrics.max_drawdown = self.max_drawdown
+        metrics.max_drawdown_period = self.max_drawdown_period
+        metrics.max_consecutive_wins = self.max_consecutive_wins
+        metrics.max_consecutive_losses = self.max_consecutive_losses
+        metrics.sharpe_ratio = self.sharpe_ratio
+        
+        metrics.is_go = MetricsCalculator._evaluate_go_nogo(metrics)
+        
+        return metrics
+
+
 class SimulationEngine:
     """シミュレーションエンジン"""
     
@@ -157,7 +804,8 @@ class SimulationEngine:
         self,
         strategy: Strategy,
         fund_manager: FundManager,
-        evaluator: BetEvaluator | None = None
+        evaluator: BetEvaluator | None = None,
+        settlement: str = "ticket"
     ) -> None:
         """初期化
         
@@ -165,16 +813,23 @@ class SimulationEngine:
             strategy: 賭け戦略
             fund_manager: 資金管理
             evaluator: 的中判定（省略時はデフォルト）
+            settlement: 精算の単位（"ticket" | "race" | "day"）
+        
+        Raises:
+            ValueError: 未知の精算の単位の場合
         """
+        _validate_settlement(settlement)
         self.strategy = strategy
         self.fund_manager = fund_manager
         self.evaluator = evaluator or BetEvaluator()
+        self.settlement = settlement
     
     def run_simple(
         self, 
         races: list[Race], 
         initial_fund: int,
-        bankruptcy_threshold: int | None = None
+        bankruptcy_threshold: int | None = None,
+        record: str = "full"
     ) -> SimulationResult:
         """シンプルシミュレーションを実行
         
@@ -184,69 +839,111 @@ class SimulationEngine:
             races: レースリスト
             initial_fund: 初期資金
             bankruptcy_threshold: 破産ライン（この金額を下回ったら停止）
+            record: 履歴の記録モード（"none" | "summary" | "full"）
             
         Returns:
             シミュレーション結果
+        
+        Raises:
+            ValueError: 未知の記録モードの場合
+        """
+        result, _ = self._run(races, initial_fund, bankruptcy_threshold, record)
+        return result
+    
+    def _run(
+        self,
+        races: list[Race],
+        initial_fund: int,
+        bankruptcy_threshold: int | None,
+        record: str
+    ) -> tuple[SimulationResult, MetricsAccumulator]:
+        """シミュレーション本体（オンライン集計器も返す）"""
+        _validate_record_mode(record)
+        outcomes = precompute_outcomes(self.strategy, self.evaluator, races)
+        return self._replay(outcomes, initial_fund, bankruptcy_threshold, record)
+    
+    def _replay(
+        self,
+        outcomes: list[RaceOutcome],
+        initial_fund: int,
+        bankruptcy_threshold: int | None,
+        record: str
+    ) -> tuple[SimulationResult, MetricsAccumulator]:
+        """事前計算済みの的中結果に資金管理を適用して再生
+        
+        馬券と的中判定は共有されるため、ここでは馬券を変更しない。
         """
+        _validate_record_mode(record)
+        keep_bets = record == "full"
+        keep_funds = record != "none"
+        
         # 破産ラインの決定（指定がなければ最小賭け金を使用）
         if bankruptcy_threshold is None:
             bankruptcy_threshold = self.fund_manager.constraints.min_bet
         
         current_fund = initial_fund
-        bet_history: list[BetRecord] = []
-        fund_history: list[int] = [initial_fund]
+        bet_history: BetLog | list[BetRecord] = BetLog() if keep_bets else []
+        fund_history: list[int] = [initial_fund] if keep_funds else []
+        accumulator = MetricsAccumulator(initial_fund)
         
         self.fund_manager.set_fund(current_fund)
         
-        for race in races:
-            # 馬券生成
-            tickets = self.strategy.generate_tickets(race)
-            
-            if not tickets:
-                continue
-            
-            # 賭け金計算
-            amounts = self.fund_manager.calculate_bet_amounts(tickets)
-            
-            for ticket, amount in zip(tickets, amounts):
-                if amount <= 0:
-                    continue
-                
-                ticket.amount = amount
-                fund_before = current_fund
-                
-                # 賭け金を引く
-                current_fund -= amount
+        if self.settlement != "ticket":
+            current_fund = self._replay_settled(
+                outcomes, current_fund, bankruptcy_threshold,
+                bet_history, fund_history, accumulator, keep_bets, keep_funds
+            )
+        else:
+            for outcome in outcomes:
+                race = outcome.race
+                tickets = outcome.tickets
                 
-                # 的中判定
-                is_hit, payout = self.evaluator.evaluate(ticket, race)
+                if not tickets:
+                    continue
                 
-                # 払戻を加算
-                current_fund += payout
+                accumulator.begin_race()
                 
-                # 記録
-                record = BetRecord(
-                    race=race,
-                    ticket=ticket,
-                    is_hit=is_hit,
-                    payout=payout,
-                    fund_before=fund_before,
-                    fund_after=current_fund
-                )
-                bet_history.append(record)
-                fund_history.append(current_fund)
+                # 賭け金計算
+                amounts = self.fund_manager.calculate_bet_amounts(tickets)
                 
-                # 資金更新
-                self.fund_manager.set_fund(current_fund)
+                for ticket, amount, is_hit, odds in zip(
+                    tickets, amounts, outcome.hits, outcome.odds
+                ):
+                    if amount <= 0:
+                        continue
+                    
+                    fund_before = current_fund
+                    
+                    # 賭け金を引く
+                    current_fund -= amount
+                    
+                    # 払戻計算（的中判定は事前計算済み）
+                    payout = self.evaluator.payout(amount, odds) if is_hit else 0
+                    
+                    # 払戻を加算
+                    current_fund += payout
+                    
+                    # 記録
+                    if keep_bets:
+                        bet_history.append(
+                            race, ticket, amount, is_hit, payout, fund_before, current_fund
+                        )
+                    if keep_funds:
+                        fund_history.append(current_fund)
+                    accumulator.add_bet(amount, payout, is_hit, current_fund)
+                    
+                    # 資金更新
+                    self.fund_manager.set_fund(current_fund)
+                    
+                    # 破産チェック
+                    if current_fund < bankruptcy_threshold:
+                        logger.warning(f"Bankruptcy! Fund {current_fund} < threshold {bankruptcy_threshold}. Stopping simulation.")
+                        accumulator.mark_ruin()
+                        break
                 
-                # 破産チェック
                 if current_fund < bankruptcy_threshold:
-                    logger.warning(f"Bankruptcy! Fund {current_fund} < threshold {bankruptcy_threshold}. Stopping simulation.")
                     break
             
-            if current_fund < bankruptcy_threshold:
-                break
-        
         # 結果作成
         result = SimulationResult(
             initial_fund=initial_fund,
@@ -255,22 +952,102 @@ class SimulationEngine:
             fund_history=fund_history
         )
         
-        # 評価指標計算
-        result.metrics = MetricsCalculator.calculate(result)
+        # 評価指標（賭けごとにオンライン集計済み）
+        result.metrics = accumulator.to_metrics()
         
-        return result
+        return result, accumulator
+    
+    def _replay_settled(
+        self,
+        outcomes: list[RaceOutcome],
+        current_fund: int,
+        bankruptcy_threshold: int,
+        bet_history: BetLog | list[BetRecord],
+        fund_history: list[int],
+        accumulator: MetricsAccumulator,
+        keep_bets: bool,
+        keep_funds: bool
+    ) -> int:
+        """レース・開催日ごとにまとめて精算する再生（_replay の settlement が ticket 以外）
+        
+        グループの全馬券をグループ開始時の資金で決め、払戻を配列でまとめて計算して
+        1回で精算する。賭け金の合計はグループ開始時の資金を超えないよう馬券順に減額する。
+        破産はグループの精算後に判定する。
+        
+        Returns:
+            最終資金
+        """
+        for group in _settlement_groups(outcomes, self.settlement):
+            sized = [
+                (outcome, np.asarray(self.fund_manager.calculate_bet_amounts(outcome.tickets)))
+                for outcome in group if outcome.tickets
+            ]
+            if not sized:
+                continue
+            amounts = np.concatenate([amounts for _, amounts in sized]).astype(np.int64)
+            # レースごとに決めた賭け金の合計をグループ開始時の資金までに抑える
+            amounts = _limit_total_stake(
+                amounts, current_fund, self.fund_manager.constraints.bet_unit
+            )
+            if not (amounts > 0).any():
+                continue
+            hits = np.concatenate([np.asarray(outcome.hits, dtype=bool) for outcome, _ in sized])
+            odds = np.concatenate([np.asarray(outcome.odds, dtype=float) for outcome, _ in sized])
+            # BetEvaluator.payout の配列版
+            payouts = np.where(hits, (amounts * odds).astype(np.int64), 0)
+            
+            fund_before = current_fund
+            placed = amounts > 0
+            current_fund += int(payouts[placed].sum() - amounts[placed].sum())
+            
+            start = 0
+            for outcome, race_amounts in sized:
+                stop = start + len(race_amounts)
+                race_placed = np.flatnonzero(placed[start:stop])
+                if len(race_placed):
+                    accumulator.begin_race()
+                    accumulator.add_bets(
+                        amounts[start:stop][race_placed], payouts[start:stop][race_placed],
+                        hits[start:stop][race_placed], current_fund
+                    )
+                    if keep_bets:
+                        for i in race_placed.tolist():
+                            bet_history.append(
+                                outcome.race, outcome.tickets[i], int(amounts[start + i]),
+                                bool(hits[start + i]), int(payouts[start + i]),
+                                fund_before, current_fund
+                            )
+                start = stop
+            if keep_funds:
+                fund_history.extend([current_fund] * int(placed.sum()))
+            
+            self.fund_manager.set_fund(current_fund)
+            
+            # 破産チェック（精算後）
+            if current_fund < bankruptcy_threshold:
+                logger.warning(
+                    f"Bankruptcy! Fund {current_fund} < threshold {bankruptcy_threshold}. "
+                    f"Stopping simulation."
+                )
+                accumulator.mark_ruin()
+                break
+        
+        return current_fund
     
     def run_monte_carlo(
         self,
         races: list[Race],
         initial_fund: int,
         num_trials: int = 10000,
-        random_seed: Optional[int] = None,
-        bankruptcy_threshold: int | None = None
+        random_seed: int | None = None,
+        bankruptcy_threshold: int | None = None,
+        record: str = "none"
     ) -> MonteCarloResult:
         """モンテカルロシミュレーションを実行
         
         レース順序をシャッフルして複数回シミュレーション。
+        資金比率方式（proportional_stake）で record="none" の場合は、初期資金が破産ライン
+        以上なら試行をまとめて配列で再生する（_ProportionalReplay。結果は試行ごとの再生と同じ）。
         
         Args:
             races: レースリスト
@@ -278,25 +1055,85 @@ class SimulationEngine:
             num_trials: 試行回数
             random_seed: 乱数シード（再現性用）
             bankruptcy_threshold: 破産ライン（この金額を下回ったら停止）
+            record: 各試行の履歴記録モード（最終資金のみ使うため既定は"none"）
             
         Returns:
             モンテカルロ結果
         """
+        _validate_record_mode(record)
+        
         if random_seed is not None:
             random.seed(random_seed)
             np.random.seed(random_seed)
         
         final_funds: list[int] = []
         
-        for trial in range(num_trials):
+        # 試行ごとの指標（スカラーのみ保持し、資金推移は保持しない）
+        max_drawdowns = np.zeros(num_trials)
+        max_losses = np.zeros(num_trials, dtype=np.int64)
+        min_funds = np.zeros(num_trials, dtype=np.int64)
+        sharpe_ratios = np.zeros(num_trials)
+        rois = np.zeros(num_trials)
+        hit_rates = np.zeros(num_trials)
+        ruined_at = np.full(num_trials, -1, dtype=np.int64)
+        
+        # 馬券と的中判定は順序に依存しないので1回だけ計算
+        outcomes = precompute_outcomes(self.strategy, self.evaluator, races)
+        
+        threshold = (
+            bankruptcy_threshold if bankruptcy_threshold is not None
+            else self.fund_manager.constraints.min_bet
+        )
+        # 初期資金が破産ラインを下回る場合、_replay は賭けのないレースでも停止するため
+        # 一括再生を使わない
+        if (
+            record == "none" and self.settlement == "ticket"
+            and self.fund_manager.proportional_stake
+            and self.fund_manager.constraints.min_bet > 0
+            and initial_fund >= threshold
+        ):
+            # 資金比率方式は試行をまとめて配列で再生（レースの順序は逐次版と同じ乱数で決める）
+            replay = _ProportionalReplay(outcomes, self.fund_manager, threshold)
+            for start in range(0, num_trials, replay.trials_per_batch):
+                stop = min(start + replay.trials_per_batch, num_trials)
+                orders = []
+                for _ in range(start, stop):
+                    order = list(range(len(outcomes)))
+                    random.shuffle(order)
+                    orders.append(order)
+                funds, batch, batch_min_funds, batch_ruined_at = replay.replay(
+                    np.array(orders, dtype=np.int64).reshape(stop - start, len(outcomes)),
+                    initial_fund
+                )
+                final_funds.extend(funds.tolist())
+                max_drawdowns[start:stop] = batch["max_drawdown"]
+                max_losses[start:stop] = batch["max_consecutive_losses"]
+                min_funds[start:stop] = batch_min_funds
+                sharpe_ratios[start:stop] = batch["sharpe_ratio"]
+                rois[start:stop] = batch["roi"]
+                hit_rates[start:stop] = batch["hit_rate"]
+                ruined_at[start:stop] = batch_ruined_at
+                logger.info(f"Monte Carlo progress: {stop}/{num_trials}")
+        
+        for trial in range(len(final_funds), num_trials):
             # レースをシャッフル
-            shuffled_races = races.copy()
-            random.shuffle(shuffled_races)
+            shuffled = outcomes.copy()
+            random.shuffle(shuffled)
             
             # シミュレーション実行
-            result = self.run_simple(shuffled_races, initial_fund, bankruptcy_threshold)
+            result, acc = self._replay(shuffled, initial_fund, bankruptcy_threshold, record)
             final_funds.append(result.final_fund)
             
+            metrics = result.metrics
+            max_drawdowns[trial] = metrics.max_drawdown
+            max_losses[trial] = metrics.max_consecutive_losses
+            min_funds[trial] = acc.min_fund
+            sharpe_ratios[trial] = metrics.sharpe_ratio
+            rois[trial] = metrics.roi
+            hit_rates[trial] = metrics.hit_rate
+            if acc.ruined_at_bet is not None:
+                ruined_at[trial] = acc.ruined_at_bet
+            
             if (trial + 1) % 1000 == 0:
                 logger.info(f"Monte Carlo progress: {trial + 1}/{num_trials}")
         
@@ -325,48 +1162,716 @@ class SimulationEngine:
         mc_result.bankruptcy_rate = float(np.sum(funds_array <= actual_bankruptcy_threshold) / num_trials * 100)
         mc_result.profit_rate = float(np.sum(funds_array > initial_fund) / num_trials * 100)
         
+        # 指標の分布
+        mc_result.metric_distributions = {
+            "max_drawdown": _summarize_distribution(max_drawdowns),
+            "max_consecutive_losses": _summarize_distribution(max_losses),
+            "min_fund": _summarize_distribution(min_funds),
+            "sharpe_ratio": _summarize_distribution(sharpe_ratios),
+        }
+        ruined = ruined_at >= 0
+        mc_result.ruin_rate = float(np.mean(ruined) * 100)
+        if ruined.any():
+            mc_result.metric_distributions["time_to_ruin"] = _summarize_distribution(ruined_at[ruined])
+            mc_result.mean_time_to_ruin = float(np.mean(ruined_at[ruined]))
+        
+        # Go/No-Go基準ごとの成立確率
+        roi_ok = rois >= MetricsCalculator.GO_MIN_ROI
+        dd_ok = max_drawdowns <= MetricsCalculator.GO_MAX_DRAWDOWN
+        hit_ok = hit_rates >= MetricsCalculator.GO_MIN_HIT_RATE
+        mc_result.go_nogo_rates = {
+            "roi": float(np.mean(roi_ok) * 100),
+            "max_drawdown": float(np.mean(dd_ok) * 100),
+            "hit_rate": float(np.mean(hit_ok) * 100),
+            "is_go": float(np.mean(roi_ok & dd_ok & hit_ok) * 100),
+        }
+        
         return mc_result
     
     def run_walk_forward(
         self,
-        races: list[Race],
+        races: list[Race] | RaceIndex,
         initial_fund: int,
         window_size: int = 100,
-        step_size: int = 50
+        step_size: int = 50,
+        record: str = "full",
+        workers: int = 1,
+        window: str | None = None,
+        step: str | None = None
     ) -> list[SimulationResult]:
         """Walk-Forwardシミュレーションを実行
         
         時系列順にウィンドウをスライドさせてシミュレーション。
+        馬券生成と的中判定は全レースで1回だけ行い、各ウィンドウはその区間の再生になる。
         
         Args:
-            races: レースリスト（時系列順）
+            races: レースリスト、または構築済みのRaceIndex（並べ替えを省略できる）
             initial_fund: 初期資金
             window_size: ウィンドウサイズ（レース数）
             step_size: ステップサイズ（レース数）
+            record: 各ウィンドウの履歴記録モード
+                （"none"なら最終資金と指標のみのサマリーを返す。
+                固定賭け金かつ"full"以外なら累積和による高速計算を使う）
+            workers: ウィンドウを並列実行するプロセス数（1なら逐次実行）
+            window: 暦上のウィンドウ長（例: "6M", "2W"）。指定時はwindow_size/step_sizeより優先
+            step: 暦上のステップ幅（例: "1M"）。省略時はwindowと同じ（重なりなし）
             
         Returns:
-            各ウィンドウのシミュレーション結果リスト
+            各ウィンドウのシミュレーション結果リスト（ウィンドウ順）
+        
+        Raises:
+            ValueError: 未知の記録モード、workersが1未満、または期間指定が不正な場合
         """
-        results = []
+        _validate_record_mode(record)
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1: {workers}")
         
-        # レースを時系列順にソート
-        sorted_races = sorted(races, key=lambda r: (r.year, r.kaisai_date, r.race_number))
+        # 時系列インデックス（開催日・レース番号・競馬場順）
+        index = races if isinstance(races, RaceIndex) else RaceIndex(races)
+        if window is not None:
+            windows = index.calendar_windows(window, step or window)
+        else:
+            windows = index.count_windows(window_size, step_size)
         
-        start = 0
-        while start + window_size <= len(sorted_races):
-            window_races = sorted_races[start:start + window_size]
-            result = self.run_simple(window_races, initial_fund)
-            results.append(result)
-            
-            logger.info(f"Walk-forward window {len(results)}: "
+        outcomes = precompute_outcomes(self.strategy, self.evaluator, index.races)
+        
+        # 固定賭け金なら累積和で一括計算（資金制約に掛かるウィンドウのみ再生する）
+        results: list[SimulationResult | None] = [None] * len(windows)
+        if record != "full" and self.fund_manager.fixed_stake and self.settlement == "ticket":
+            results = self._walk_forward_fixed_stake(outcomes, windows, initial_fund, record)
+        pending = [i for i, result in enumerate(results) if result is None]
+        pending_windows = [windows[i] for i in pending]
+        
+        if workers == 1 or len(pending_windows) <= 1:
+            _init_walk_forward_worker(self, outcomes, initial_fund, record)
+            try:
+                replayed = [_run_walk_forward_window(bounds) for bounds in pending_windows]
+            finally:
+                _walk_forward_state.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_walk_forward_worker,
+                initargs=(self, outcomes, initial_fund, record)
+            ) as executor:
+                replayed = list(executor.map(_run_walk_forward_window, pending_windows))
+        for i, result in zip(pending, replayed):
+            results[i] = result
+        
+        for i, result in enumerate(results, start=1):
+            logger.info(f"Walk-forward window {i}: "
                        f"ROI={result.metrics.roi:.2f}%, "
                        f"Hit={result.metrics.hit_rate:.2f}%")
+        
+        return results
+    
+    def with_params(
+        self,
+        strategy_params: dict[str, Any] | None = None,
+        fund_manager_params: dict[str, Any] | None = None
+    ) -> "SimulationEngine":
+        """パラメータの一部を差し替えたエンジンを作成（元のエンジンは変更しない）"""
+        strategy = type(self.strategy)(params={**self.strategy.params, **(strategy_params or {})})
+        fund_manager = type(self.fund_manager)(
+            {**self.fund_manager.params, **(fund_manager_params or {})},
+            self.fund_manager.constraints
+        )
+        return SimulationEngine(strategy, fund_manager, self.evaluator, self.settlement)
+    
+    def run_walk_forward_optimize(
+        self,
+        races: list[Race] | RaceIndex,
+        initial_fund: int,
+        param_grid: dict[str, list[Any]],
+        train_size: int = 200,
+        test_size: int = 50,
+        objective: str = "roi",
+        workers: int = 1,
+        train_window: str | None = None,
+        test_window: str | None = None
+    ) -> WalkForwardOptimizationResult:
+        """Walk-Forward最適化を実行
+        
+        ウィンドウごとに学習区間でパラメータグリッドを総当たりし、目的指標が最良の
+        組み合わせを直後の検証区間に適用する。検証区間は資金を引き継いで順に実行する。
+        馬券生成と的中判定は戦略パラメータの組み合わせごとに全レースで1回だけ行い、
+        重なり合う学習区間で使い回す。学習区間の評価はウィンドウ単位で並列実行できる。
+        
+        Args:
+            races: レースリスト、または構築済みのRaceIndex
+            initial_fund: 初期資金（学習区間の評価と検証区間の開始資金）
+            param_grid: {"strategy.top_n": [1, 2], "fund_manager.bet_amount": [100, 200]} の形式
+            train_size: 学習区間のレース数
+            test_size: 検証区間のレース数（ウィンドウのずらし幅）
+            objective: 目的指標（"roi" | "profit" | "hit_rate" | "sharpe_ratio"）
+            workers: 学習区間を並列評価するプロセス数（1なら逐次実行）
+            train_window: 暦上の学習期間（例: "6M"）。指定時はtrain_size/test_sizeより優先
+            test_window: 暦上の検証期間（例: "1M"）。省略時は"1M"
+        
+        Returns:
+            Walk-Forward最適化結果
+        
+        Raises:
+            ValueError: 未知の目的指標、パラメータの指定が不正、またはworkersが1未満の場合
+        """
+        if objective not in OPTIMIZE_OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}. Available: {list(OPTIMIZE_OBJECTIVES)}")
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1: {workers}")
+        combos = expand_param_grid(param_grid)
+        if not combos:
+            raise ValueError("param_grid must contain at least one combination")
+        
+        index = races if isinstance(races, RaceIndex) else RaceIndex(races)
+        if train_window is not None:
+            windows = index.calendar_train_test_windows(train_window, test_window or "1M")
+        else:
+            windows = index.count_train_test_windows(train_size, test_size)
+        
+        # 組み合わせごとのエンジンと、戦略パラメータごとの事前計算結果
+        engines = [self.with_params(c["strategy"], c["fund_manager"]) for c in combos]
+        outcome_slots: list[int] = []
+        outcomes: list[list[RaceOutcome]] = []
+        slot_by_strategy: dict[str, int] = {}
+        for combo, engine in zip(combos, engines):
+            key = repr(sorted(combo["strategy"].items()))
+            if key not in slot_by_strategy:
+                slot_by_strategy[key] = len(outcomes)
+                outcomes.append(precompute_outcomes(engine.strategy, engine.evaluator, index.races))
+            outcome_slots.append(slot_by_strategy[key])
+        
+        # 学習区間の評価（ウィンドウ単位で並列化）
+        train_bounds = [(w[0], w[1]) for w in windows]
+        init_args = (engines, outcome_slots, outcomes, initial_fund, objective)
+        if workers == 1 or len(train_bounds) <= 1:
+            _init_optimize_worker(*init_args)
+            try:
+                best = [_score_train_window(bounds) for bounds in train_bounds]
+            finally:
+                _optimize_state.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_optimize_worker,
+                initargs=init_args
+            ) as executor:
+                best = list(executor.map(_score_train_window, train_bounds))
+        
+        # 検証区間を資金を引き継いで順に実行
+        opt_result = WalkForwardOptimizationResult(objective=objective, windows=windows)
+        fund = initial_fund
+        fund_history = [initial_fund]
+        for (_, _, test_start, test_stop), (combo_index, score) in zip(windows, best):
+            engine = engines[combo_index]
+            test_outcomes = outcomes[outcome_slots[combo_index]][test_start:test_stop]
+            result, _ = engine._replay(test_outcomes, fund, None, "full")
+            
+            opt_result.chosen_params.append(combos[combo_index])
+            opt_result.train_scores.append(score)
+            opt_result.test_results.append(result)
+            fund_history.extend(result.fund_history[1:])
+            fund = result.final_fund
             
-            start += step_size
+            logger.info(f"Walk-forward optimize window {len(opt_result.test_results)}: "
+                       f"params={combos[combo_index]}, train {objective}={score:.2f}, "
+                       f"test ROI={result.metrics.roi:.2f}%")
+        
+        out_of_sample = SimulationResult(
+            initial_fund=initial_fund,
+            final_fund=fund,
+            bet_history=BetLog.concat(r.bet_history for r in opt_result.test_results),
+            fund_history=fund_history
+        )
+        out_of_sample.metrics = MetricsCalculator.calculate(out_of_sample)
+        opt_result.out_of_sample = out_of_sample
+        
+        return opt_result
+    
+    def _walk_forward_fixed_stake(
+        self,
+        outcomes: list[RaceOutcome],
+        windows: list[tuple[int, int]],
+        initial_fund: int,
+        record: str
+    ) -> list[SimulationResult | None]:
+        """固定賭け金のWalk-Forwardを累積和で一括計算
+        
+        資金不足・最大比率・破産ラインのいずれにも掛からない限り、固定賭け金の
+        賭け金は資金に依存しない。このとき各ウィンドウの資金推移は全体の累積損益の
+        差で表せるため、再生せずに指標を求められる。
+        制約に掛かるかどうかは、レースごとの「必要資金を満たす最低の累積損益」の
+        ウィンドウ内最小値（単調deque）で判定し、掛かるウィンドウはNoneを返す。
+        
+        Args:
+            outcomes: 時系列順の事前計算結果
+            windows: ウィンドウ[start, stop)のリスト（開始・終了とも単調増加）
+            initial_fund: 各ウィンドウの初期資金
+            record: 記録モード（"none" | "summary"）
+        
+        Returns:
+            ウィンドウごとの結果（再生が必要なウィンドウはNone）
+        """
+        fm = self.fund_manager
+        threshold = fm.constraints.min_bet  # _replay の破産ライン既定値と同じ
+        num_races = len(outcomes)
+        
+        # 資金制約がない場合の賭けを平坦な配列に展開
+        amounts: list[int] = []
+        payouts: list[int] = []
+        hits: list[bool] = []
+        bet_offsets = np.zeros(num_races + 1, dtype=np.int64)
+        required = np.zeros(num_races, dtype=np.int64)
+        for i, outcome in enumerate(outcomes):
+            if outcome.tickets:
+                race_amounts = fm.calculate_unconstrained_amounts(outcome.tickets)
+                for amount, is_hit, odds in zip(race_amounts, outcome.hits, outcome.odds):
+                    if amount <= 0:
+                        continue
+                    amounts.append(amount)
+                    payouts.append(self.evaluator.payout(amount, odds) if is_hit else 0)
+                    hits.append(is_hit)
+                    required[i] = max(required[i], fm.required_fund(amount))
+            bet_offsets[i + 1] = len(amounts)
+        
+        amounts_arr = np.asarray(amounts, dtype=np.int64)
+        payouts_arr = np.asarray(payouts, dtype=np.int64)
+        hits_arr = np.asarray(hits, dtype=bool)
+        cum_profit = np.concatenate(([0], np.cumsum(payouts_arr - amounts_arr)))
+        race_profit = cum_profit[bet_offsets]  # 各レース開始時点の累積損益
+        has_bets = bet_offsets[1:] > bet_offsets[:-1]
+        cum_races = np.concatenate(([0], np.cumsum(has_bets)))
+        
+        # レースごとに、ウィンドウ開始時点の累積損益がこれ以下なら制約に掛からない値
+        # （レース開始時の必要資金と、レース内の賭け後資金が破産ラインを下回らないこと）
+        floor_keys = np.full(num_races, np.inf)
+        if has_bets.any():
+            race_starts = bet_offsets[:-1][has_bets]
+            intra_min = np.minimum.reduceat(cum_profit[1:], race_starts)
+            floor_keys[has_bets] = np.minimum(
+                race_profit[:-1][has_bets] - required[has_bets],
+                intra_min - threshold
+            )
+        
+        starts = np.array([start for start, _ in windows], dtype=np.int64)
+        stops = np.array([stop for _, stop in windows], dtype=np.int64)
+        valid = _sliding_min(floor_keys, windows) >= race_profit[starts] - initial_fund
+        
+        results: list[SimulationResult | None] = [None] * len(windows)
+        valid_windows = np.flatnonzero(valid)
+        if len(valid_windows) == 0:
+            return results
+        
+        bet_starts = bet_offsets[starts]
+        bet_stops = bet_offsets[stops]
+        lengths = bet_stops - bet_starts
+        max_len = int(lengths[valid_windows].max())
+        chunk_size = max(1, _WINDOW_BATCH_CELLS // max(1, max_len))
+        num_bets = len(amounts_arr)
+        
+        # 経路に依存する指標（ドローダウン・連敗・シャープレシオ）はウィンドウ×賭けの行列で一括計算
+        for chunk_begin in range(0, len(valid_windows), chunk_size):
+            chunk = valid_windows[chunk_begin:chunk_begin + chunk_size]
+            b0 = bet_starts[chunk][:, np.newaxis]
+            b1 = bet_stops[chunk][:, np.newaxis]
+            
+            bet_idx = np.minimum(b0 + np.arange(max_len), max(num_bets - 1, 0))
+            fund_idx = np.minimum(b0 + np.arange(max_len + 1), b1)  # 終了後は最終資金で埋める
+            fund_paths = initial_fund + cum_profit[fund_idx] - cum_profit[b0]
+            
+            if num_bets:
+                chunk_amounts = amounts_arr[bet_idx]
+                chunk_payouts = payouts_arr[bet_idx]
+                chunk_hits = hits_arr[bet_idx]
+            else:
+                chunk_amounts = np.zeros(bet_idx.shape, dtype=np.int64)
+                chunk_payouts = np.zeros(bet_idx.shape, dtype=np.int64)
+                chunk_hits = np.zeros(bet_idx.shape, dtype=bool)
+            
+            batch = MetricsCalculator.calculate_batch(
+                fund_paths, chunk_amounts, chunk_payouts, chunk_hits, lengths[chunk]
+            )
+            
+            for row, w in enumerate(chunk):
+                length = int(lengths[w])
+                result = SimulationResult(
+                    initial_fund=initial_fund,
+                    final_fund=int(fund_paths[row, length]),
+                    bet_history=[],
+                    fund_history=fund_paths[row, :length + 1].tolist() if record == "summary" else []
+                )
+                result.metrics = MetricsCalculator._metrics_from_batch(batch, row)
+                if length:
+                    result.metrics.total_races = int(cum_races[stops[w]] - cum_races[starts[w]])
+                results[w] = result
         
         return results
 
 
+# 戦略比較のワーカープロセスごとの共有状態（レースデータは初期化時に1回だけ受け取る）
+_compare_state: dict = {}
+
+
+def _placed_bets_batch(
+    initial_funds: np.ndarray,
+    amount_parts: list[np.ndarray],
+    payout_parts: list[np.ndarray],
+    hit_parts: list[np.ndarray],
+    placed_parts: list[np.ndarray]
+) -> tuple[dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """行ごとの馬券の行列（列方向に分割）から実際の賭けを先頭に詰めて指標を一括計算
+    
+    Args:
+        initial_funds: 行ごとの初期資金
+        amount_parts, payout_parts, hit_parts: 賭け金・払戻金・的中フラグ（行×馬券）
+        placed_parts: 実際に賭けたか（賭け金が0、破産後の馬券はFalse）
+    
+    Returns:
+        (calculate_batch の指標, 資金推移（行×(馬券数+1)、賭け数以降は最終資金）, 賭け数)
+    """
+    placed = np.concatenate(placed_parts, axis=1)
+    order = np.argsort(~placed, axis=1, kind="stable")
+    lengths = placed.sum(axis=1)
+    amounts = np.take_along_axis(np.concatenate(amount_parts, axis=1), order, axis=1)
+    payouts = np.take_along_axis(np.concatenate(payout_parts, axis=1), order, axis=1)
+    hits = np.take_along_axis(np.concatenate(hit_parts, axis=1), order, axis=1)
+    valid = np.arange(placed.shape[1])[np.newaxis, :] < lengths[:, np.newaxis]
+    fund_paths = initial_funds[:, np.newaxis] + np.concatenate(
+        (
+            np.zeros((len(placed), 1), dtype=np.int64),
+            np.cumsum(np.where(valid, payouts - amounts, 0), axis=1),
+        ),
+        axis=1
+    )
+    batch = MetricsCalculator.calculate_batch(fund_paths, amounts, payouts, hits, lengths)
+    return batch, fund_paths, lengths
+
+
+def replay_bankrolls(
+    outcomes: list[RaceOutcome],
+    fund_managers: list[FundManager],
+    initial_funds: list[int],
+    bankruptcy_threshold: int | None = None
+) -> list[SimulationResult]:
+    """複数の資金設定を1回のレースの走査でまとめて再生
+    
+    初期資金・資金管理のパラメータ・制約だけが異なる設定を FundManagerGrid で
+    設定の軸に並べ、レースごとに全設定の賭け金・払戻・破産判定を配列で計算する。
+    結果は設定ごとの _replay（record="none"）と一致する。
+    設定数×馬券数が _BANKROLL_BATCH_CELLS を超える場合は設定を分割して再生する。
+    
+    Args:
+        outcomes: 事前計算済みのレースごとの結果（時系列順）
+        fund_managers: 設定ごとの資金管理（同じクラス）
+        initial_funds: 設定ごとの初期資金
+        bankruptcy_threshold: 破産ライン（省略時は設定ごとの最小賭け金）
+    
+    Returns:
+        設定と同じ順序の結果（履歴は保持しない）
+    
+    Raises:
+        ValueError: 資金管理と初期資金の数が異なる、またはクラスが異なる資金管理を含む場合
+    """
+    if len(fund_managers) != len(initial_funds):
+        raise ValueError(
+            f"fund_managers and initial_funds differ in length: "
+            f"{len(fund_managers)} != {len(initial_funds)}"
+        )
+    num_tickets = max(1, sum(len(outcome.tickets) for outcome in outcomes))
+    chunk = max(1, _BANKROLL_BATCH_CELLS // num_tickets)
+    
+    results: list[SimulationResult] = []
+    for start in range(0, len(fund_managers), chunk):
+        results.extend(_replay_bankroll_batch(
+            outcomes,
+            FundManagerGrid(fund_managers[start:start + chunk]),
+            np.asarray(initial_funds[start:start + chunk], dtype=np.int64),
+            bankruptcy_threshold
+        ))
+    return results
+
+
+def _replay_bankroll_batch(
+    outcomes: list[RaceOutcome],
+    grid: FundManagerGrid,
+    initial_funds: np.ndarray,
+    bankruptcy_threshold: int | None
+) -> list[SimulationResult]:
+    """replay_bankrolls の本体（設定数×馬券数の行列が収まる範囲）"""
+    if bankruptcy_threshold is None:
+        thresholds = grid.min_bet[:, 0]
+    else:
+        thresholds = np.full(len(grid), bankruptcy_threshold, dtype=np.int64)
+    
+    funds = initial_funds.copy()
+    alive = np.ones(len(grid), dtype=bool)
+    total_races = np.zeros(len(grid), dtype=np.int64)
+    amount_parts, payout_parts, hit_parts, placed_parts = [], [], [], []
+    
+    for outcome in outcomes:
+        if not outcome.tickets:
+            continue
+        if not alive.any():
+            break
+        
+        amounts = grid.calculate_bet_amounts(outcome.tickets, funds)
+        hits = np.broadcast_to(np.asarray(outcome.hits, dtype=bool), amounts.shape)
+        # BetEvaluator.payout の配列版
+        payouts = np.where(hits, (amounts * np.asarray(outcome.odds)).astype(np.int64), 0)
+        placed = (amounts > 0) & alive[:, np.newaxis]
+        profits = np.where(placed, payouts - amounts, 0)
+        paths = funds[:, np.newaxis] + np.cumsum(profits, axis=1)
+        
+        # 破産ラインを下回った賭けで停止（以降の馬券は賭けない）
+        ruined = placed & (paths < thresholds[:, np.newaxis])
+        if ruined.any():
+            stopped = ruined.any(axis=1)
+            first = np.where(stopped, ruined.argmax(axis=1), amounts.shape[1])
+            placed &= np.arange(amounts.shape[1]) <= first[:, np.newaxis]
+            alive &= ~stopped
+            paths = funds[:, np.newaxis] + np.cumsum(np.where(placed, profits, 0), axis=1)
+        
+        funds = paths[:, -1]
+        total_races += placed.any(axis=1)
+        amount_parts.append(amounts)
+        payout_parts.append(payouts)
+        hit_parts.append(hits)
+        placed_parts.append(placed)
+    
+    results = [
+        SimulationResult(
+            initial_fund=int(initial_fund), final_fund=int(fund), bet_history=[], fund_history=[]
+        )
+        for initial_fund, fund in zip(initial_funds, funds)
+    ]
+    if not placed_parts:
+        return results
+    
+    batch, _, lengths = _placed_bets_batch(
+        initial_funds, amount_parts, payout_parts, hit_parts, placed_parts
+    )
+    for i, result in enumerate(results):
+        result.metrics = MetricsCalculator._metrics_from_batch(batch, i)
+        if lengths[i]:
+            result.metrics.total_races = int(total_races[i])
+    return results
+
+
+class _ProportionalReplay:
+    """資金比率方式（proportional_stake）の資金管理の、レース順序ごとの一括再生
+    
+    賭け金はレース開始時の資金 F だけで決まる（int(F * percentage) に倍率・制約・
+    1レースの上限を適用）。レース順序（試行）×レースの資金を次のように求める。
+    
+    1. _PROPORTIONAL_CHUNK_RACES レースずつ、丸めを無視した資金の倍率の対数の累積和で
+       各レース開始時の資金を推測し、全馬券の賭け金を配列で計算する
+    2. その賭け金での正確な資金推移（整数の累積和）から開始時の資金を求め直し、
+       賭け金を再計算する。変わった馬券があれば再計算した賭け金で 2 を繰り返す
+    
+    最初に賭け金が変わったレースの開始時の資金は正確なため、反復ごとに少なくとも
+    1レースずつ確定し、丸め・上限で推測が外れたレースだけが追加の反復になる。
+    破産は実際に賭けた馬券でのみ判定するため、初期資金が破産ライン以上なら
+    結果はレース順序ごとの _replay（record="none"）と一致する。
+    """
+    
+    def __init__(
+        self,
+        outcomes: list[RaceOutcome],
+        fund_manager: FundManager,
+        bankruptcy_threshold: int
+    ) -> None:
+        """初期化
+        
+        Args:
+            outcomes: 事前計算済みのレースごとの結果
+            fund_manager: proportional_stake の資金管理（最小賭け金は正）
+            bankruptcy_threshold: 破産ライン
+        """
+        self.percentage = fund_manager.percentage
+        self.constraints = fund_manager.constraints
+        self.grid = FundManagerGrid([fund_manager])
+        self.threshold = bankruptcy_threshold
+        
+        self.counts = np.array([len(outcome.tickets) for outcome in outcomes], dtype=np.int64)
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.weights = np.array(
+            [ticket.weight for outcome in outcomes for ticket in outcome.tickets], dtype=np.float64
+        )
+        self.hits = np.array([hit for outcome in outcomes for hit in outcome.hits], dtype=bool)
+        self.odds = np.array(
+            [odds for outcome in outcomes for odds in outcome.odds], dtype=np.float64
+        )
+        
+        # 賭け金を資金に比例すると見なしたときのレースごとの資金の倍率（推測用）
+        fractions = np.minimum(self.percentage * self.weights, self.constraints.max_bet_ratio)
+        race_of_ticket = np.repeat(np.arange(len(outcomes)), self.counts)
+        growth = 1 + np.bincount(
+            race_of_ticket, weights=fractions * (self.hits * self.odds - 1),
+            minlength=len(outcomes)
+        )
+        self.log_growth = np.log(np.maximum(growth, 1e-12))
+    
+    @property
+    def trials_per_batch(self) -> int:
+        """一度に再生する試行数（試行数×馬券数が _BANKROLL_BATCH_CELLS に収まる範囲）"""
+        return max(1, _BANKROLL_BATCH_CELLS // max(1, int(self.counts.sum())))
+    
+    def replay(
+        self, orders: np.ndarray, initial_fund: int
+    ) -> tuple[np.ndarray, dict[str, np.ndarray], np.ndarray, np.ndarray]:
+        """レース順序ごとに再生
+        
+        Args:
+            orders: 試行ごとのレースの順序 (試行数, レース数)
+            initial_fund: 初期資金
+        
+        Returns:
+            (最終資金, calculate_batch の指標, 最低資金, 破産ラインを下回った時点の賭け数
+            （破産しなかった試行は-1）)
+        """
+        num_trials, num_races = orders.shape
+        funds = np.full(num_trials, initial_fund, dtype=np.int64)
+        alive = np.ones(num_trials, dtype=bool)
+        amount_parts, payout_parts, hit_parts, placed_parts = [], [], [], []
+        
+        for start in range(0, num_races, _PROPORTIONAL_CHUNK_RACES):
+            if not alive.any():
+                break
+            races = orders[:, start:start + _PROPORTIONAL_CHUNK_RACES]
+            chunk = self._replay_chunk(races, funds, alive)
+            if chunk is None:
+                continue
+            amounts, payouts, hits, placed, funds, alive = chunk
+            amount_parts.append(amounts)
+            payout_parts.append(payouts)
+            hit_parts.append(hits)
+            placed_parts.append(placed)
+        
+        if not placed_parts:
+            amount_parts = payout_parts = [np.zeros((num_trials, 0), dtype=np.int64)]
+            hit_parts = placed_parts = [np.zeros((num_trials, 0), dtype=bool)]
+        initial_funds = np.full(num_trials, initial_fund, dtype=np.int64)
+        batch, fund_paths, lengths = _placed_bets_batch(
+            initial_funds, amount_parts, payout_parts, hit_parts, placed_parts
+        )
+        ruined_at = np.where(alive, -1, lengths)
+        return funds, batch, fund_paths.min(axis=1), ruined_at
+    
+    def _replay_chunk(
+        self, races: np.ndarray, funds: np.ndarray, alive: np.ndarray
+    ) -> tuple[np.ndarray, ...] | None:
+        """連続する数レース分を全試行まとめて再生（馬券がなければNone）
+        
+        Returns:
+            (賭け金, 払戻金, 的中フラグ, 実際に賭けたか（試行×馬券）, 終了時の資金, 継続中か)
+        """
+        num_trials, num_steps = races.shape
+        race_counts = self.counts[races]
+        lengths = race_counts.sum(axis=1)
+        width = int(lengths.max())
+        if width == 0:
+            return None
+        
+        # 試行ごとに馬券を詰めて並べる（余りの列は倍率0の埋め草で、賭け金は0になる）
+        flat_counts = race_counts.ravel()
+        total = int(flat_counts.sum())
+        tickets = np.repeat(
+            self.offsets[races.ravel()] - (np.cumsum(flat_counts) - flat_counts), flat_counts
+        ) + np.arange(total)
+        rows = np.repeat(np.arange(num_trials), lengths)
+        cols = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        steps = np.zeros((num_trials, width), dtype=np.int64)
+        steps[rows, cols] = np.repeat(np.tile(np.arange(num_steps), num_trials), flat_counts)
+        real = np.zeros((num_trials, width), dtype=bool)
+        real[rows, cols] = True
+        weights = np.zeros((num_trials, width))
+        weights[rows, cols] = self.weights[tickets]
+        hits = np.zeros((num_trials, width), dtype=bool)
+        hits[rows, cols] = self.hits[tickets]
+        odds = np.zeros((num_trials, width))
+        odds[rows, cols] = self.odds[tickets]
+        
+        # レースの先頭の列（馬券の列ごと）
+        race_starts = np.cumsum(race_counts, axis=1) - race_counts
+        starts = np.take_along_axis(race_starts, steps, axis=1)
+        columns = np.arange(width)[np.newaxis, :]
+        
+        def stakes_for(race_funds: np.ndarray) -> np.ndarray:
+            """レース開始時の資金 (試行数, レース数) から全馬券の賭け金"""
+            ticket_funds = np.take_along_axis(race_funds, steps, axis=1)
+            raw = (ticket_funds * self.percentage).astype(np.int64)
+            raw = np.where(weights != 1.0, (raw * weights).astype(np.int64), raw)
+            amounts = np.where(real, self.grid._apply_constraints(raw, ticket_funds), 0)
+            
+            # 1レースの上限（賭け金は0以上のため、最初に超える馬券を減額し以降は0）
+            cumulative = np.cumsum(amounts, axis=1) - amounts
+            before = cumulative - np.take_along_axis(cumulative, starts, axis=1)
+            over = real & (before + amounts > self.constraints.max_bet_per_race)
+            if not over.any():
+                return amounts
+            continued = over[:, :-1] & (columns[:, 1:] != starts[:, 1:])
+            first = over & ~np.concatenate(
+                (np.zeros((num_trials, 1), dtype=bool), continued), axis=1
+            )
+            unit = self.constraints.bet_unit
+            remaining = np.maximum(0, self.constraints.max_bet_per_race - before) // unit * unit
+            return np.where(over, np.where(first, remaining, 0), amounts)
+        
+        # 丸めを無視した資金の倍率の対数の累積和で各レース開始時の資金を推測
+        log_growth = self.log_growth[races]
+        guessed = funds[:, np.newaxis] * np.exp(
+            np.minimum(np.cumsum(log_growth, axis=1) - log_growth, 30.0)
+        )
+        amounts = stakes_for(np.floor(np.minimum(guessed, _UNLIMITED_GUESS)).astype(np.int64))
+        
+        while True:
+            payouts = np.where(hits, (amounts * odds).astype(np.int64), 0)
+            paths = funds[:, np.newaxis] + np.cumsum(payouts - amounts, axis=1)
+            ruined = alive[:, np.newaxis] & (amounts > 0) & (paths < self.threshold)
+            ruined_at = np.where(ruined.any(axis=1), ruined.argmax(axis=1), width)
+            
+            # 正確な資金推移から開始時の資金を求め直し、賭け金が変わる馬券がなければ確定
+            before_ticket = np.concatenate((funds[:, np.newaxis], paths), axis=1)
+            corrected = stakes_for(np.take_along_axis(before_ticket, race_starts, axis=1))
+            changed = (
+                (corrected != amounts) & alive[:, np.newaxis]
+                & (columns <= ruined_at[:, np.newaxis])
+            )
+            if not changed.any():
+                break
+            amounts = corrected
+        
+        placed = (amounts > 0) & alive[:, np.newaxis] & (columns <= ruined_at[:, np.newaxis])
+        paths = funds[:, np.newaxis] + np.cumsum(np.where(placed, payouts - amounts, 0), axis=1)
+        return amounts, payouts, hits, placed, paths[:, -1], alive & (ruined_at == width)
+
+
+def _init_compare_worker(
+    races: list[Race],
+    initial_fund: int,
+    evaluator: BetEvaluator,
+    cache: TicketCache | None = None
+) -> None:
+    """戦略比較ワーカーの初期化（馬券キャッシュは親プロセスの既定のキャッシュを引き継ぐ）"""
+    set_default_cache(cache)
+    _compare_state["races"] = races
+    _compare_state["initial_fund"] = initial_fund
+    _compare_state["evaluator"] = evaluator
+
+
+def _run_compare_strategy(item: tuple[str, Strategy, FundManager]) -> SimulationResult:
+    """共有されたレースデータで1戦略を実行"""
+    name, strategy, fund_manager = item
+    logger.info(f"Running strategy: {name}")
+    engine = SimulationEngine(strategy, fund_manager, _compare_state["evaluator"])
+    return engine.run_simple(_compare_state["races"], _compare_state["initial_fund"])
+
+
+def _integer_race_key(race: Race, track_codes: dict[str, int]) -> int:
+    """開催日順に並ぶ整数のレースキー（開催年・開催日・レース番号・競馬場のコード）"""
+    date_key = race.year * 10000 + race.kaisai_date
+    return (date_key * 100 + race.race_number) * 1000 + track_codes[race.track]
+
+
 class StrategyComparator:
     """戦略比較クラス"""
     
@@ -377,24 +1882,51 @@ class StrategyComparator:
         self,
         races: list[Race],
         strategies: list[tuple[str, Strategy, FundManager]],
-        initial_fund: int
+        initial_fund: int,
+        workers: int = 1
     ) -> dict[str, SimulationResult]:
         """複数戦略を比較
         
+        workers > 1 の場合は戦略をプロセスプールで並列実行する。レースデータは
+        ワーカーの初期化時に1回だけ渡し（forkが使える環境ではコピーオンライトで共有）、
+        戦略ごとには送らない。結果は strategies の順序で返すため並列数に依存しない。
+        
         Args:
             races: レースリスト
             strategies: (名前, 戦略, 資金管理)のリスト
             initial_fund: 初期資金
+            workers: 並列実行するプロセス数（1なら逐次実行）
             
         Returns:
             {戦略名: シミュレーション結果}
+        
+        Raises:
+            ValueError: workersが1未満の場合
         """
-        results = {}
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1: {workers}")
         
-        for name, strategy, fund_manager in strategies:
-            logger.info(f"Running strategy: {name}")
-            engine = SimulationEngine(strategy, fund_manager, self.evaluator)
-            result = engine.run_simple(races, initial_fund)
+        if workers == 1 or len(strategies) <= 1:
+            _init_compare_worker(races, initial_fund, self.evaluator, get_default_cache())
+            try:
+                outputs = [_run_compare_strategy(item) for item in strategies]
+            finally:
+                _compare_state.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(strategies)),
+                initializer=_init_compare_worker,
+                initargs=(races, initial_fund, self.evaluator, get_default_cache())
+            ) as executor:
+                outputs = list(executor.map(_run_compare_strategy, strategies))
+            
+            # ワーカーから戻ったレースの複製を元のレースに置き換える（メモリ節約）
+            for result in outputs:
+                if isinstance(result.bet_history, BetLog):
+                    result.bet_history.rebind_races(races)
+        
+        results = {}
+        for (name, _, _), result in zip(strategies, outputs):
             results[name] = result
         
         return results
@@ -425,6 +1957,51 @@ class StrategyComparator:
         
         return summary
     
+    def pnl_matrix(self, results: dict[str, SimulationResult]) -> PnLMatrix:
+        """賭け履歴からレースで揃えたレース × 戦略の損益行列を作成
+        
+        レースは整数のキー（開催年・開催日・レース番号・競馬場のコード）で揃え、
+        賭けごとの損益を np.bincount でまとめて集計する。賭け履歴を記録しない実行
+        （record="none"）の結果は損益0の列になる。
+        
+        Args:
+            results: {戦略名: シミュレーション結果}
+        
+        Returns:
+            PnLMatrix
+        """
+        logs = [BetLog.coerce(result.bet_history) for result in results.values()]
+        tracks = sorted({race.track for log in logs for race in log.races})
+        track_codes = {track: code for code, track in enumerate(tracks)}
+        
+        race_ids: dict[int, str] = {}
+        bet_keys = [np.empty(0, dtype=np.int64)]
+        bet_columns = [np.empty(0, dtype=np.int64)]
+        bet_profits = [np.empty(0, dtype=np.int64)]
+        for column, log in enumerate(logs):
+            keys = np.array(
+                [_integer_race_key(race, track_codes) for race in log.races], dtype=np.int64
+            )
+            race_ids.update(zip(keys.tolist(), (race.race_id for race in log.races)))
+            bet_keys.append(keys[log.column("race_index")])
+            bet_columns.append(np.full(len(log), column, dtype=np.int64))
+            bet_profits.append(log.profits)
+        
+        race_keys, rows = np.unique(np.concatenate(bet_keys), return_inverse=True)
+        num_strategies = len(logs)
+        size = len(race_keys) * num_strategies
+        cells = rows.ravel() * num_strategies + np.concatenate(bet_columns)
+        pnl = np.bincount(cells, weights=np.concatenate(bet_profits), minlength=size)
+        active = np.bincount(cells, minlength=size) > 0
+        
+        return PnLMatrix(
+            names=list(results.keys()),
+            race_keys=race_keys,
+            race_ids=[race_ids[key] for key in race_keys.tolist()],
+            pnl=pnl.reshape(len(race_keys), num_strategies),
+            active=active.reshape(len(race_keys), num_strategies),
+        )
+    
     def rank_strategies(self, results: dict[str, SimulationResult]) -> list[str]:
         """戦略をランキング（ROI順）"""
         summary = self.compare_summary(results)
@@ -3,11 +3,100 @@
 各種賭け戦略を定義する。
 """
 
+import math
 from abc import ABC, abstractmethod
+from dataclasses import replace
+from functools import cache
 from itertools import combinations
 from typing import Any
 
-from betting_simulation.models import Horse, Race, Ticket, TicketType
+import numpy as np
+
+from betting_simulation.models import TICKET_TYPE_CODES, Horse, Race, Ticket, TicketType
+from betting_simulation.race_table import (
+    RaceTable,
+    TicketArrays,
+    gather_combinations,
+    select_ranked,
+    slice_count,
+)
+
+# =============================================================================
+# 組み合わせ表
+# =============================================================================
+# 馬券の組み合わせを、対象馬（順位順）の位置の組として (組み合わせ数, 馬番の数) の
+# 配列で表す。対象頭数と戦略の形ごとに1回だけ作成して使い回すため、書き換え不可にする。
+# 馬券の生成は、対象馬の馬番の配列をこの表で取り出すだけになる。
+
+def _position_table(combos: list[tuple[int, ...]], width: int) -> np.ndarray:
+    """順位の位置の組のリストを書き換え不可の (組み合わせ数, width) の配列に変換"""
+    table = np.array(combos, dtype=np.int64).reshape(-1, width)
+    table.setflags(write=False)
+    return table
+
+
+@cache
+def _combination_table(m: int, r: int) -> np.ndarray:
+    """m頭から r頭を選ぶ組み合わせ（itertools.combinations と同じ順序）"""
+    return _position_table(list(combinations(range(m), r)), r)
+
+
+@cache
+def _flow_quinella_table(num_axis: int, num_partners: int, m: int) -> np.ndarray:
+    """m頭が対象のときの流し馬連の (軸, 相手)"""
+    if m < 2:
+        return _position_table([], 2)
+    ranks = range(m)
+    return _position_table(
+        [(a, p) for a in ranks[:num_axis] for p in ranks[num_axis:num_axis + num_partners]], 2
+    )
+
+
+@cache
+def _flow_trio_table(num_partners: int, m: int) -> np.ndarray:
+    """m頭が対象のときの1頭軸流し三連複の (軸, 相手, 相手)"""
+    if m < 3:
+        return _position_table([], 3)
+    partners = range(m)[1:1 + num_partners]
+    return _position_table([(0, p1, p2) for p1, p2 in combinations(partners, 2)], 3)
+
+
+@cache
+def _formation_table(first_n: int, second_n: int, third_n: int, m: int) -> np.ndarray:
+    """m頭が対象のときのフォーメーション三連複（1列目・2列目・3列目の順で初出の組のみ）"""
+    if m < 3:
+        return _position_table([], 3)
+    ranks = np.arange(m)
+    grid = np.stack(
+        np.meshgrid(ranks[:first_n], ranks[:second_n], ranks[:third_n], indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    distinct = (grid[:, 0] != grid[:, 1]) & (grid[:, 1] != grid[:, 2]) & (grid[:, 0] != grid[:, 2])
+    grid = grid[distinct]
+    # 同じ3頭の組は位置のビットマスクが一致する。初出の組をループ順のまま残す
+    _, first = np.unique(np.bitwise_or.reduce(1 << grid, axis=1), return_index=True)
+    return _position_table(grid[np.sort(first)].tolist(), 3)
+
+
+def _gather_numbers(horses: list[Horse], table: np.ndarray) -> list[tuple[int, ...]]:
+    """対象馬（順位順）の馬番を組み合わせ表で取り出す"""
+    if len(table) == 0:
+        return []
+    numbers = np.array([h.number for h in horses], dtype=np.int64)[table]
+    return list(map(tuple, numbers.tolist()))
+
+
+def _single_tickets(
+    table: RaceTable,
+    ticket_type: TicketType,
+    rows: np.ndarray,
+    positions: np.ndarray,
+    odds: np.ndarray | None = None,
+    expected_value: np.ndarray | None = None
+) -> TicketArrays:
+    """1頭の馬券（単勝・複勝）を列指向で作成"""
+    return TicketArrays.build(
+        ticket_type, rows, table.number[rows, positions][:, None], odds, expected_value
+    )
 
 
 class Strategy(ABC):
@@ -15,6 +104,14 @@ class Strategy(ABC):
     
     name: str = "base"
     description: str = ""
+    # 入れ子になるパラメータ（値kの馬券が値k+1の馬券に含まれる場合。スイープの高速化に使用）
+    nested_param: str | None = None
+    # 閾値パラメータ（馬券ごとに購入される値の区間が決まるもの。スイープの高速化に使用）
+    threshold_params: tuple[str, ...] = ()
+    # 馬券がレースとパラメータだけで決まるか（馬券キャッシュの対象）
+    cacheable: bool = True
+    # リスト・辞書の値をそのまま受け取るパラメータ（スイープの軸にしない）
+    structured_params: tuple[str, ...] = ()
     
     def __init__(self, params: dict[str, Any] | None = None) -> None:
         """初期化
@@ -24,6 +121,13 @@ class Strategy(ABC):
         """
         self.params = params or {}
     
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # generate_tickets だけを上書きしたサブクラスには親クラスの列指向の生成が対応しないため、
+        # レースごとに generate_tickets を呼ぶ既定の実装に戻す
+        if "generate_tickets" in cls.__dict__ and "generate_batch" not in cls.__dict__:
+            cls.generate_batch = Strategy.generate_batch
+    
     @abstractmethod
     def generate_tickets(self, race: Race) -> list[Ticket]:
         """馬券を生成
@@ -36,9 +140,88 @@ class Strategy(ABC):
         """
         pass
     
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        """全レースの馬券を列指向でまとめて生成
+        
+        generate_tickets をレースごとに呼んだ場合と同じ馬券を同じ順序で返す。
+        既定の実装は generate_tickets をレースごとに呼んで変換する（配列演算で生成する
+        戦略が上書きする）。
+        
+        Args:
+            table: レーステーブル
+        
+        Returns:
+            生成した馬券（レース順）
+        """
+        tickets_by_race = [self.generate_tickets(race) for race in table.races]
+        tickets = [ticket for race_tickets in tickets_by_race for ticket in race_tickets]
+        numbers = np.zeros((len(tickets), 3), dtype=np.int64)
+        for i, ticket in enumerate(tickets):
+            numbers[i, :len(ticket.horse_numbers)] = ticket.horse_numbers
+        return TicketArrays(
+            race_index=np.repeat(
+                np.arange(len(table)), [len(race_tickets) for race_tickets in tickets_by_race]
+            ).astype(np.int64),
+            ticket_type=np.array(
+                [TICKET_TYPE_CODES[ticket.ticket_type] for ticket in tickets], dtype=np.int8
+            ),
+            horse_numbers=numbers,
+            odds=np.array([ticket.odds for ticket in tickets], dtype=np.float64),
+            expected_value=np.array(
+                [ticket.expected_value for ticket in tickets], dtype=np.float64
+            ),
+            weight=np.array([ticket.weight for ticket in tickets], dtype=np.float64),
+        )
+    
+    @property
+    def has_batch(self) -> bool:
+        """generate_batch が配列演算で生成するか（高速化の目安。False でも結果は同じ）"""
+        return type(self).generate_batch is not Strategy.generate_batch
+    
     def _get_param(self, key: str, default: Any = None) -> Any:
         """パラメータを取得"""
         return self.params.get(key, default)
+    
+    def nested_ranking(self, race: Race, value: int) -> list[Horse] | None:
+        """入れ子パラメータが value のときの対象馬（順位順）
+        
+        各馬券は、含まれる馬の順位（1始まり）の最大値以上のパラメータ値で購入される。
+        
+        Returns:
+            対象馬のリスト、またはレースをスキップする場合はNone
+        """
+        return race.get_top_predicted_safe(value)
+    
+    def threshold_candidates(
+        self, race: Race, swept: tuple[str, ...]
+    ) -> list[tuple[Ticket, dict[str, tuple[float, float]]]]:
+        """閾値パラメータの値によって購入されうる馬券と、購入される値の区間
+        
+        スイープしないパラメータは self.params（省略時は既定値）を使う。
+        
+        Args:
+            race: レースデータ
+            swept: スイープする閾値パラメータ
+        
+        Returns:
+            (馬券, {スイープするパラメータ: 購入される値の閉区間 (下限, 上限)}) のリスト
+        
+        Raises:
+            ValueError: 閾値パラメータを持たない戦略の場合
+        """
+        raise ValueError(f"Strategy has no threshold parameters: {self.name}")
+    
+    @staticmethod
+    def _select_intervals(
+        intervals: dict[str, tuple[float, float]],
+        fixed: dict[str, float],
+        swept: tuple[str, ...]
+    ) -> dict[str, tuple[float, float]] | None:
+        """スイープしないパラメータの値が区間外ならNone、区間内ならスイープする区間のみ返す"""
+        for name, (low, high) in intervals.items():
+            if name not in swept and not low <= fixed[name] <= high:
+                return None
+        return {name: intervals[name] for name in swept}
 
 
 # =============================================================================
@@ -53,6 +236,8 @@ class FavoriteWinStrategy(Strategy):
     
     name = "favorite_win"
     description = "予測上位N頭の単勝を購入"
+    nested_param = "top_n"
+    threshold_params = ("min_odds", "max_odds")
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         top_n = self._get_param("top_n", 1)
@@ -75,6 +260,50 @@ class FavoriteWinStrategy(Strategy):
                 tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        min_odds = self._get_param("min_odds", 1.0)
+        max_odds = self._get_param("max_odds", 999.0)
+        
+        order, counts = table.top_predicted_safe(self._get_param("top_n", 1))
+        ranked_odds = np.take_along_axis(table.odds, order, axis=1)
+        rows, positions = select_ranked(
+            order, counts, (min_odds <= ranked_odds) & (ranked_odds <= max_odds)
+        )
+        odds = table.odds[rows, positions]
+        return _single_tickets(
+            table, TicketType.WIN, rows, positions,
+            odds, table.predicted_score[rows, positions] * odds
+        )
+    
+    def threshold_candidates(
+        self, race: Race, swept: tuple[str, ...]
+    ) -> list[tuple[Ticket, dict[str, tuple[float, float]]]]:
+        fixed = {
+            "min_odds": self._get_param("min_odds", 1.0),
+            "max_odds": self._get_param("max_odds", 999.0),
+        }
+        top_horses = race.get_top_predicted_safe(self._get_param("top_n", 1))
+        if top_horses is None:
+            return []
+        
+        candidates = []
+        for horse in top_horses:
+            # min_odds <= オッズ <= max_odds で購入
+            intervals = self._select_intervals(
+                {"min_odds": (-math.inf, horse.odds), "max_odds": (horse.odds, math.inf)},
+                fixed, swept
+            )
+            if intervals is None:
+                continue
+            ticket = Ticket(
+                ticket_type=TicketType.WIN,
+                horse_numbers=(horse.number,),
+                odds=horse.odds,
+                expected_value=horse.predicted_score * horse.odds
+            )
+            candidates.append((ticket, intervals))
+        return candidates
 
 
 class PopularityWinStrategy(Strategy):
@@ -85,6 +314,10 @@ class PopularityWinStrategy(Strategy):
     
     name = "popularity_win"
     description = "人気上位N頭の単勝を購入"
+    nested_param = "top_n"
+    
+    def nested_ranking(self, race: Race, value: int) -> list[Horse] | None:
+        return race.get_top_by_popularity(value)
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         top_n = self._get_param("top_n", 1)
@@ -105,6 +338,22 @@ class PopularityWinStrategy(Strategy):
                 tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        min_odds = self._get_param("min_odds", 1.0)
+        max_odds = self._get_param("max_odds", 999.0)
+        
+        order = table.popularity_order
+        counts = slice_count(table.num_horses, self._get_param("top_n", 1))
+        ranked_odds = np.take_along_axis(table.odds, order, axis=1)
+        rows, positions = select_ranked(
+            order, counts, (min_odds <= ranked_odds) & (ranked_odds <= max_odds)
+        )
+        odds = table.odds[rows, positions]
+        return _single_tickets(
+            table, TicketType.WIN, rows, positions,
+            odds, table.predicted_score[rows, positions] * odds
+        )
 
 
 class ValueWinStrategy(Strategy):
@@ -115,6 +364,7 @@ class ValueWinStrategy(Strategy):
     
     name = "value_win"
     description = "期待値が閾値以上の馬の単勝を購入"
+    threshold_params = ("min_expected_value", "max_tickets")
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         min_expected_value = self._get_param("min_expected_value", 1.0)
@@ -140,6 +390,50 @@ class ValueWinStrategy(Strategy):
                 tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        min_expected_value = self._get_param("min_expected_value", 1.0)
+        max_tickets = self._get_param("max_tickets", 3)
+        
+        # 期待値の降順（同値は元の順序）に並べ、閾値を満たす馬を先頭から max_tickets 頭まで
+        expected_values = table.predicted_score * table.odds
+        order = table.order_by(-expected_values)
+        passed = np.take_along_axis(expected_values, order, axis=1) >= min_expected_value
+        passed &= np.cumsum(passed, axis=1) <= max_tickets
+        rows, positions = select_ranked(order, table.num_horses, passed)
+        return _single_tickets(
+            table, TicketType.WIN, rows, positions,
+            table.odds[rows, positions], expected_values[rows, positions]
+        )
+    
+    def threshold_candidates(
+        self, race: Race, swept: tuple[str, ...]
+    ) -> list[tuple[Ticket, dict[str, tuple[float, float]]]]:
+        fixed = {
+            "min_expected_value": self._get_param("min_expected_value", 1.0),
+            "max_tickets": self._get_param("max_tickets", 3),
+        }
+        horses_with_ev = [(h, h.predicted_score * h.odds) for h in race.horses]
+        horses_with_ev.sort(key=lambda x: x[1], reverse=True)
+        
+        candidates = []
+        for position, (horse, ev) in enumerate(horses_with_ev):
+            # 期待値順で position 番目の馬は、期待値 >= min_expected_value かつ
+            # max_tickets > position で購入（上位の馬も同じ閾値を満たすため）
+            intervals = self._select_intervals(
+                {"min_expected_value": (-math.inf, ev), "max_tickets": (position + 1, math.inf)},
+                fixed, swept
+            )
+            if intervals is None:
+                continue
+            ticket = Ticket(
+                ticket_type=TicketType.WIN,
+                horse_numbers=(horse.number,),
+                odds=horse.odds,
+                expected_value=ev
+            )
+            candidates.append((ticket, intervals))
+        return candidates
 
 
 # =============================================================================
@@ -154,6 +448,7 @@ class FavoritePlaceStrategy(Strategy):
     
     name = "favorite_place"
     description = "予測上位N頭の複勝を購入"
+    nested_param = "top_n"
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         top_n = self._get_param("top_n", 1)
@@ -175,6 +470,15 @@ class FavoritePlaceStrategy(Strategy):
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        order, counts = table.top_predicted_safe(self._get_param("top_n", 1))
+        rows, positions = select_ranked(order, counts)
+        estimated_odds = np.maximum(1.1, table.odds[rows, positions] / 3)
+        return _single_tickets(
+            table, TicketType.PLACE, rows, positions,
+            estimated_odds, table.predicted_score[rows, positions] * estimated_odds * 3
+        )
 
 
 # =============================================================================
@@ -189,6 +493,7 @@ class BoxQuinellaStrategy(Strategy):
     
     name = "box_quinella"
     description = "予測上位N頭のボックス馬連を購入"
+    nested_param = "box_size"
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         box_size = self._get_param("box_size", 4)
@@ -202,15 +507,22 @@ class BoxQuinellaStrategy(Strategy):
             return []
         
         # 全組み合わせ
-        for h1, h2 in combinations(top_horses, 2):
+        for combo in _gather_numbers(top_horses, _combination_table(len(top_horses), 2)):
             ticket = Ticket(
                 ticket_type=TicketType.QUINELLA,
-                horse_numbers=(h1.number, h2.number),
+                horse_numbers=combo,
                 odds=0,  # 馬連オッズは払戻時に参照
             )
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        order, counts = table.top_predicted_safe(self._get_param("box_size", 4))
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _combination_table(m, 2)
+        )
+        return TicketArrays.build(TicketType.QUINELLA, rows, numbers)
 
 
 class FlowQuinellaStrategy(Strategy):
@@ -246,6 +558,16 @@ class FlowQuinellaStrategy(Strategy):
                 tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        num_axis = self._get_param("num_axis", 1)
+        num_partners = self._get_param("num_partners", 5)
+        
+        order, counts = table.top_predicted_safe(num_axis + num_partners)
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _flow_quinella_table(num_axis, num_partners, m)
+        )
+        return TicketArrays.build(TicketType.QUINELLA, rows, numbers)
 
 
 # =============================================================================
@@ -260,6 +582,7 @@ class BoxWideStrategy(Strategy):
     
     name = "box_wide"
     description = "予測上位N頭のボックスワイドを購入"
+    nested_param = "box_size"
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         box_size = self._get_param("box_size", 4)
@@ -272,14 +595,21 @@ class BoxWideStrategy(Strategy):
         if len(top_horses) < 2:
             return []
         
-        for h1, h2 in combinations(top_horses, 2):
+        for combo in _gather_numbers(top_horses, _combination_table(len(top_horses), 2)):
             ticket = Ticket(
                 ticket_type=TicketType.WIDE,
-                horse_numbers=(h1.number, h2.number),
+                horse_numbers=combo,
             )
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        order, counts = table.top_predicted_safe(self._get_param("box_size", 4))
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _combination_table(m, 2)
+        )
+        return TicketArrays.build(TicketType.WIDE, rows, numbers)
 
 
 # =============================================================================
@@ -294,6 +624,7 @@ class BoxTrioStrategy(Strategy):
     
     name = "box_trio"
     description = "予測上位N頭のボックス三連複を購入"
+    nested_param = "box_size"
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         box_size = self._get_param("box_size", 5)
@@ -306,14 +637,21 @@ class BoxTrioStrategy(Strategy):
         if len(top_horses) < 3:
             return []
         
-        for h1, h2, h3 in combinations(top_horses, 3):
+        for combo in _gather_numbers(top_horses, _combination_table(len(top_horses), 3)):
             ticket = Ticket(
                 ticket_type=TicketType.TRIO,
-                horse_numbers=(h1.number, h2.number, h3.number),
+                horse_numbers=combo,
             )
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        order, counts = table.top_predicted_safe(self._get_param("box_size", 5))
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _combination_table(m, 3)
+        )
+        return TicketArrays.build(TicketType.TRIO, rows, numbers)
 
 
 class FlowTrioStrategy(Strategy):
@@ -336,18 +674,24 @@ class FlowTrioStrategy(Strategy):
         if len(top_horses) < 3:
             return []
         
-        axis = top_horses[0]
-        partners = top_horses[1:1 + num_partners]
-        
-        # 軸1頭 + 相手2頭の組み合わせ
-        for p1, p2 in combinations(partners, 2):
+        # 軸1頭（1位） + 相手2頭の組み合わせ
+        for combo in _gather_numbers(top_horses, _flow_trio_table(num_partners, len(top_horses))):
             ticket = Ticket(
                 ticket_type=TicketType.TRIO,
-                horse_numbers=(axis.number, p1.number, p2.number),
+                horse_numbers=combo,
             )
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        num_partners = self._get_param("num_partners", 6)
+        
+        order, counts = table.top_predicted_safe(1 + num_partners)
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _flow_trio_table(num_partners, m)
+        )
+        return TicketArrays.build(TicketType.TRIO, rows, numbers)
 
 
 class WheelQuinellaStrategy(Strategy):
@@ -388,6 +732,37 @@ class WheelQuinellaStrategy(Strategy):
                 tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        exclude_low_odds = self._get_param("exclude_low_odds", 0)
+        
+        axis_order, axis_counts = table.top_predicted_safe(self._get_param("num_axis", 1))
+        num_axis = int(axis_counts.max(initial=0))
+        axis_numbers = np.take_along_axis(table.number, axis_order[:, :num_axis], axis=1)
+        
+        # 相手馬（軸馬と馬番が異なる全馬）
+        partners = table.valid.copy()
+        for rank in range(num_axis):
+            is_axis = table.number == axis_numbers[:, rank:rank + 1]
+            partners &= ~(is_axis & (rank < axis_counts)[:, None])
+        
+        # 低オッズ馬を除外（オッズ順で先頭の exclude_low_odds 頭）
+        if exclude_low_odds > 0:
+            partner_order = table.order_by(table.odds, partners)
+            ranked = np.take_along_axis(partners, partner_order, axis=1)
+            ranked &= np.cumsum(ranked, axis=1) > exclude_low_odds
+        else:
+            partner_order = np.broadcast_to(np.arange(table.width), partners.shape)
+            ranked = partners
+        
+        # 軸馬ごとに相手馬を順に組み合わせる
+        selected = (np.arange(num_axis) < axis_counts[:, None])[:, :, None] & ranked[:, None, :]
+        rows, axis_ranks, partner_ranks = np.nonzero(selected)
+        numbers = np.stack([
+            table.number[rows, axis_order[rows, axis_ranks]],
+            table.number[rows, partner_order[rows, partner_ranks]],
+        ], axis=1)
+        return TicketArrays.build(TicketType.QUINELLA, rows, numbers)
 
 
 class FormationTrioStrategy(Strategy):
@@ -413,26 +788,29 @@ class FormationTrioStrategy(Strategy):
         if len(top_horses) < 3:
             return []
         
-        first = [h.number for h in top_horses[:first_n]]
-        second = [h.number for h in top_horses[:second_n]]
-        third = [h.number for h in top_horses[:third_n]]
-        
-        # 全組み合わせを生成（重複除去）
-        seen = set()
-        for h1 in first:
-            for h2 in second:
-                for h3 in third:
-                    if h1 != h2 and h2 != h3 and h1 != h3:
-                        combo = tuple(sorted([h1, h2, h3]))
-                        if combo not in seen:
-                            seen.add(combo)
-                            ticket = Ticket(
-                                ticket_type=TicketType.TRIO,
-                                horse_numbers=combo,
-                            )
-                            tickets.append(ticket)
+        # 重複を除いた組み合わせを組み合わせ表から取り出し、馬番を昇順に並べる
+        table = _formation_table(first_n, second_n, third_n, len(top_horses))
+        numbers = np.array([h.number for h in top_horses], dtype=np.int64)[table]
+        for combo in map(tuple, np.sort(numbers, axis=1).tolist()):
+            ticket = Ticket(
+                ticket_type=TicketType.TRIO,
+                horse_numbers=combo,
+            )
+            tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        first_n = self._get_param("first_n", 2)
+        second_n = self._get_param("second_n", 4)
+        third_n = self._get_param("third_n", 6)
+        
+        order, counts = table.top_predicted_safe(max(first_n, second_n, third_n))
+        rows, numbers = gather_combinations(
+            table, order, counts, lambda m: _formation_table(first_n, second_n, third_n, m)
+        )
+        # 馬番は昇順
+        return TicketArrays.build(TicketType.TRIO, rows, np.sort(numbers, axis=1))
 
 
 # =============================================================================
@@ -447,6 +825,7 @@ class HoleHorseWinStrategy(Strategy):
     
     name = "hole_win"
     description = "穴馬確率が高い馬の単勝を購入"
+    threshold_params = ("min_hole_probability", "min_odds")
     
     def generate_tickets(self, race: Race) -> list[Ticket]:
         min_hole_prob = self._get_param("min_hole_probability", 0.3)
@@ -470,6 +849,63 @@ class HoleHorseWinStrategy(Strategy):
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        min_hole_prob = self._get_param("min_hole_probability", 0.3)
+        max_tickets = self._get_param("max_tickets", 2)
+        min_odds = self._get_param("min_odds", 5.0)
+        
+        # 条件を満たす馬を穴馬確率の降順（同値は元の順序）に並べ、先頭から max_tickets 頭
+        candidates = (
+            table.valid & (table.hole_probability >= min_hole_prob) & (table.odds >= min_odds)
+        )
+        order = table.order_by(-table.hole_probability, candidates)
+        counts = slice_count(candidates.sum(axis=1), max_tickets)
+        rows, positions = select_ranked(order, counts)
+        odds = table.odds[rows, positions]
+        return _single_tickets(
+            table, TicketType.WIN, rows, positions,
+            odds, table.hole_probability[rows, positions] * odds
+        )
+    
+    def threshold_candidates(
+        self, race: Race, swept: tuple[str, ...]
+    ) -> list[tuple[Ticket, dict[str, tuple[float, float]]]]:
+        fixed = {
+            "min_hole_probability": self._get_param("min_hole_probability", 0.3),
+            "min_odds": self._get_param("min_odds", 5.0),
+        }
+        max_tickets = self._get_param("max_tickets", 2)
+        if max_tickets <= 0:
+            return []
+        ranked = sorted(race.horses, key=lambda h: h.hole_probability, reverse=True)
+        
+        # 穴馬確率順で上位の馬は穴馬確率の閾値を必ず満たすため、上位で購入される馬の数は
+        # min_odds だけで決まる。上位の馬のオッズの max_tickets 番目に大きい値を q とすると、
+        # q < min_odds <= オッズ のとき枠が空いていて購入される
+        candidates = []
+        for position, horse in enumerate(ranked):
+            higher_odds = sorted((h.odds for h in ranked[:position]), reverse=True)
+            q = higher_odds[max_tickets - 1] if len(higher_odds) >= max_tickets else -math.inf
+            if q >= horse.odds:
+                continue
+            intervals = self._select_intervals(
+                {
+                    "min_hole_probability": (-math.inf, horse.hole_probability),
+                    "min_odds": (math.nextafter(q, math.inf), horse.odds),
+                },
+                fixed, swept
+            )
+            if intervals is None:
+                continue
+            ticket = Ticket(
+                ticket_type=TicketType.WIN,
+                horse_numbers=(horse.number,),
+                odds=horse.odds,
+                expected_value=horse.hole_probability * horse.odds
+            )
+            candidates.append((ticket, intervals))
+        return candidates
 
 
 class HoleHorsePlaceStrategy(Strategy):
@@ -500,6 +936,107 @@ class HoleHorsePlaceStrategy(Strategy):
             tickets.append(ticket)
         
         return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        min_hole_prob = self._get_param("min_hole_probability", 0.2)
+        max_tickets = self._get_param("max_tickets", 3)
+        
+        candidates = table.valid & (table.hole_probability >= min_hole_prob)
+        order = table.order_by(-table.hole_probability, candidates)
+        counts = slice_count(candidates.sum(axis=1), max_tickets)
+        rows, positions = select_ranked(order, counts)
+        return _single_tickets(
+            table, TicketType.PLACE, rows, positions,
+            np.maximum(1.1, table.odds[rows, positions] / 3)
+        )
+
+
+# =============================================================================
+# ポートフォリオ戦略
+# =============================================================================
+
+class PortfolioStrategy(Strategy):
+    """ポートフォリオ戦略
+    
+    複数の戦略を重み付きで組み合わせ、1つの資金で同時に運用する。
+    同じ馬券（馬券種別と馬番の組が同じ）は1枚にまとめて重みを合算するため、
+    的中判定は1回で済み、1レースあたりの最大賭け金も全戦略の合計に適用される。
+    
+    パラメータ:
+        strategies: [{"name": 戦略名, "params": パラメータ, "weight": 重み}, ...]
+    """
+    
+    name = "portfolio"
+    description = "複数の戦略を重み付きで組み合わせて1つの資金で購入"
+    structured_params = ("strategies",)
+    
+    def __init__(self, params: dict[str, Any] | None = None) -> None:
+        """初期化
+        
+        Raises:
+            ValueError: 戦略が指定されていない、戦略の指定が name を持つ辞書でない、
+                重みが負、または未知の戦略名の場合
+        """
+        super().__init__(params)
+        specs = self._get_param("strategies", [])
+        if not specs:
+            raise ValueError("Portfolio requires at least one strategy")
+        
+        self.children: list[tuple[Strategy, float]] = []
+        for spec in specs:
+            if not isinstance(spec, dict) or "name" not in spec:
+                raise ValueError(f"Portfolio strategy must be a dict with a name: {spec}")
+            weight = spec.get("weight", 1.0)
+            if weight < 0:
+                raise ValueError(f"Portfolio weight must be >= 0: {weight}")
+            child = StrategyFactory.create(spec["name"], spec.get("params"))
+            self.children.append((child, weight))
+    
+    @property
+    def has_batch(self) -> bool:
+        return all(child.has_batch for child, _ in self.children)
+    
+    @property
+    def cacheable(self) -> bool:
+        return all(child.cacheable for child, _ in self.children)
+    
+    def generate_tickets(self, race: Race) -> list[Ticket]:
+        tickets: list[Ticket] = []
+        positions: dict[tuple, int] = {}
+        
+        for child, weight in self.children:
+            for ticket in child.generate_tickets(race):
+                key = (ticket.ticket_type, tuple(sorted(ticket.horse_numbers)))
+                if key in positions:
+                    # 既出の馬券に重みを合算
+                    first = tickets[positions[key]]
+                    tickets[positions[key]] = replace(
+                        first, weight=first.weight + ticket.weight * weight
+                    )
+                else:
+                    positions[key] = len(tickets)
+                    tickets.append(replace(ticket, weight=ticket.weight * weight))
+        
+        return tickets
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        parts = []
+        for child, weight in self.children:
+            part = child.generate_batch(table)
+            part.weight = part.weight * weight
+            parts.append(part)
+        tickets = TicketArrays.concat(parts)
+        
+        # (レース, 馬券種別, 昇順の馬番) が同じ馬券は、最初の馬券に重みを合算して1枚にする
+        keys = np.column_stack([
+            tickets.race_index, tickets.ticket_type, np.sort(tickets.horse_numbers, axis=1)
+        ])
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=tickets.weight, minlength=len(first))
+        order = np.argsort(first)
+        merged = tickets.take(first[order])
+        merged.weight = weights[order]
+        return merged
 
 
 # =============================================================================
@@ -523,6 +1060,7 @@ class StrategyFactory:
         "formation_trio": FormationTrioStrategy,
         "hole_win": HoleHorseWinStrategy,
         "hole_place": HoleHorsePlaceStrategy,
+        "portfolio": PortfolioStrategy,
     }
     
     @classmethod
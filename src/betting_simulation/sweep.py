@@ -0,0 +1,536 @@
+"""パラメータスイープ
+
+スイープ指定を含む設定を全組み合わせに展開し、ExecutionPlanner でまとめて実行して
+1つの結果表にする。データの読み込み・フィルタリング・馬券生成は
+共通する組み合わせごとに1回だけ行い、資金管理の再生のみ組み合わせごとに行う。
+
+入れ子になるパラメータ（top_n、box_size）を固定賭け金でスイープする場合は、
+最大の値の馬券を1回だけ生成し、全ての値の指標を累積和でまとめて計算する。
+
+初期資金・資金管理のパラメータ・制約だけが異なる設定は、replay_bankrolls で
+全設定の資金を配列として1回のレースの走査でまとめて進める。
+
+閾値パラメータ（オッズ帯・期待値・穴馬確率）は、候補の馬券ごとに購入される
+閾値の区間を求め、格子上の2次元累積和で全ての閾値の集計を一度に求める。
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.evaluator import BetEvaluator
+from betting_simulation.fund_manager import FundManager, FundManagerFactory
+from betting_simulation.models import Race, SimulationResult
+from betting_simulation.planner import ExecutionPlanner, _canonical
+from betting_simulation.simulation_engine import MetricsCalculator, replay_bankrolls
+from betting_simulation.strategy import Strategy, StrategyFactory
+
+# 並べ替えに使える指標（True: 大きいほど良い）
+SWEEP_METRICS = {
+    "roi": True,
+    "profit": True,
+    "final_fund": True,
+    "hit_rate": True,
+    "sharpe_ratio": True,
+    "max_drawdown": False,
+    "total_bets": True,
+}
+
+
+def sweep_row(swept: dict[str, Any], result: SimulationResult) -> dict[str, Any]:
+    """スイープした値と結果の指標を1行にまとめる（指標が未計算なら計算する）"""
+    m = result.metrics or MetricsCalculator.calculate(result)
+    return {
+        **swept,
+        "initial_fund": result.initial_fund,
+        "final_fund": result.final_fund,
+        "profit": result.profit,
+        "total_bets": m.total_bets,
+        "total_hits": m.total_hits,
+        "hit_rate": m.hit_rate,
+        "roi": m.roi,
+        "max_drawdown": m.max_drawdown,
+        "sharpe_ratio": m.sharpe_ratio,
+        "max_consecutive_losses": m.max_consecutive_losses,
+        "is_go": m.is_go,
+    }
+
+
+def sort_rows(rows: list[dict[str, Any]], metric: str) -> list[dict[str, Any]]:
+    """指標で並べ替え（良い順）
+    
+    Raises:
+        ValueError: 未知の指標の場合
+    """
+    if metric not in SWEEP_METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Available: {list(SWEEP_METRICS.keys())}")
+    return sorted(rows, key=lambda row: row[metric], reverse=SWEEP_METRICS[metric])
+
+
+def nested_sweep(
+    strategy: Strategy,
+    values: list[int],
+    fund_manager: FundManager,
+    races: list[Race],
+    initial_fund: int,
+    evaluator: BetEvaluator | None = None
+) -> list[SimulationResult | None]:
+    """入れ子パラメータの全ての値を1回の馬券生成で計算（固定賭け金）
+    
+    レースごとに有効な最大の値で馬券を1回だけ生成し、各馬券に「その馬券を含む
+    最小の値」と「レースがスキップされない最大の値」を付ける。値kの賭けは
+    この区間にkを含む馬券の部分列になるため、資金推移は部分列の累積和で求まる。
+    
+    資金不足・最大比率・1レースの上限・破産ラインのいずれかに掛かる値は
+    賭け金が変わるためNoneを返す（呼び出し側で通常の再生を行う）。
+    
+    Args:
+        strategy: nested_param を持つ戦略（他のパラメータはそのまま使う）
+        values: 入れ子パラメータの値のリスト
+        fund_manager: 固定賭け金の資金管理
+        races: レースリスト（時系列順）
+        initial_fund: 初期資金
+        evaluator: 的中判定（省略時はデフォルト）
+    
+    Returns:
+        values と同じ順序の結果（再生が必要な値はNone）
+    
+    Raises:
+        ValueError: 入れ子パラメータを持たない戦略、または固定賭け金でない資金管理の場合
+    """
+    param = strategy.nested_param
+    if param is None:
+        raise ValueError(f"Strategy has no nested parameter: {strategy.name}")
+    if not fund_manager.fixed_stake:
+        raise ValueError(f"Nested sweep requires a fixed-stake fund manager: {fund_manager.name}")
+    evaluator = evaluator or BetEvaluator()
+    max_value = max(values)
+    constraints = fund_manager.constraints
+    threshold = constraints.min_bet  # _replay の破産ライン既定値と同じ
+    
+    strategies: dict[int, Strategy] = {}
+    race_ids: list[int] = []
+    lows: list[int] = []
+    highs: list[int] = []
+    amounts: list[int] = []
+    payouts: list[int] = []
+    hits: list[bool] = []
+    required: list[int] = []
+    required_by_amount: dict[int, int] = {}
+    
+    for race_id, race in enumerate(races):
+        # 予測順位の重複でスキップされない最大の値（重複は値が大きいほど含まれやすい）
+        high = max_value
+        ranking = strategy.nested_ranking(race, high)
+        while ranking is None and high > 1:
+            high -= 1
+            ranking = strategy.nested_ranking(race, high)
+        if ranking is None:
+            continue
+        
+        if high not in strategies:
+            strategies[high] = type(strategy)({**strategy.params, param: high})
+        positions = {horse.number: rank for rank, horse in enumerate(ranking, 1)}
+        
+        for ticket in strategies[high].generate_tickets(race):
+            amount = fund_manager.calculate_unconstrained_amounts([ticket])[0]
+            if amount <= 0:
+                continue
+            is_hit, odds = evaluator.evaluate_odds(ticket, race)
+            race_ids.append(race_id)
+            lows.append(max(positions[n] for n in ticket.horse_numbers))
+            highs.append(high)
+            amounts.append(amount)
+            payouts.append(evaluator.payout(amount, odds) if is_hit else 0)
+            hits.append(is_hit)
+            if amount not in required_by_amount:
+                required_by_amount[amount] = fund_manager.required_fund(amount)
+            required.append(required_by_amount[amount])
+    
+    race_ids_arr = np.asarray(race_ids, dtype=np.int64)
+    lows_arr = np.asarray(lows, dtype=np.int64)
+    highs_arr = np.asarray(highs, dtype=np.int64)
+    amounts_arr = np.asarray(amounts, dtype=np.int64)
+    payouts_arr = np.asarray(payouts, dtype=np.int64)
+    hits_arr = np.asarray(hits, dtype=bool)
+    required_arr = np.asarray(required, dtype=np.int64)
+    
+    # 値ごとに賭けの部分列を取り出し、制約に掛からないかを判定
+    selected: list[np.ndarray | None] = []
+    race_counts: list[int] = []
+    for value in values:
+        idx = np.flatnonzero((lows_arr <= value) & (value <= highs_arr))
+        fund_path = initial_fund + np.concatenate(
+            ([0], np.cumsum(payouts_arr[idx] - amounts_arr[idx]))
+        )
+        race_starts = np.flatnonzero(np.diff(race_ids_arr[idx], prepend=-1) != 0)
+        valid = True
+        if len(idx):
+            race_totals = np.add.reduceat(amounts_arr[idx], race_starts)
+            race_required = np.maximum.reduceat(required_arr[idx], race_starts)
+            valid = (
+                race_totals.max() <= constraints.max_bet_per_race
+                and (fund_path[race_starts] >= race_required).all()
+                and fund_path[1:].min() >= threshold
+            )
+        selected.append(idx if valid else None)
+        race_counts.append(len(race_starts))
+    
+    results: list[SimulationResult | None] = [None] * len(values)
+    valid_rows = [row for row, idx in enumerate(selected) if idx is not None]
+    if not valid_rows:
+        return results
+    
+    # 経路に依存する指標は値×賭けの行列で一括計算（有効な列以降は末尾の賭けで埋める）
+    lengths = np.array([len(selected[row]) for row in valid_rows], dtype=np.int64)
+    max_len = int(lengths.max())
+    bet_idx = np.zeros((len(valid_rows), max_len), dtype=np.int64)
+    for i, row in enumerate(valid_rows):
+        idx = selected[row]
+        if len(idx):
+            bet_idx[i, :len(idx)] = idx
+            bet_idx[i, len(idx):] = idx[-1]
+    
+    batch_amounts = amounts_arr[bet_idx]
+    batch_payouts = payouts_arr[bet_idx]
+    batch_hits = hits_arr[bet_idx]
+    profits = np.where(
+        np.arange(max_len)[np.newaxis, :] < lengths[:, np.newaxis],
+        batch_payouts - batch_amounts, 0
+    )
+    fund_paths = initial_fund + np.concatenate(
+        (np.zeros((len(valid_rows), 1), dtype=np.int64), np.cumsum(profits, axis=1)), axis=1
+    )
+    batch = MetricsCalculator.calculate_batch(
+        fund_paths, batch_amounts, batch_payouts, batch_hits, lengths
+    )
+    
+    for i, row in enumerate(valid_rows):
+        result = SimulationResult(
+            initial_fund=initial_fund,
+            final_fund=int(fund_paths[i, -1]),
+            bet_history=[],
+            fund_history=[]
+        )
+        result.metrics = MetricsCalculator._metrics_from_batch(batch, i)
+        if lengths[i]:
+            result.metrics.total_races = race_counts[row]
+        results[row] = result
+    return results
+
+
+@dataclass
+class ThresholdGrid:
+    """閾値スイープの結果（1〜2個の閾値パラメータの格子上の集計）
+    
+    集計は資金制約に掛からない固定賭け金を前提とする（賭け順に依存する指標は持たない）。
+    各配列の形は (1個目の値の数, 2個目の値の数)。1個の場合は2個目の次元が1。
+    """
+    params: list[str]  # 閾値パラメータ名
+    values: list[list[float]]  # パラメータごとの値（昇順）
+    initial_fund: int
+    total_bets: np.ndarray
+    total_hits: np.ndarray
+    total_invested: np.ndarray
+    total_payout: np.ndarray
+    
+    @property
+    def profit(self) -> np.ndarray:
+        """純利益"""
+        return self.total_payout - self.total_invested
+    
+    @property
+    def roi(self) -> np.ndarray:
+        """ROI（%）"""
+        roi = np.zeros(self.total_invested.shape)
+        np.divide(self.total_payout * 100, self.total_invested, out=roi, where=self.total_invested > 0)
+        return roi
+    
+    @property
+    def hit_rate(self) -> np.ndarray:
+        """的中率（%）"""
+        hit_rate = np.zeros(self.total_bets.shape)
+        np.divide(self.total_hits * 100, self.total_bets, out=hit_rate, where=self.total_bets > 0)
+        return hit_rate
+    
+    def rows(self) -> list[dict[str, Any]]:
+        """格子の各点を結果行に変換（列名は "strategy.<パラメータ>"）"""
+        profit, roi, hit_rate = self.profit, self.roi, self.hit_rate
+        axes = self.values if len(self.values) == 2 else self.values + [[None]]
+        rows = []
+        for i, x in enumerate(axes[0]):
+            for j, y in enumerate(axes[1]):
+                row: dict[str, Any] = {f"strategy.{self.params[0]}": x}
+                if len(self.params) == 2:
+                    row[f"strategy.{self.params[1]}"] = y
+                row.update({
+                    "initial_fund": self.initial_fund,
+                    "final_fund": self.initial_fund + int(profit[i, j]),
+                    "profit": int(profit[i, j]),
+                    "total_bets": int(self.total_bets[i, j]),
+                    "total_hits": int(self.total_hits[i, j]),
+                    "total_invested": int(self.total_invested[i, j]),
+                    "total_payout": int(self.total_payout[i, j]),
+                    "hit_rate": float(hit_rate[i, j]),
+                    "roi": float(roi[i, j]),
+                })
+                rows.append(row)
+        return rows
+
+
+def threshold_sweep(
+    strategy: Strategy,
+    grid: dict[str, list[float]],
+    fund_manager: FundManager,
+    races: list[Race],
+    initial_fund: int,
+    evaluator: BetEvaluator | None = None
+) -> ThresholdGrid:
+    """閾値パラメータの格子を候補の馬券の1回の抽出で集計
+    
+    候補の馬券ごとに「購入される閾値の閉区間」を searchsorted で格子の添字範囲に変換し、
+    その矩形に賭け金・払戻・的中数を差分配列で加算してから2次元の累積和をとる。
+    資金残高・最大比率・1レースの上限による減額は考慮しない（固定賭け金の集計）。
+    
+    Args:
+        strategy: threshold_params を持つ戦略（他のパラメータはそのまま使う）
+        grid: {閾値パラメータ: 値のリスト}（1〜2個）
+        fund_manager: 固定賭け金の資金管理
+        races: レースリスト
+        initial_fund: 初期資金
+        evaluator: 的中判定（省略時はデフォルト）
+    
+    Returns:
+        ThresholdGrid
+    
+    Raises:
+        ValueError: パラメータの数・名前が不正、または固定賭け金でない資金管理の場合
+    """
+    params = tuple(grid)
+    if not 1 <= len(params) <= 2:
+        raise ValueError(f"Threshold sweep takes 1 or 2 parameters: {list(params)}")
+    for name in params:
+        if name not in strategy.threshold_params:
+            raise ValueError(
+                f"Unknown threshold parameter: {name}. Available: {list(strategy.threshold_params)}"
+            )
+    if not fund_manager.fixed_stake:
+        raise ValueError(f"Threshold sweep requires a fixed-stake fund manager: {fund_manager.name}")
+    evaluator = evaluator or BetEvaluator()
+    
+    values = [sorted(set(grid[name])) for name in params]
+    axes = [np.asarray(v, dtype=float) for v in values]
+    shape = tuple(len(axis) for axis in axes) + (1,) * (2 - len(axes))
+    
+    # 候補の馬券を1回だけ抽出
+    bounds: list[list[tuple[float, float]]] = [[] for _ in params]
+    sums: list[tuple[int, int, int, int]] = []  # (賭け数, 的中数, 賭け金, 払戻)
+    for race in races:
+        for ticket, intervals in strategy.threshold_candidates(race, params):
+            amount = fund_manager.calculate_unconstrained_amounts([ticket])[0]
+            if amount <= 0:
+                continue
+            is_hit, odds = evaluator.evaluate_odds(ticket, race)
+            payout = evaluator.payout(amount, odds) if is_hit else 0
+            for k, name in enumerate(params):
+                bounds[k].append(intervals[name])
+            sums.append((1, int(is_hit), amount, payout))
+    
+    # 閉区間 [下限, 上限] を格子の添字範囲 [start, stop) に変換
+    starts, stops = [], []
+    for k, axis in enumerate(axes):
+        interval = np.asarray(bounds[k], dtype=float).reshape(-1, 2)
+        starts.append(np.searchsorted(axis, interval[:, 0], side="left"))
+        stops.append(np.searchsorted(axis, interval[:, 1], side="right"))
+    if len(axes) == 1:
+        starts.append(np.zeros(len(sums), dtype=np.int64))
+        stops.append(np.ones(len(sums), dtype=np.int64))
+    
+    # 矩形への加算を差分配列で行い、2次元累積和で格子全体に広げる
+    vals = np.asarray(sums, dtype=np.int64).reshape(-1, 4)
+    keep = (stops[0] > starts[0]) & (stops[1] > starts[1])
+    s0, s1, e0, e1 = starts[0][keep], starts[1][keep], stops[0][keep], stops[1][keep]
+    vals = vals[keep]
+    diff = np.zeros((shape[0] + 1, shape[1] + 1, 4), dtype=np.int64)
+    np.add.at(diff, (s0, s1), vals)
+    np.add.at(diff, (s0, e1), -vals)
+    np.add.at(diff, (e0, s1), -vals)
+    np.add.at(diff, (e0, e1), vals)
+    totals = diff.cumsum(axis=0).cumsum(axis=1)[:shape[0], :shape[1]]
+    
+    return ThresholdGrid(
+        params=list(params),
+        values=values,
+        initial_fund=initial_fund,
+        total_bets=totals[..., 0],
+        total_hits=totals[..., 1],
+        total_invested=totals[..., 2],
+        total_payout=totals[..., 3],
+    )
+
+
+def run_threshold_sweep(
+    axes: dict[str, list],
+    config: SimulationConfig,
+    planner: ExecutionPlanner | None = None
+) -> ThresholdGrid:
+    """設定の閾値パラメータの軸を threshold_sweep で集計
+    
+    Args:
+        axes: スイープの軸（split_sweep の戻り値。"strategy.<閾値パラメータ>" のみ）
+        config: 基準の設定
+        planner: 実行計画（データの読み込みに使用。省略時はデフォルト）
+    
+    Raises:
+        ValueError: 戦略の閾値パラメータ以外の軸がある場合
+    """
+    planner = planner or ExecutionPlanner()
+    others = [name for name in axes if not name.startswith("strategy.")]
+    if others:
+        raise ValueError(f"Threshold sweep supports strategy parameters only: {others}")
+    
+    plan = planner.plan([config])
+    races = planner.load_datasets(plan)[plan[0].key]
+    return threshold_sweep(
+        StrategyFactory.create(config.strategy_name, config.strategy_params),
+        {name.removeprefix("strategy."): values for name, values in axes.items()},
+        FundManagerFactory.create(
+            config.fund_manager_name, config.fund_manager_params, config.fund_constraints
+        ),
+        races,
+        config.initial_fund,
+        planner.evaluator
+    )
+
+
+def _nested_groups(configs: list[SimulationConfig]) -> list[tuple[str, list[int]]]:
+    """入れ子パラメータの値だけが異なる固定賭け金の設定のグループ（2件以上）
+    
+    Returns:
+        (入れ子パラメータ名, 設定のインデックス) のリスト
+    """
+    groups: dict[str, tuple[str, list[int]]] = {}
+    for index, config in enumerate(configs):
+        try:
+            strategy = StrategyFactory.create(config.strategy_name, config.strategy_params)
+            fund_manager = FundManagerFactory.create(
+                config.fund_manager_name, config.fund_manager_params, config.fund_constraints
+            )
+        except ValueError:
+            continue
+        param = strategy.nested_param
+        if param is None:
+            continue
+        value = config.strategy_params.get(param)
+        if not fund_manager.fixed_stake or not isinstance(value, int) or value < 1:
+            continue
+        if config.settlement != "ticket":
+            continue
+        
+        key_data = config.to_dict()
+        key_data["strategy"]["params"] = {
+            k: v for k, v in config.strategy_params.items() if k != param
+        }
+        groups.setdefault(_canonical(key_data), (param, []))[1].append(index)
+    
+    return [(param, members) for param, members in groups.values() if len(members) > 1]
+
+
+def _bankroll_groups(configs: list[SimulationConfig], indices: list[int]) -> list[list[int]]:
+    """初期資金・資金管理のパラメータ・制約だけが異なる設定のグループ（2件以上）
+    
+    Args:
+        configs: 設定のリスト
+        indices: 対象とする設定のインデックス
+    
+    Returns:
+        設定のインデックスのリスト
+    """
+    groups: dict[str, list[int]] = {}
+    for index in indices:
+        config = configs[index]
+        if config.fund_manager_name not in FundManagerFactory._managers:
+            continue
+        if config.settlement != "ticket":
+            continue
+        key_data = config.to_dict()
+        key_data.pop("initial_fund")
+        key_data["fund_manager"] = config.fund_manager_name
+        groups.setdefault(_canonical(key_data), []).append(index)
+    
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def run_sweep(
+    sweep: list[tuple[dict[str, Any], SimulationConfig]],
+    workers: int = 1,
+    planner: ExecutionPlanner | None = None
+) -> list[dict[str, Any]]:
+    """展開済みの全組み合わせを実行
+    
+    Args:
+        sweep: (スイープした値, 設定) のリスト（ConfigLoader.load_sweep の戻り値）
+        workers: 並列実行するプロセス数
+        planner: 実行計画（省略時はデフォルト）
+    
+    Returns:
+        組み合わせと同じ順序の結果行のリスト
+    """
+    planner = planner or ExecutionPlanner()
+    configs = [config for _, config in sweep]
+    plan = planner.plan(configs)
+    datasets = planner.load_datasets(plan)
+    dataset_keys = {}
+    for dataset in plan:
+        for group in dataset.strategies:
+            for index in group.members:
+                dataset_keys[index] = dataset.key
+    
+    # 入れ子パラメータのスイープは累積和で一括計算
+    results: dict[int, SimulationResult] = {}
+    for param, members in _nested_groups(configs):
+        first = configs[members[0]]
+        nested = nested_sweep(
+            StrategyFactory.create(first.strategy_name, first.strategy_params),
+            [configs[i].strategy_params[param] for i in members],
+            FundManagerFactory.create(
+                first.fund_manager_name, first.fund_manager_params, first.fund_constraints
+            ),
+            datasets[dataset_keys[members[0]]],
+            first.initial_fund,
+            planner.evaluator
+        )
+        for index, result in zip(members, nested):
+            if result is not None:
+                results[index] = result
+    
+    # 資金設定だけが異なる設定は全設定の資金を配列にしてまとめて再生
+    remaining = [i for i in range(len(configs)) if i not in results]
+    for members in _bankroll_groups(configs, remaining):
+        group_configs = [configs[i] for i in members]
+        outcomes = planner.precompute(group_configs[:1], datasets)[0]
+        bankrolls = replay_bankrolls(
+            outcomes,
+            [
+                FundManagerFactory.create(
+                    config.fund_manager_name, config.fund_manager_params, config.fund_constraints
+                )
+                for config in group_configs
+            ],
+            [config.initial_fund for config in group_configs]
+        )
+        for index, result in zip(members, bankrolls):
+            results[index] = result
+    
+    # 残り（入れ子の制約に掛かる値、他と資金設定を共有しない設定）は通常の実行
+    remaining = [i for i in range(len(configs)) if i not in results]
+    if remaining:
+        executed = planner.execute(
+            [configs[i] for i in remaining], workers=workers, datasets=datasets, record="none"
+        )
+        for index, result in zip(remaining, executed):
+            results[index] = result
+    
+    return [sweep_row(swept, results[i]) for i, (swept, _) in enumerate(sweep)]
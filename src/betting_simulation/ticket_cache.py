@@ -0,0 +1,233 @@
+"""馬券キャッシュ
+
+戦略の馬券はレースと戦略（クラス + パラメータ）だけで決まるため、
+(戦略のフィンガープリント, レースのキー) ごとに生成済みの馬券を保持して使い回す。
+
+- メモリ上はLRU（保持するレース数の上限を超えたら古いものから破棄）
+- directory を指定するとSQLiteのファイルにも保存し、プロセスをまたいで再利用する
+  （資金管理や初期資金だけを変えた再実行では馬券生成を行わない）
+
+キャッシュは既定では無効で、set_default_cache で設定すると precompute_outcomes が使う。
+並列実行のワーカープロセスには初期化時に設定（最大レース数・ディレクトリ）だけが渡る。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+from collections import OrderedDict
+from dataclasses import fields
+from operator import attrgetter
+from pathlib import Path
+
+from betting_simulation.models import (
+    TICKET_TYPE_CODES,
+    TICKET_TYPE_ORDER,
+    Horse,
+    Race,
+    Ticket,
+)
+from betting_simulation.strategy import Strategy
+
+logger = logging.getLogger(__name__)
+
+# ディスクキャッシュのファイル名
+CACHE_FILE_NAME = "tickets.sqlite"
+# 保存形式のバージョン（フィンガープリントに含め、形式が変わったら古い馬券を使わない）
+_FORMAT_VERSION = 2
+
+_horse_values = attrgetter(*(f.name for f in fields(Horse)))
+
+
+def strategy_fingerprint(strategy: Strategy) -> str:
+    """戦略のクラスとパラメータから決まる安定したハッシュ"""
+    cls = type(strategy)
+    text = json.dumps(
+        [_FORMAT_VERSION, f"{cls.__module__}.{cls.__qualname__}", strategy.params],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def race_key(race: Race) -> str:
+    """レースのキー（レースの識別子と出走馬の値から決まる安定したハッシュ）
+    
+    払戻は馬券の生成に使わないため含めない。
+    """
+    values = (
+        race.track, race.year, race.kaisai_date, race.race_number,
+        race.surface.value, race.distance,
+        [_horse_values(horse) for horse in race.horses],
+    )
+    return hashlib.blake2b(pickle.dumps(values, protocol=4), digest_size=16).hexdigest()
+
+
+def _encode(tickets: list[Ticket]) -> bytes:
+    """馬券リストをディスク保存用に変換"""
+    return pickle.dumps(
+        [
+            (TICKET_TYPE_CODES[t.ticket_type], t.horse_numbers, t.odds, t.expected_value, t.weight)
+            for t in tickets
+        ],
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+
+
+def _decode(payload: bytes) -> list[Ticket]:
+    """ディスク保存用の形式から馬券リストを復元"""
+    return [
+        Ticket(TICKET_TYPE_ORDER[code], numbers, 0, odds, expected_value, weight)
+        for code, numbers, odds, expected_value, weight in pickle.loads(payload)
+    ]
+
+
+class TicketCache:
+    """馬券キャッシュ
+    
+    保持する馬券は複数のシミュレーションで共有されるため、変更してはならない
+    （エンジンは馬券を変更しない）。
+    """
+    
+    def __init__(self, max_races: int = 100_000, directory: str | Path | None = None) -> None:
+        """初期化
+        
+        Args:
+            max_races: メモリ上に保持するレース数の上限
+            directory: ディスクキャッシュのディレクトリ（省略時はメモリのみ）
+        
+        Raises:
+            ValueError: max_racesが1未満の場合
+        """
+        if max_races < 1:
+            raise ValueError(f"max_races must be >= 1: {max_races}")
+        self.max_races = max_races
+        self.directory = Path(directory) if directory is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[tuple[str, str], list[Ticket]] = OrderedDict()
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+    
+    def __len__(self) -> int:
+        return len(self._memory)
+    
+    def __getstate__(self) -> dict:
+        # ワーカープロセスには設定だけを渡す（メモリ上の馬券と接続は渡さない）
+        return {"max_races": self.max_races, "directory": self.directory}
+    
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["max_races"], state["directory"])
+    
+    def get_many(self, fingerprint: str, keys: list[str]) -> list[list[Ticket] | None]:
+        """レースごとの馬券を取得
+        
+        Args:
+            fingerprint: 戦略のフィンガープリント
+            keys: レースのキー
+        
+        Returns:
+            keys と同じ順序の馬券リスト（キャッシュにないレースはNone）
+        """
+        found: list[list[Ticket] | None] = []
+        for key in keys:
+            tickets = self._memory.get((fingerprint, key))
+            if tickets is not None:
+                self._memory.move_to_end((fingerprint, key))
+            found.append(tickets)
+        
+        missing = [i for i, tickets in enumerate(found) if tickets is None]
+        if missing and self.directory is not None:
+            stored = self._load(fingerprint, [keys[i] for i in missing])
+            for i in missing:
+                if keys[i] in stored:
+                    found[i] = stored[keys[i]]
+                    self._remember(fingerprint, keys[i], found[i])
+        
+        hits = sum(tickets is not None for tickets in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+    
+    def put_many(
+        self, fingerprint: str, keys: list[str], tickets_by_race: list[list[Ticket]]
+    ) -> None:
+        """レースごとの馬券を保存
+        
+        Args:
+            fingerprint: 戦略のフィンガープリント
+            keys: レースのキー
+            tickets_by_race: keys と同じ順序の馬券リスト
+        """
+        for key, tickets in zip(keys, tickets_by_race):
+            self._remember(fingerprint, key, tickets)
+        if self.directory is not None and keys:
+            with self._db() as db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO tickets (fingerprint, race_key, payload) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (fingerprint, key, _encode(tickets))
+                        for key, tickets in zip(keys, tickets_by_race)
+                    ]
+                )
+    
+    def clear(self) -> None:
+        """メモリ上とディスク上の馬券を削除"""
+        self._memory.clear()
+        if self.directory is not None:
+            with self._db() as db:
+                db.execute("DELETE FROM tickets")
+    
+    def _remember(self, fingerprint: str, key: str, tickets: list[Ticket]) -> None:
+        """メモリ上に保持（上限を超えたら最も古いものを破棄）"""
+        self._memory[(fingerprint, key)] = tickets
+        self._memory.move_to_end((fingerprint, key))
+        while len(self._memory) > self.max_races:
+            self._memory.popitem(last=False)
+    
+    def _load(self, fingerprint: str, keys: list[str]) -> dict[str, list[Ticket]]:
+        """ディスクから馬券を読み込み"""
+        stored = {}
+        db = self._db()
+        # SQLiteのパラメータ数の上限を超えないよう分割して問い合わせる
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = db.execute(
+                f"SELECT race_key, payload FROM tickets WHERE fingerprint = ? "
+                f"AND race_key IN ({', '.join('?' * len(chunk))})",
+                [fingerprint, *chunk]
+            )
+            for key, payload in rows:
+                stored[key] = _decode(payload)
+        return stored
+    
+    def _db(self) -> sqlite3.Connection:
+        """ディスクキャッシュの接続（プロセスごとに開く）"""
+        if self._connection is None or self._pid != os.getpid():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.directory / CACHE_FILE_NAME, timeout=30)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tickets ("
+                "fingerprint TEXT NOT NULL, race_key TEXT NOT NULL, payload BLOB NOT NULL, "
+                "PRIMARY KEY (fingerprint, race_key))"
+            )
+            self._pid = os.getpid()
+            logger.info(f"Ticket cache: {self.directory / CACHE_FILE_NAME}")
+        return self._connection
+
+
+# precompute_outcomes が使う既定のキャッシュ（Noneなら無効）
+_default_cache: TicketCache | None = None
+
+
+def set_default_cache(cache: TicketCache | None) -> None:
+    """既定の馬券キャッシュを設定（Noneで無効化）"""
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache() -> TicketCache | None:
+    """既定の馬券キャッシュを取得"""
+    return _default_cache
@@ -0,0 +1,36 @@
+"""テスト共通のフィクスチャ・ヘルパー"""
+
+import pytest
+
+from betting_simulation.models import Horse, Race, RacePayouts, Surface
+
+
+class StaticLoader:
+    """固定のレースを返すデータローダー"""
+    
+    def __init__(self, races):
+        self.races = races
+    
+    def load(self, path):
+        return self.races
+
+
+@pytest.fixture
+def sample_races():
+    """東京・中山の交互12レース"""
+    races = []
+    for i in range(12):
+        win_horse = 1 if i % 3 == 0 else 2
+        horses = [
+            Horse(number=1, name="馬1", odds=2.0, popularity=1,
+                  actual_rank=1 if win_horse == 1 else 2, predicted_rank=1, predicted_score=0.8),
+            Horse(number=2, name="馬2", odds=4.0, popularity=2,
+                  actual_rank=1 if win_horse == 2 else 2, predicted_rank=2, predicted_score=0.6),
+        ]
+        races.append(Race(
+            track="東京" if i % 2 == 0 else "中山", year=2025, kaisai_date=501 + i,
+            race_number=1, surface=Surface.TURF, distance=1600 + 200 * (i % 2),
+            horses=horses,
+            payouts=RacePayouts(win_horse=win_horse, place_horses=[win_horse], place_payouts=[1.5])
+        ))
+    return races
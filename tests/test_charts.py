@@ -7,6 +7,7 @@ from unittest.mock import MagicMock
 import matplotlib
 matplotlib.use('Agg')  # GUIバックエンドを使わない
 import matplotlib.pyplot as plt
+import numpy as np
 import pytest
 
 from betting_simulation.charts import (
@@ -287,6 +288,21 @@ class TestStrategyChartGenerator:
         assert fig is not None
         plt.close(fig)
 
+    
+    def test_generate_correlation_from_pnl_matrix(self, mock_result):
+        """レースで揃えた損益行列の相関ヒートマップ"""
+        from betting_simulation.models import PnLMatrix
+        
+        pnl = np.random.default_rng(0).normal(size=(50, 30))
+        matrix = PnLMatrix(
+            names=[f"s{i}" for i in range(30)], race_keys=np.arange(50),
+            race_ids=[str(i) for i in range(50)], pnl=pnl, active=pnl != 0
+        )
+        generator = StrategyChartGenerator()
+        fig = generator.generate(mock_result, "correlation", pnl_matrix=matrix)
+        assert fig is not None
+        plt.close(fig)
+
 
 class TestMonteCarloChartGenerator:
     """MonteCarloChartGeneratorのテスト"""
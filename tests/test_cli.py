@@ -21,6 +21,12 @@ class TestCLI:
         assert result.exit_code == 0
         assert "0.1.0" in result.output
     
+    def test_ticket_cache_option(self, runner):
+        """馬券キャッシュのオプション"""
+        result = runner.invoke(main, ["--help"])
+        assert result.exit_code == 0
+        assert "--ticket-cache" in result.output
+    
     def test_list_strategies(self, runner):
         """戦略一覧"""
         result = runner.invoke(main, ["list-strategies"])
@@ -132,3 +138,68 @@ initial_fund: 100000
         assert "compare" in result.output.lower()
         assert "--sort-by" in result.output
         assert "--walk-forward" in result.output
+        assert "--jobs" in result.output
+
+
+class TestSweepCommand:
+    """sweepコマンドのテスト"""
+    
+    def test_sweep_help(self, runner):
+        """sweepヘルプ表示"""
+        result = runner.invoke(main, ["sweep", "--help"])
+        
+        assert result.exit_code == 0
+        assert "--sort-by" in result.output
+        assert "--jobs" in result.output
+    
+    def test_sweep_invalid_config(self, runner, tmp_path):
+        """不正な組み合わせがあればエラー"""
+        config_content = """
+data_path: "nonexistent.tsv"
+strategy_name: "favorite_win"
+strategy_params:
+  top_n: [1, 2]
+"""
+        config_path = tmp_path / "sweep.yaml"
+        config_path.write_text(config_content, encoding="utf-8")
+        
+        result = runner.invoke(main, ["sweep", str(config_path)])
+        
+        assert result.exit_code != 0
+        assert "Error" in result.output
+
+
+class TestOptimizeCommand:
+    """optimizeコマンドのテスト"""
+    
+    def test_optimize_help(self, runner):
+        """optimizeヘルプ表示"""
+        result = runner.invoke(main, ["optimize", "--help"])
+        
+        assert result.exit_code == 0
+        assert "--objective" in result.output
+        assert "--eta" in result.output
+
+
+class TestPortfolioCommand:
+    """portfolioコマンドのテスト"""
+    
+    def test_portfolio_help(self, runner):
+        """portfolioヘルプ表示"""
+        result = runner.invoke(main, ["portfolio", "--help"])
+        
+        assert result.exit_code == 0
+        assert "--objective" in result.output
+        assert "--max-drawdown" in result.output
+    
+    def test_portfolio_needs_two_configs(self, runner, tmp_path):
+        """配分には2つ以上の設定が必要"""
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(
+            'data_path: "test.tsv"\nstrategy_name: "favorite_win"\n', encoding="utf-8"
+        )
+        
+        result = runner.invoke(main, ["portfolio", str(config_path)])
+        
+        assert result.exit_code != 0
+        assert "At least 2" in result.output
@@ -0,0 +1,166 @@
+"""資金管理のテスト"""
+
+import numpy as np
+import pytest
+
+from betting_simulation.fund_manager import (
+    FixedFundManager,
+    FundConstraints,
+    FundManagerFactory,
+    FundManagerGrid,
+    JointKellyFundManager,
+    KellyFundManager,
+    PercentageFundManager,
+    joint_kelly_fractions,
+)
+from betting_simulation.models import Ticket, TicketType
+
+
+def _ticket(number: int, odds: float, probability: float) -> Ticket:
+    return Ticket(TicketType.WIN, (number,), odds=odds, expected_value=probability * odds)
+
+
+class TestJointKellyFractions:
+    """同時ケリー基準の賭け比率のテスト"""
+    
+    def test_single_ticket(self):
+        """1枚なら通常のケリー基準 (bp - q) / b"""
+        assert joint_kelly_fractions([0.4], [3.0]) == pytest.approx([(2 * 0.4 - 0.6) / 2])
+        assert joint_kelly_fractions([0.2], [3.0]) == pytest.approx([0.0])
+    
+    def test_exclusive_tickets(self):
+        """排他的な的中の既知の解: f_i = p_i - R / o_i, R = (1 - sum p) / (1 - sum 1/o)"""
+        fractions = joint_kelly_fractions([0.15] * 6, [7.5] * 6)
+        
+        assert fractions == pytest.approx([0.15 - 0.5 / 7.5] * 6)
+    
+    def test_optimality(self):
+        """100枚でもKKT条件（賭ける馬券の勾配は0、賭けない馬券の勾配は0以下）を満たす"""
+        rng = np.random.default_rng(0)
+        probabilities = rng.dirichlet(np.ones(101))[:100]
+        odds = rng.uniform(0.5, 1.3, 100) / probabilities
+        
+        fractions = joint_kelly_fractions(probabilities, odds)
+        
+        total = fractions.sum()
+        wealth = 1 - total + fractions * odds
+        gradient = (
+            probabilities * odds / wealth - (probabilities / wealth).sum()
+            - (1 - probabilities.sum()) / (1 - total)
+        )
+        assert 0 < total < 1
+        assert 0 < (fractions > 0).sum() < 100
+        assert np.abs(gradient[fractions > 0]).max() < 1e-6
+        assert gradient[fractions == 0].max() < 1e-6
+    
+    def test_probabilities_summing_to_one_or_more(self):
+        """確率の合計が1以上（的中しないシナリオがない）でも合計1未満の賭け比率を返す"""
+        fractions = joint_kelly_fractions([0.75, 0.53, 0.75], [58.5, 13.9, 10.4])
+        
+        assert np.isfinite(fractions).all()
+        assert (fractions > 0).all()
+        assert fractions.sum() < 1
+    
+    def test_unpriced_tickets(self):
+        """オッズ・確率が0の馬券には賭けない"""
+        fractions = joint_kelly_fractions([0.5, 0.0, 0.3], [3.0, 5.0, 0.0])
+        
+        assert fractions[1:].tolist() == [0.0, 0.0]
+        assert fractions[0] == pytest.approx(0.25)
+
+
+class TestJointKellyFundManager:
+    """同時ケリー基準方式のテスト"""
+    
+    def test_single_ticket_matches_kelly(self):
+        params = {"kelly_fraction": 0.5}
+        constraints = FundConstraints(max_bet_ratio=1.0)
+        joint = JointKellyFundManager(params, constraints)
+        kelly = KellyFundManager(params, constraints)
+        joint.set_fund(100000)
+        kelly.set_fund(100000)
+        ticket = _ticket(1, 3.0, 0.4)
+        
+        assert joint.calculate_bet_amount(ticket) == kelly.calculate_bet_amount(ticket) == 5000
+    
+    def test_race_allocation(self):
+        """レースの全馬券をまとめて配分し、制約を適用"""
+        fund_manager = FundManagerFactory.create(
+            "joint_kelly_win", {"kelly_fraction": 1.0}, FundConstraints(max_bet_ratio=1.0)
+        )
+        fund_manager.set_fund(120000)
+        tickets = [_ticket(n, 7.5, 0.15) for n in range(1, 7)]
+        
+        amounts = fund_manager.calculate_bet_amounts(tickets)
+        
+        assert isinstance(fund_manager, JointKellyFundManager)
+        # 120000 * (0.15 - 0.5 / 7.5) = 10000
+        assert amounts == [10000] * 6
+    
+    @pytest.mark.parametrize("ticket_type, numbers", [
+        (TicketType.PLACE, [(1,), (2,), (3,)]),
+        (TicketType.WIDE, [(1, 2), (1, 3), (2, 3)]),
+    ])
+    def test_non_win_tickets_use_kelly(self, ticket_type, numbers):
+        """単勝以外（同時に的中しうる複勝・ワイド）は馬券ごとのケリー基準"""
+        params = {"kelly_fraction": 1.0}
+        constraints = FundConstraints(max_bet_ratio=1.0)
+        joint = JointKellyFundManager(params, constraints)
+        kelly = KellyFundManager(params, constraints)
+        joint.set_fund(100000)
+        kelly.set_fund(100000)
+        tickets = [Ticket(ticket_type, combo, odds=2.0, expected_value=1.2) for combo in numbers]
+        
+        # 1枚あたり (1 * 0.6 - 0.4) / 1 = 0.2（浮動小数の丸めで単位未満が切り捨てられる）
+        amounts = joint.calculate_bet_amounts(tickets)
+        assert amounts == kelly.calculate_bet_amounts(tickets)
+        assert amounts == [19900] * 3
+    
+    def test_unpriced_box_tickets(self):
+        """事前のオッズを持たないボックスの馬連には賭けない"""
+        fund_manager = JointKellyFundManager({"kelly_fraction": 1.0})
+        fund_manager.set_fund(100000)
+        tickets = [
+            Ticket(TicketType.QUINELLA, combo, odds=0.0, expected_value=0.0)
+            for combo in [(1, 2), (1, 3), (2, 3)]
+        ]
+        
+        assert fund_manager.calculate_bet_amounts(tickets) == [0, 0, 0]
+
+
+class TestFundManagerGrid:
+    """資金管理の設定の軸の配列化のテスト"""
+    
+    @pytest.mark.parametrize("manager_class, param, values", [
+        (FixedFundManager, "bet_amount", [100, 1000, 30000]),
+        (PercentageFundManager, "bet_percentage", [0.01, 0.05, 0.3]),
+        (KellyFundManager, "kelly_fraction", [0.25, 1.0]),
+        (JointKellyFundManager, "kelly_fraction", [0.25, 1.0]),
+    ])
+    def test_matches_calculate_bet_amounts(self, manager_class, param, values):
+        """設定ごとの calculate_bet_amounts と一致（資金・比率・1レースの上限・単位・倍率）"""
+        constraints = [
+            FundConstraints(),
+            FundConstraints(min_bet=300, max_bet_per_ticket=5000, max_bet_per_race=12000,
+                            max_bet_ratio=0.5, bet_unit=200),
+        ]
+        tickets = [_ticket(n, 2.0 + n, 0.45 - 0.05 * n) for n in range(1, 6)]
+        tickets[2].weight = 0.5
+        managers, funds = [], []
+        for value in values:
+            for constraint in constraints:
+                for fund in (50, 3000, 100000, 2000000):
+                    managers.append(manager_class({param: value}, constraint))
+                    funds.append(fund)
+        
+        amounts = FundManagerGrid(managers).calculate_bet_amounts(tickets, np.array(funds))
+        
+        expected = []
+        for manager, fund in zip(managers, funds):
+            manager.set_fund(fund)
+            expected.append(manager.calculate_bet_amounts(tickets))
+        assert amounts.tolist() == expected
+    
+    def test_mixed_classes(self):
+        with pytest.raises(ValueError, match="same class"):
+            FundManagerGrid([FixedFundManager(), PercentageFundManager()])
@@ -0,0 +1,102 @@
+"""逐次半減法によるパラメータ探索のテスト"""
+
+import pytest
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.halving import SuccessiveHalving, stratified_order, stratified_sample
+from betting_simulation.models import Horse, Race, RacePayouts, Surface
+from betting_simulation.planner import ExecutionPlanner
+from tests.conftest import StaticLoader
+
+
+@pytest.fixture
+def sample_races():
+    """東京・中山、芝・ダートの120レース"""
+    races = []
+    for i in range(120):
+        win_horse = 1 + (i * 7) % 4
+        horses = [
+            Horse(number=n, name=f"馬{n}", odds=1.5 * n + (i % 5) * 0.3, popularity=n,
+                  actual_rank=1 if n == win_horse else n + 1,
+                  predicted_rank=(n + i) % 4 + 1, predicted_score=0.5)
+            for n in range(1, 5)
+        ]
+        races.append(Race(
+            track="東京" if i % 3 else "中山", year=2025, kaisai_date=101 + i,
+            race_number=1, surface=Surface.TURF if i % 2 else Surface.DIRT, distance=1600,
+            horses=horses,
+            payouts=RacePayouts(win_horse=win_horse, win_payout=horses[win_horse - 1].odds * 100)
+        ))
+    return races
+
+
+def _sweep():
+    return SimulationConfig.from_sweep_dict({
+        "data_path": "races.tsv",
+        "strategy_name": "favorite_win",
+        "strategy_params": {"top_n": [1, 2, 3], "min_odds": [1.0, 3.0, 5.0]},
+        "fund_manager_name": "fixed",
+        "fund_manager_params": {"bet_amount": [100, 200]},
+    })
+
+
+class TestStratifiedSample:
+    """層化サンプル"""
+    
+    def test_nested_and_proportional(self, sample_races):
+        strata = stratified_order(sample_races, seed=1)
+        
+        small = stratified_sample(strata, 0.1)
+        large = stratified_sample(strata, 0.5)
+        
+        assert set(small) <= set(large)
+        assert small == sorted(small)
+        assert len(strata) == 4
+        # 層ごとに切り上げで取り出す
+        assert len(small) == sum(-(-len(s) // 10) for s in strata)
+        assert stratified_sample(strata, 1.0) == list(range(len(sample_races)))
+
+
+class TestSuccessiveHalving:
+    """逐次半減法"""
+    
+    def test_fractions(self):
+        halving = SuccessiveHalving(eta=3, min_fraction=0.05)
+        
+        assert halving.fractions(3) == [1.0]
+        assert halving.fractions(18) == pytest.approx([1 / 9, 1 / 3, 1.0])
+        assert halving.fractions(100)[0] == 0.05
+    
+    def test_run(self, sample_races):
+        """段ごとに候補が絞られ、最終段は全レースでの実行結果と一致"""
+        planner = ExecutionPlanner(loader=StaticLoader(sample_races))
+        sweep = _sweep()
+        
+        result = SuccessiveHalving(planner=planner, eta=3, min_fraction=0.1).run(sweep)
+        
+        sizes = [len(rung.candidates) for rung in result.rungs]
+        assert sizes == [18, 6, 2]
+        assert result.rungs[-1].fraction == 1.0
+        assert result.rungs[-1].num_races == len(sample_races)
+        assert set(result.rungs[1].candidates) == set(result.rungs[0].candidates[:6])
+        
+        finalists = list(result.results)
+        expected = planner.execute([sweep[i][1] for i in finalists], record="none")
+        for index, full in zip(finalists, expected):
+            assert result.results[index].final_fund == full.final_fund
+        assert result.best == max(finalists, key=lambda i: result.results[i].metrics.roi)
+    
+    def test_is_go_objective(self, sample_races):
+        planner = ExecutionPlanner(loader=StaticLoader(sample_races))
+        
+        result = SuccessiveHalving(planner=planner, objective="is_go").run(_sweep())
+        
+        best = result.results[result.best].metrics
+        assert all(
+            (best.is_go, best.roi) >= (r.metrics.is_go, r.metrics.roi)
+            for r in result.results.values()
+        )
+    
+    def test_unknown_objective(self):
+        with pytest.raises(ValueError, match="Unknown objective"):
+            SuccessiveHalving(objective="unknown")
@@ -0,0 +1,92 @@
+"""複数設定の実行計画のテスト"""
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.fund_manager import FundConstraints, FundManagerFactory
+from betting_simulation.planner import ExecutionPlanner, make_unique_names
+from betting_simulation.race_filter import FilterCondition, RaceFilter
+from betting_simulation.simulation_engine import SimulationEngine
+from betting_simulation.strategy import StrategyFactory
+from tests.conftest import StaticLoader
+
+
+class CountingLoader(StaticLoader):
+    """読み込み回数を数えるデータローダー"""
+    
+    def __init__(self, races):
+        super().__init__(races)
+        self.calls = []
+    
+    def load(self, path):
+        self.calls.append(path)
+        return super().load(path)
+
+
+def _config(strategy="favorite_win", top_n=1, bet_amount=100, tracks=None, **kwargs):
+    config = SimulationConfig(
+        data_path="races.tsv",
+        strategy_name=strategy,
+        strategy_params={"top_n": top_n},
+        fund_manager_name="fixed",
+        fund_manager_params={"bet_amount": bet_amount},
+        **kwargs
+    )
+    if tracks:
+        config.filter_condition = FilterCondition(tracks=tracks)
+    return config
+
+
+class TestExecutionPlanner:
+    """実行計画のテスト"""
+    
+    def test_plan_groups_datasets_and_strategies(self):
+        """データセットと戦略でグループ化"""
+        configs = [
+            _config(bet_amount=100),
+            _config(bet_amount=200),
+            _config(top_n=2),
+            _config(tracks=["東京"]),
+        ]
+        plan = ExecutionPlanner(loader=CountingLoader([])).plan(configs)
+        
+        assert len(plan) == 2
+        assert [g.members for g in plan[0].strategies] == [[0, 1], [2]]
+        assert [g.members for g in plan[1].strategies] == [[3]]
+    
+    def test_execute_matches_individual_runs(self, sample_races):
+        """共有した実行結果は設定ごとの個別実行と一致（制約・初期資金・フィルターも反映）"""
+        configs = [
+            _config(bet_amount=100),
+            _config(bet_amount=500, initial_fund=3000,
+                    fund_constraints=FundConstraints(max_bet_ratio=0.2)),
+            _config(strategy="favorite_place", tracks=["中山"]),
+        ]
+        loader = CountingLoader(sample_races)
+        results = ExecutionPlanner(loader=loader).execute(configs)
+        
+        assert loader.calls == ["races.tsv"]
+        for config, result in zip(configs, results):
+            races = RaceFilter(config.filter_condition).filter(sample_races)
+            engine = SimulationEngine(
+                StrategyFactory.create(config.strategy_name, config.strategy_params),
+                FundManagerFactory.create(
+                    config.fund_manager_name, config.fund_manager_params, config.fund_constraints
+                ),
+            )
+            expected = engine.run_simple(races, config.initial_fund)
+            assert result.initial_fund == config.initial_fund
+            assert result.final_fund == expected.final_fund
+            assert result.fund_history == expected.fund_history
+    
+    def test_execute_parallel(self, sample_races):
+        """並列実行でも同じ結果が設定の順序で返る"""
+        configs = [_config(top_n=1), _config(top_n=2), _config(bet_amount=300)]
+        planner = ExecutionPlanner(loader=CountingLoader(sample_races))
+        
+        serial = planner.execute(configs)
+        parallel = planner.execute(configs, workers=2)
+        
+        assert [r.fund_history for r in parallel] == [r.fund_history for r in serial]
+    
+    def test_make_unique_names(self):
+        """重複する名前に連番を付ける"""
+        assert make_unique_names(["a", "b", "a", "a"]) == ["a", "b", "a (2)", "a (3)"]
@@ -0,0 +1,159 @@
+"""ポートフォリオの配分の最適化のテスト"""
+
+import numpy as np
+import pytest
+
+from betting_simulation.config import SimulationConfig
+from betting_simulation.models import Horse, Race, RacePayouts, Surface, Ticket, TicketType
+from betting_simulation.planner import ExecutionPlanner
+from betting_simulation.portfolio import (
+    PortfolioOptimizer,
+    ReturnsMatrix,
+    build_returns_matrix,
+    race_returns,
+)
+from betting_simulation.precompute import RaceOutcome
+from tests.conftest import StaticLoader
+
+
+def _race(kaisai_date: int, race_number: int = 1) -> Race:
+    horses = [
+        Horse(number=n, name=f"馬{n}", odds=2.0 * n, popularity=n,
+              actual_rank=n, predicted_rank=n, predicted_score=0.5)
+        for n in range(1, 4)
+    ]
+    return Race(
+        track="東京", year=2025, kaisai_date=kaisai_date, race_number=race_number,
+        surface=Surface.TURF, distance=1600, horses=horses,
+        payouts=RacePayouts(win_horse=1, win_payout=200)
+    )
+
+
+def _outcome(race: Race, hits: list[float], weights: list[float] | None = None) -> RaceOutcome:
+    """払戻倍率（不的中は0）の馬券を持つ事前計算結果"""
+    weights = weights or [1.0] * len(hits)
+    tickets = [
+        Ticket(TicketType.WIN, (n + 1,), weight=weight) for n, weight in enumerate(weights)
+    ]
+    return RaceOutcome(race=race, tickets=tickets, hits=[o > 0 for o in hits], odds=hits)
+
+
+def _matrix(columns: list[np.ndarray]) -> ReturnsMatrix:
+    returns = np.column_stack(columns)
+    return ReturnsMatrix(
+        names=[f"s{i}" for i in range(returns.shape[1])],
+        race_ids=[str(i) for i in range(len(returns))],
+        returns=returns,
+        active=returns != 0,
+    )
+
+
+class TestReturnsMatrix:
+    """リターン行列のテスト"""
+    
+    def test_race_returns(self):
+        """払戻 / 賭け金 - 1（馬券の重みで按分、賭けなかったレースは0）"""
+        races = [_race(501), _race(502), _race(503)]
+        outcomes = [
+            _outcome(races[0], [3.0, 0.0]),
+            _outcome(races[1], [0.0, 4.0], weights=[1.0, 3.0]),
+            RaceOutcome(race=races[2]),
+        ]
+        
+        returns, active = race_returns(outcomes)
+        
+        assert returns.tolist() == pytest.approx([0.5, 2.0, 0.0])
+        assert active.tolist() == [True, True, False]
+    
+    def test_aligned_by_race_id(self):
+        """戦略ごとのレースを race_id で揃えて開催日順に並べる"""
+        early, middle, late = _race(501), _race(601), _race(701)
+        matrix = build_returns_matrix([
+            ("a", [_outcome(late, [2.0]), _outcome(early, [0.0])]),
+            ("b", [_outcome(middle, [5.0]), _outcome(_race(701), [0.0])]),
+        ])
+        
+        assert matrix.race_ids == [early.race_id, middle.race_id, late.race_id]
+        assert matrix.returns.tolist() == [[-1.0, 0.0], [0.0, 4.0], [1.0, -1.0]]
+        assert matrix.active.tolist() == [[True, False], [False, True], [True, True]]
+    
+    def test_planner_precompute(self):
+        """同じ戦略の設定は事前計算の結果を共有"""
+        races = [_race(501 + i) for i in range(5)]
+        configs = [
+            SimulationConfig.from_dict({"data_path": "races.tsv", "strategy_name": name,
+                                        "fund_manager_params": {"bet_amount": amount}})
+            for name, amount in [("favorite_win", 100), ("favorite_place", 100),
+                                 ("favorite_win", 200)]
+        ]
+        
+        outcomes = ExecutionPlanner(loader=StaticLoader(races)).precompute(configs)
+        
+        assert outcomes[0] is outcomes[2]
+        assert [len(o) for o in outcomes] == [5, 5, 5]
+        assert outcomes[1][0].tickets[0].ticket_type == TicketType.PLACE
+
+
+class TestPortfolioOptimizer:
+    """配分の最適化のテスト"""
+    
+    @pytest.fixture
+    def matrix(self):
+        """勝ち越す戦略・負け越す戦略・高配当の戦略"""
+        rng = np.random.default_rng(0)
+        size = 3000
+        return _matrix([
+            np.where(rng.random(size) < 0.35, 2.0, -1.0),
+            np.where(rng.random(size) < 0.4, 1.0, -1.0),
+            np.where(rng.random(size) < 0.1, 10.0, -1.0),
+        ])
+    
+    @pytest.mark.parametrize("method", ["gradient", "random"])
+    def test_log_growth(self, matrix, method):
+        optimizer = PortfolioOptimizer(max_drawdown=40.0, method=method)
+        
+        allocation = optimizer.optimize(matrix, initial_fund=10000)
+        weights = np.array(allocation.weights)
+        
+        assert weights[0] > 0
+        assert weights[1] < 1e-3
+        assert weights.min() >= 0 and weights.sum() <= 1.0
+        assert allocation.max_drawdown <= 40.0
+        assert allocation.score == allocation.log_growth > 0
+        assert len(allocation.equity_curve) == len(matrix.race_ids) + 1
+        assert allocation.equity_curve[0] == 10000
+        assert allocation.equity_curve[-1] == pytest.approx(
+            10000 * np.exp(allocation.log_growth * len(matrix.race_ids))
+        )
+    
+    def test_gradient_improves_random_search(self, matrix):
+        random = PortfolioOptimizer(method="random", num_samples=50).optimize(matrix)
+        gradient = PortfolioOptimizer(method="gradient", num_samples=50).optimize(matrix)
+        
+        assert gradient.score >= random.score
+    
+    def test_drawdown_constraint(self, matrix):
+        """ドローダウンの上限を下げると賭ける割合が小さくなる"""
+        loose = PortfolioOptimizer(max_drawdown=60.0).optimize(matrix)
+        tight = PortfolioOptimizer(max_drawdown=5.0).optimize(matrix)
+        
+        assert tight.max_drawdown <= 5.0
+        assert sum(tight.weights) < sum(loose.weights)
+    
+    def test_sharpe_ratio(self, matrix):
+        """重みは合計の上限かドローダウンの上限まで拡大する"""
+        allocation = PortfolioOptimizer(
+            objective="sharpe_ratio", max_drawdown=20.0, max_total_weight=0.05
+        ).optimize(matrix)
+        
+        assert allocation.score == allocation.sharpe_ratio > 0
+        assert sum(allocation.weights) == pytest.approx(0.05) or \
+            allocation.max_drawdown == pytest.approx(20.0, abs=0.1)
+    
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="Unknown objective"):
+            PortfolioOptimizer(objective="unknown")
+        with pytest.raises(ValueError, match="Unknown method"):
+            PortfolioOptimizer(method="unknown")
+        with pytest.raises(ValueError, match="max_total_weight"):
+            PortfolioOptimizer(max_total_weight=1.5)
@@ -0,0 +1,109 @@
+"""レース時系列インデックスのテスト"""
+
+from datetime import date
+
+import pytest
+
+from betting_simulation.fund_manager import FixedFundManager
+from betting_simulation.models import Horse, Race, RacePayouts, Surface
+from betting_simulation.race_index import RaceIndex, add_period, parse_period
+from betting_simulation.simulation_engine import SimulationEngine
+from betting_simulation.strategy import FavoriteWinStrategy
+
+
+def _make_race(track: str, day: date, race_number: int) -> Race:
+    horses = [
+        Horse(number=1, name="馬1", odds=2.0, popularity=1,
+              actual_rank=1 if day.day % 2 else 2, predicted_rank=1, predicted_score=0.8),
+        Horse(number=2, name="馬2", odds=4.0, popularity=2,
+              actual_rank=2 if day.day % 2 else 1, predicted_rank=2, predicted_score=0.6),
+    ]
+    return Race(
+        track=track, year=day.year, kaisai_date=day.month * 100 + day.day,
+        race_number=race_number, surface=Surface.TURF, distance=1600,
+        horses=horses,
+        payouts=RacePayouts(win_horse=1 if day.day % 2 else 2)
+    )
+
+
+@pytest.fixture
+def calendar_races():
+    """2025年1月〜6月の毎週土曜に東京・中山で2レースずつ（逆順で渡す）"""
+    races = []
+    day = date(2025, 1, 4)
+    while day < date(2025, 7, 1):
+        for race_number in (1, 2):
+            races.append(_make_race("東京", day, race_number))
+            races.append(_make_race("中山", day, race_number))
+        day = add_period(day, 1, "W")
+    return list(reversed(races))
+
+
+class TestParsePeriod:
+    """期間指定の解析"""
+    
+    def test_parse(self):
+        assert parse_period("6M") == (6, "M")
+        assert parse_period("2w") == (2, "W")
+    
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="Unknown period unit"):
+            parse_period("3Q")
+        with pytest.raises(ValueError, match="Invalid period"):
+            parse_period("M6")
+    
+    def test_add_month_clamps_to_month_end(self):
+        assert add_period(date(2025, 1, 31), 1, "M") == date(2025, 2, 28)
+        assert add_period(date(2024, 11, 30), 3, "M") == date(2025, 2, 28)
+
+
+class TestRaceIndex:
+    """時系列インデックス"""
+    
+    def test_sorted_with_track_tiebreak(self, calendar_races):
+        index = RaceIndex(calendar_races)
+        
+        keys = [(r.race_date, r.race_number, r.track) for r in index.races]
+        assert keys == sorted(keys)
+    
+    def test_between(self, calendar_races):
+        index = RaceIndex(calendar_races)
+        
+        races = index.between(date(2025, 2, 1), date(2025, 3, 1))
+        assert races
+        assert all(date(2025, 2, 1) <= r.race_date < date(2025, 3, 1) for r in races)
+        assert len(races) == sum(
+            date(2025, 2, 1) <= r.race_date < date(2025, 3, 1) for r in calendar_races
+        )
+    
+    def test_calendar_windows(self, calendar_races):
+        index = RaceIndex(calendar_races)
+        
+        windows = index.calendar_windows("2M", "1M")
+        # 1/4起点: 1/4-3/4, 2/4-4/4, 3/4-5/4, 4/4-6/4（5/4-7/4はデータ範囲外）
+        assert len(windows) == 4
+        assert windows[0] == index.locate(date(2025, 1, 4), date(2025, 3, 4))
+        assert all(start < stop for start, stop in windows)
+
+
+class TestCalendarWalkForward:
+    """暦上の期間によるWalk-Forward"""
+    
+    def test_matches_date_slices(self, calendar_races):
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 1}),
+            FixedFundManager(params={"bet_amount": 100}),
+        )
+        index = RaceIndex(calendar_races)
+        
+        results = engine.run_walk_forward(index, 10000, window="2M", step="1M")
+        
+        assert len(results) == 4
+        start = date(2025, 1, 4)
+        for result in results:
+            expected = engine.run_simple(
+                index.between(start, add_period(start, 2, "M")), 10000
+            )
+            assert result.final_fund == expected.final_fund
+            assert result.metrics.total_bets == expected.metrics.total_bets
+            start = add_period(start, 1, "M")
@@ -0,0 +1,68 @@
+"""列指向のレーステーブルのテスト"""
+
+import numpy as np
+
+from betting_simulation.models import Horse, Race, Surface, Ticket, TicketType
+from betting_simulation.race_table import RaceTable, TicketArrays, slice_count
+
+
+def _make_race(predicted_ranks: list[int]) -> Race:
+    horses = [
+        Horse(number=n + 1, name=f"馬{n + 1}", odds=2.0 + n, popularity=n + 1,
+              actual_rank=n + 1, predicted_rank=rank, predicted_score=0.5)
+        for n, rank in enumerate(predicted_ranks)
+    ]
+    return Race(
+        track="東京", year=2025, kaisai_date=501, race_number=1,
+        surface=Surface.TURF, distance=1600, horses=horses
+    )
+
+
+class TestRaceTable:
+    """レーステーブルのテスト"""
+    
+    def test_padding(self):
+        """頭数の少ないレースは埋め草で揃える"""
+        table = RaceTable([_make_race([2, 1, 3]), _make_race([1])])
+        
+        assert table.width == 3
+        assert table.num_horses.tolist() == [3, 1]
+        assert table.valid.tolist() == [[True, True, True], [True, False, False]]
+        assert table.number.tolist() == [[1, 2, 3], [1, 0, 0]]
+        assert table.predicted_order[0].tolist() == [1, 0, 2]
+    
+    def test_top_predicted_safe(self):
+        """重複のあるレースはスキップ、頭数が足りなければ全頭"""
+        races = [_make_race([1, 2, 2]), _make_race([1, 2]), _make_race([1, 1, 2])]
+        table = RaceTable(races)
+        
+        _, counts = table.top_predicted_safe(3)
+        
+        assert counts.tolist() == [-1, 2, -1]
+        assert table.has_duplicate_predicted_rank(1).tolist() == [False, False, True]
+        assert [r.get_top_predicted_safe(3) is None for r in races] == [True, False, True]
+    
+    def test_slice_count(self):
+        """Pythonのスライスと同じ要素数"""
+        lengths = np.array([0, 2, 5])
+        for stop in (-3, -1, 0, 3, 10):
+            expected = [len(range(n)[:stop]) for n in lengths]
+            assert slice_count(lengths, stop).tolist() == expected
+
+
+class TestTicketArrays:
+    """列指向の馬券リストのテスト"""
+    
+    def test_split(self):
+        """レースごとの Ticket のリストに変換"""
+        tickets = TicketArrays.build(
+            TicketType.QUINELLA, np.array([0, 0, 2]), np.array([[1, 2], [1, 3], [4, 5]])
+        )
+        
+        split = tickets.split(3)
+        
+        assert split == [
+            [Ticket(TicketType.QUINELLA, (1, 2)), Ticket(TicketType.QUINELLA, (1, 3))],
+            [],
+            [Ticket(TicketType.QUINELLA, (4, 5))],
+        ]
@@ -1,15 +1,22 @@
 """シミュレーションエンジンの拡張テスト"""
 
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 
 from betting_simulation.models import (
-    Horse, Race, RacePayouts, Surface, SimulationResult, SimulationMetrics
+    BetLog, BetRecord, Horse, Race, RacePayouts, Surface, SimulationResult, SimulationMetrics
 )
-from betting_simulation.strategy import FavoriteWinStrategy, FavoritePlaceStrategy
-from betting_simulation.fund_manager import FixedFundManager
+from betting_simulation.strategy import (
+    FavoriteWinStrategy, FavoritePlaceStrategy, PortfolioStrategy
+)
+from betting_simulation.fund_manager import FixedFundManager, FundConstraints, PercentageFundManager
 from betting_simulation.evaluator import BetEvaluator
-from betting_simulation.simulation_engine import SimulationEngine, StrategyComparator, MetricsCalculator
+from betting_simulation.precompute import precompute_outcomes
+from betting_simulation.simulation_engine import (
+    SimulationEngine, StrategyComparator, MetricsCalculator, MetricsAccumulator,
+    expand_param_grid, replay_bankrolls
+)
 from betting_simulation.config import SimulationConfig
 
 
@@ -74,6 +81,89 @@ class TestSimulationEngine:
         assert result.mean_final_fund > 0
         assert 0 <= result.profit_rate <= 100
     
+    def test_monte_carlo_metric_distributions(self, sample_races, simulation_engine):
+        """モンテカルロで指標の分布とGo/No-Go成立確率を集計"""
+        result = simulation_engine.run_monte_carlo(
+            sample_races, 10000, num_trials=20, random_seed=1
+        )
+        
+        dd = result.metric_distributions["max_drawdown"]
+        assert dd["p5"] <= dd["p50"] <= dd["p95"]
+        assert "max_consecutive_losses" in result.metric_distributions
+        assert result.metric_distributions["min_fund"]["p95"] <= 10000
+        assert set(result.go_nogo_rates) == {"roi", "max_drawdown", "hit_rate", "is_go"}
+        assert result.go_nogo_rates["is_go"] <= result.go_nogo_rates["max_drawdown"]
+        assert result.ruin_rate == 0.0
+    
+    def test_monte_carlo_time_to_ruin(self, sample_races):
+        """破産ラインに到達した試行の停止までの賭け数"""
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 1}),
+            FixedFundManager(params={"bet_amount": 100}),
+        )
+        # 初期資金1000円・破産ライン950円なら1回外れた時点で停止
+        result = engine.run_monte_carlo(
+            sample_races, 1000, num_trials=10, random_seed=1, bankruptcy_threshold=950
+        )
+        
+        assert result.ruin_rate > 0
+        assert result.metric_distributions["time_to_ruin"]["mean"] >= 1
+    
+    @pytest.mark.parametrize("percentage, constraints, ruined", [
+        (0.05, FundConstraints(), False),
+        (0.3, FundConstraints(max_bet_ratio=0.5, max_bet_per_race=2500, bet_unit=300), False),
+        (0.9, FundConstraints(max_bet_ratio=1.0), True),
+    ])
+    def test_monte_carlo_percentage_matches_replay(
+        self, sample_races, percentage, constraints, ruined
+    ):
+        """資金比率方式の一括再生は試行ごとの再生（record="summary"）と同じ結果"""
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 3}),
+            PercentageFundManager({"bet_percentage": percentage}, constraints),
+        )
+        
+        fast = engine.run_monte_carlo(
+            sample_races, 3000, num_trials=30, random_seed=5, bankruptcy_threshold=1000
+        )
+        loop = engine.run_monte_carlo(
+            sample_races, 3000, num_trials=30, random_seed=5, bankruptcy_threshold=1000,
+            record="summary"
+        )
+        
+        assert fast.final_funds == loop.final_funds
+        assert fast.ruin_rate == loop.ruin_rate
+        assert (fast.ruin_rate > 0) == ruined
+        assert fast.go_nogo_rates == loop.go_nogo_rates
+        for name, summary in loop.metric_distributions.items():
+            assert fast.metric_distributions[name] == pytest.approx(summary)
+    
+    def test_monte_carlo_percentage_threshold_above_initial_fund(self, sample_races):
+        """初期資金が破産ラインを下回る場合も試行ごとの再生と同じ結果"""
+        for race in sample_races[::2]:
+            race.horses[0].odds = 4.0
+        # 本命のオッズが4.0のレースだけ最小賭け金以上になる（他は倍率0.3で賭けない）
+        engine = SimulationEngine(
+            PortfolioStrategy({"strategies": [
+                {"name": "favorite_win", "params": {"top_n": 1}, "weight": 0.3},
+                {"name": "favorite_win", "params": {"top_n": 1, "min_odds": 3.0}, "weight": 0.7},
+            ]}),
+            PercentageFundManager({"bet_percentage": 0.05}),
+        )
+        
+        fast = engine.run_monte_carlo(
+            sample_races, 3000, num_trials=30, random_seed=5, bankruptcy_threshold=3100
+        )
+        loop = engine.run_monte_carlo(
+            sample_races, 3000, num_trials=30, random_seed=5, bankruptcy_threshold=3100,
+            record="summary"
+        )
+        
+        assert fast.final_funds == loop.final_funds
+        assert fast.ruin_rate == loop.ruin_rate
+        assert 3000 in fast.final_funds
+        assert len(set(fast.final_funds)) > 1
+    
     def test_run_walk_forward(self, sample_races, simulation_engine):
         """Walk-Forwardシミュレーション"""
         results = simulation_engine.run_walk_forward(
@@ -84,6 +174,143 @@ class TestSimulationEngine:
         # ウィンドウ数を確認（10レース、ウィンドウ5、ステップ2）
         # (10 - 5) / 2 + 1 = 3ウィンドウ
         assert len(results) >= 1
+    
+    def test_walk_forward_matches_run_simple(self, sample_races, simulation_engine):
+        """事前計算を共有したウィンドウの再生はrun_simpleと一致"""
+        results = simulation_engine.run_walk_forward(
+            sample_races, 10000, window_size=5, step_size=2
+        )
+        
+        assert len(results) == 3
+        for i, result in enumerate(results):
+            expected = simulation_engine.run_simple(sample_races[i * 2:i * 2 + 5], 10000)
+            assert result.final_fund == expected.final_fund
+            assert result.fund_history == expected.fund_history
+    
+    def test_walk_forward_parallel(self, sample_races, simulation_engine):
+        """並列実行でも逐次実行と同じ結果がウィンドウ順に返る"""
+        serial = simulation_engine.run_walk_forward(
+            sample_races, 10000, window_size=4, step_size=1, record="none"
+        )
+        parallel = simulation_engine.run_walk_forward(
+            sample_races, 10000, window_size=4, step_size=1, record="none", workers=2
+        )
+        
+        assert [r.final_fund for r in parallel] == [r.final_fund for r in serial]
+        assert [r.metrics.roi for r in parallel] == [r.metrics.roi for r in serial]
+        assert all(r.bet_history == [] for r in parallel)
+    
+    @pytest.mark.parametrize("initial_fund", [10000, 1000])
+    def test_walk_forward_fixed_stake_fast_path(self, sample_races, simulation_engine, initial_fund):
+        """固定賭け金の累積和による一括計算は再生と一致（制約に掛かる場合は再生にフォールバック）"""
+        results = simulation_engine.run_walk_forward(
+            sample_races, initial_fund, window_size=4, step_size=1, record="summary"
+        )
+        
+        assert len(results) == 7
+        for i, result in enumerate(results):
+            expected = simulation_engine.run_simple(
+                sample_races[i:i + 4], initial_fund, record="summary"
+            )
+            assert result.final_fund == expected.final_fund
+            assert result.fund_history == expected.fund_history
+            assert result.metrics.total_races == expected.metrics.total_races
+            assert result.metrics.roi == pytest.approx(expected.metrics.roi)
+            assert result.metrics.max_drawdown == pytest.approx(expected.metrics.max_drawdown)
+            assert result.metrics.sharpe_ratio == pytest.approx(expected.metrics.sharpe_ratio)
+    
+    def test_run_simple_record_none(self, sample_races, simulation_engine):
+        """record="none"では履歴を保持せず指標のみ返す"""
+        full = simulation_engine.run_simple(sample_races, 10000, record="full")
+        result = simulation_engine.run_simple(sample_races, 10000, record="none")
+        
+        assert result.bet_history == []
+        assert result.fund_history == []
+        assert result.final_fund == full.final_fund
+        assert result.metrics.total_bets == full.metrics.total_bets
+        assert result.metrics.max_drawdown == pytest.approx(full.metrics.max_drawdown)
+    
+    def test_run_simple_record_summary(self, sample_races, simulation_engine):
+        """record="summary"では資金推移のみ保持"""
+        full = simulation_engine.run_simple(sample_races, 10000, record="full")
+        result = simulation_engine.run_simple(sample_races, 10000, record="summary")
+        
+        assert result.bet_history == []
+        assert result.fund_history == full.fund_history
+    
+    def test_unknown_record_mode(self, sample_races, simulation_engine):
+        """未知の記録モードでエラー"""
+        with pytest.raises(ValueError, match="Unknown record mode"):
+            simulation_engine.run_simple(sample_races, 10000, record="all")
+    
+    @pytest.mark.parametrize("settlement", ["race", "day"])
+    def test_settlement_modes(self, sample_races, settlement):
+        """レース・開催日ごとの精算では同じ資金から賭け金を決め、まとめて精算"""
+        for race in sample_races[1::2]:
+            race.kaisai_date -= 1  # 2レースずつ同じ開催日
+            race.race_number = 2
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 3}),
+            PercentageFundManager(params={"percentage": 0.1}),
+            BetEvaluator(),
+            settlement=settlement
+        )
+        result = engine.run_simple(sample_races, 10000)
+        group_size = 3 if settlement == "race" else 6
+        expected = MetricsCalculator.calculate(result)
+        
+        records = list(result.bet_history)
+        assert len(records) == 30
+        for start in range(0, len(records), group_size):
+            group = records[start:start + group_size]
+            assert len({r.fund_before for r in group}) == 1
+            assert len({r.fund_after for r in group}) == 1
+            assert len({r.ticket.amount for r in group}) == 1
+            assert group[0].fund_after == group[0].fund_before + sum(
+                r.profit for r in group
+            )
+        assert result.metrics.total_races == expected.total_races
+        assert result.metrics.max_drawdown == pytest.approx(expected.max_drawdown)
+        assert result.metrics.max_drawdown_period == expected.max_drawdown_period
+        assert result.metrics.sharpe_ratio == pytest.approx(expected.sharpe_ratio)
+    
+    def test_settlement_ruin_after_group(self, sample_races):
+        """破産はグループの精算後に判定する"""
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 3}),
+            FixedFundManager(params={"bet_amount": 100}),
+            BetEvaluator(),
+            settlement="race"
+        )
+        result = engine.run_simple(sample_races, 10000, bankruptcy_threshold=9990)
+        
+        assert result.metrics.total_bets == 3
+        assert result.final_fund == 9900
+    
+    def test_settlement_day_stake_within_fund(self, sample_races):
+        """開催日の賭け金の合計は開始時の資金を超えない"""
+        for number, race in enumerate(sample_races, 1):
+            race.kaisai_date = 500  # 全レースが同じ開催日で、本命は全て外れ
+            race.race_number = number
+            race.payouts.win_horse = 3
+        engine = SimulationEngine(
+            FavoriteWinStrategy(params={"top_n": 1}),
+            FixedFundManager(
+                params={"bet_amount": 1000}, constraints=FundConstraints(max_bet_ratio=1.0)
+            ),
+            BetEvaluator(),
+            settlement="day"
+        )
+        result = engine.run_simple(sample_races, 3000)
+        
+        assert result.final_fund == 0
+        assert result.metrics.total_bets == 3
+        assert result.metrics.total_invested == 3000
+    
+    def test_unknown_settlement(self):
+        """未知の精算の単位でエラー"""
+        with pytest.raises(ValueError, match="Unknown settlement"):
+            SimulationEngine(FavoriteWinStrategy(), FixedFundManager(), settlement="week")
 
 
 class TestStrategyComparator:
@@ -110,6 +337,25 @@ class TestStrategyComparator:
         assert "favorite_win" in results
         assert "favorite_place" in results
     
+    def test_compare_parallel(self, sample_races):
+        """並列実行でも逐次実行と同じ結果が同じ順序で返る"""
+        comparator = StrategyComparator()
+        strategies = [
+            (f"top{n}", FavoriteWinStrategy(params={"top_n": n}),
+             FixedFundManager(params={"bet_amount": 100}))
+            for n in (1, 2, 3)
+        ]
+        
+        serial = comparator.compare(sample_races, strategies, 10000)
+        parallel = comparator.compare(sample_races, strategies, 10000, workers=2)
+        
+        assert list(parallel) == list(serial) == ["top1", "top2", "top3"]
+        for name in serial:
+            assert parallel[name].final_fund == serial[name].final_fund
+            assert parallel[name].fund_history == serial[name].fund_history
+        # レースは元のオブジェクトに置き換わっている
+        assert parallel["top1"].bet_history[0].race is sample_races[0]
+    
     def test_compare_summary(self, sample_races):
         """比較サマリーを取得"""
         comparator = StrategyComparator()
@@ -153,6 +399,61 @@ class TestStrategyComparator:
         
         assert len(ranking) == 2
 
+    
+    def test_pnl_matrix(self, sample_races):
+        """レースで揃えた損益行列（賭けなかったレースは0）"""
+        comparator = StrategyComparator()
+        results = comparator.compare(sample_races, [
+            ("win", FavoriteWinStrategy(params={"top_n": 1}),
+             FixedFundManager(params={"bet_amount": 100})),
+            ("place", FavoritePlaceStrategy(params={"top_n": 2}),
+             FixedFundManager(params={"bet_amount": 100})),
+        ], 10000)
+        # 後半のレースだけで実行した戦略
+        results.update(comparator.compare(sample_races[5:], [
+            ("late", FavoriteWinStrategy(params={"top_n": 2}),
+             FixedFundManager(params={"bet_amount": 200})),
+        ], 10000))
+        
+        matrix = comparator.pnl_matrix(results)
+        
+        assert matrix.names == ["win", "place", "late"]
+        assert matrix.race_ids == [race.race_id for race in sample_races]
+        assert np.all(np.diff(matrix.race_keys) > 0)
+        assert matrix.pnl.sum(axis=0).tolist() == [r.profit for r in results.values()]
+        assert matrix.pnl[:5, 2].tolist() == [0] * 5
+        assert matrix.active[:, 2].tolist() == [False] * 5 + [True] * 5
+        expected = [
+            sum(b.payout - b.ticket.amount for b in results["win"].bet_history if b.race is race)
+            for race in sample_races
+        ]
+        assert matrix.pnl[:, 0].tolist() == expected
+        
+        assert matrix.covariance() == pytest.approx(np.cov(matrix.pnl, rowvar=False))
+        # place は毎レース同じ損益（分散0）なので win と late の間で比べる
+        varying = [0, 2]
+        assert matrix.correlation()[np.ix_(varying, varying)] == pytest.approx(
+            np.corrcoef(matrix.pnl[:, varying], rowvar=False)
+        )
+        assert matrix.to_dataframe().loc[sample_races[0].race_id, "win"] == matrix.pnl[0, 0]
+    
+    def test_drawdown_overlap(self):
+        """ドローダウン中のレースの共通部分 / 和集合"""
+        from betting_simulation.models import PnLMatrix
+        
+        pnl = np.array([[100, -100, 0], [-50, 50, 0], [-50, 100, 0], [100, -10, 0]])
+        matrix = PnLMatrix(
+            names=["a", "b", "c"], race_keys=np.arange(4), race_ids=["1", "2", "3", "4"],
+            pnl=pnl, active=pnl != 0
+        )
+        
+        overlap = matrix.drawdown_overlap()
+        
+        # a: レース2・3でドローダウン、b: レース1・2・4、c: なし
+        assert overlap.tolist() == [[1.0, 0.25, 0.0], [0.25, 1.0, 0.0], [0.0, 0.0, 0.0]]
+        # 分散0の戦略との相関は0
+        assert matrix.correlation()[2].tolist() == [0.0, 0.0, 1.0]
+
 
 class TestMetricsCalculator:
     """メトリクス計算のテスト"""
@@ -165,3 +466,272 @@ class TestMetricsCalculator:
         assert result.metrics is not None
         assert result.metrics.total_bets > 0
         assert result.metrics.max_drawdown >= 0
+    
+    def test_array_drawdown_matches_loop(self):
+        """配列版ドローダウンはループ版と一致"""
+        fund_history = [1000, 1200, 900, 900, 1300, 650, 700, 1400, 1100]
+        
+        max_dd, period = MetricsCalculator._max_drawdown_array(np.array([fund_history]))
+        
+        assert (max_dd[0], period[0]) == MetricsCalculator._calculate_max_drawdown(fund_history)
+    
+    def test_bet_log_result_matches_records(self, sample_races, simulation_engine):
+        """BetLogからの配列計算とBetRecordリストからの計算が一致"""
+        result = simulation_engine.run_simple(sample_races, 10000)
+        from_records = MetricsCalculator.calculate(SimulationResult(
+            initial_fund=result.initial_fund,
+            final_fund=result.final_fund,
+            bet_history=list(result.bet_history),
+            fund_history=result.fund_history,
+        ))
+        from_arrays = MetricsCalculator.calculate(result)
+        
+        assert from_arrays.total_races == from_records.total_races
+        assert from_arrays.max_drawdown == from_records.max_drawdown
+        assert from_arrays.max_drawdown_period == from_records.max_drawdown_period
+        assert from_arrays.max_consecutive_losses == from_records.max_consecutive_losses
+        assert from_arrays.sharpe_ratio == pytest.approx(from_records.sharpe_ratio)
+    
+    def test_calculate_batch_with_lengths(self):
+        """試行ごとに賭け数が異なる行列を一括計算"""
+        fund_paths = np.array([
+            [1000, 900, 800, 1200],
+            [1000, 1300, 0, 0],  # 1回で終了（以降は無効）
+        ])
+        amounts = np.array([[100, 100, 100], [100, 0, 0]])
+        payouts = np.array([[0, 0, 500], [400, 0, 0]])
+        is_hit = np.array([[False, False, True], [True, False, False]])
+        
+        batch = MetricsCalculator.calculate_batch(
+            fund_paths, amounts, payouts, is_hit, lengths=np.array([3, 1])
+        )
+        
+        assert list(batch["total_bets"]) == [3, 1]
+        assert list(batch["total_invested"]) == [300, 100]
+        assert list(batch["max_consecutive_losses"]) == [2, 0]
+        assert list(batch["max_consecutive_wins"]) == [1, 1]
+        assert batch["max_drawdown"][0] == pytest.approx(20.0)
+        assert batch["max_drawdown"][1] == 0.0
+        assert list(batch["roi"]) == pytest.approx([500 / 3, 400.0])
+
+
+class TestMetricsAccumulator:
+    """オンライン指標集計のテスト"""
+    
+    def test_matches_metrics_calculator(self, sample_races, simulation_engine):
+        """事後計算と同じ指標になる"""
+        result = simulation_engine.run_simple(sample_races, 10000)
+        expected = MetricsCalculator.calculate(result)
+        
+        assert result.metrics.total_races == expected.total_races
+        assert result.metrics.total_bets == expected.total_bets
+        assert result.metrics.total_hits == expected.total_hits
+        assert result.metrics.total_invested == expected.total_invested
+        assert result.metrics.total_payout == expected.total_payout
+        assert result.metrics.max_drawdown == pytest.approx(expected.max_drawdown)
+        assert result.metrics.max_drawdown_period == expected.max_drawdown_period
+        assert result.metrics.max_consecutive_wins == expected.max_consecutive_wins
+        assert result.metrics.max_consecutive_losses == expected.max_consecutive_losses
+        assert result.metrics.sharpe_ratio == pytest.approx(expected.sharpe_ratio)
+        assert result.metrics.is_go == expected.is_go
+    
+    def test_manual_updates(self):
+        """手動で更新した場合の集計"""
+        acc = MetricsAccumulator(1000)
+        acc.begin_race()
+        acc.add_bet(100, 0, False, 900)
+        acc.add_bet(100, 0, False, 800)
+        acc.begin_race()
+        acc.add_bet(100, 400, True, 1100)
+        
+        metrics = acc.to_metrics()
+        
+        assert metrics.total_races == 2
+        assert metrics.total_bets == 3
+        assert metrics.total_hits == 1
+        assert metrics.max_consecutive_losses == 2
+        assert metrics.max_drawdown == pytest.approx(20.0)
+        assert metrics.profit == 100
+    
+    def test_add_bets_matches_add_bet(self):
+        """まとめて反映しても add_bet を順に呼んだのと同じ集計"""
+        amounts = np.array([100, 200, 100, 0, 300])
+        payouts = np.array([0, 500, 300, 0, 0])
+        is_hit = payouts > 0
+        funds = [10000 + int((payouts - amounts)[:i + 1].sum()) for i in range(len(amounts))]
+        
+        sequential = MetricsAccumulator(10000)
+        sequential.begin_race()
+        sequential.add_bet(100, 0, False, 9900)
+        batch = MetricsAccumulator(10000)
+        batch.begin_race()
+        batch.add_bet(100, 0, False, 9900)
+        sequential.begin_race()
+        for amount, payout, hit in zip(amounts.tolist(), payouts.tolist(), is_hit.tolist()):
+            sequential.add_bet(amount, payout, hit, funds[-1] - 100)
+        batch.begin_race()
+        batch.add_bets(amounts, payouts, is_hit, funds[-1] - 100)
+        
+        expected = sequential.to_metrics()
+        metrics = batch.to_metrics()
+        
+        assert metrics.sharpe_ratio == pytest.approx(expected.sharpe_ratio)
+        metrics.sharpe_ratio = expected.sharpe_ratio
+        assert metrics == expected
+    
+    def test_no_bets(self):
+        """賭けがない場合は初期値"""
+        metrics = MetricsAccumulator(1000).to_metrics()
+        
+        assert metrics.total_bets == 0
+        assert metrics.max_drawdown == 0.0
+
+
+class TestReplayBankrolls:
+    """資金設定の一括再生のテスト"""
+    
+    def test_matches_replay(self, sample_races):
+        """初期資金・賭け比率・制約ごとの _replay と一致（破産で停止する設定を含む）"""
+        strategy = FavoriteWinStrategy(params={"top_n": 3})
+        outcomes = precompute_outcomes(strategy, BetEvaluator(), sample_races)
+        managers, funds = [], []
+        for percentage in (0.05, 0.3, 0.9):
+            for constraints in (FundConstraints(), FundConstraints(max_bet_ratio=1.0)):
+                for fund in (500, 10000):
+                    managers.append(
+                        PercentageFundManager({"bet_percentage": percentage}, constraints)
+                    )
+                    funds.append(fund)
+        
+        results = replay_bankrolls(outcomes, managers, funds)
+        
+        for manager, fund, result in zip(managers, funds, results):
+            expected, _ = SimulationEngine(strategy, manager)._replay(outcomes, fund, None, "none")
+            m, e = result.metrics, expected.metrics
+            assert result.final_fund == expected.final_fund
+            assert (m.total_races, m.total_bets, m.total_hits, m.total_invested) == (
+                e.total_races, e.total_bets, e.total_hits, e.total_invested
+            )
+            assert m.max_drawdown == pytest.approx(e.max_drawdown)
+            assert m.max_drawdown_period == e.max_drawdown_period
+            assert m.max_consecutive_losses == e.max_consecutive_losses
+            assert m.sharpe_ratio == pytest.approx(e.sharpe_ratio)
+        assert 0 < min(result.metrics.total_bets for result in results[-2:]) < 30
+    
+    def test_length_mismatch(self, sample_races):
+        with pytest.raises(ValueError, match="differ in length"):
+            replay_bankrolls([], [FixedFundManager()], [10000, 20000])
+
+
+class TestBetLog:
+    """列指向の賭け履歴のテスト"""
+    
+    def test_engine_returns_bet_log(self, sample_races, simulation_engine):
+        """エンジンはBetLogで履歴を返す"""
+        result = simulation_engine.run_simple(sample_races, 10000)
+        
+        assert isinstance(result.bet_history, BetLog)
+        assert len(result.bet_history) == result.metrics.total_bets
+    
+    def test_iterates_bet_records(self, sample_races, simulation_engine):
+        """反復でBetRecordのビューを返す"""
+        result = simulation_engine.run_simple(sample_races, 10000)
+        records = list(result.bet_history)
+        
+        assert all(isinstance(r, BetRecord) for r in records)
+        assert records[0].race is sample_races[0]
+        assert records[0].ticket.horse_numbers == (1,)
+        assert records[-1].fund_after == result.final_fund
+        assert MetricsCalculator.calculate(result).total_payout == result.metrics.total_payout
+    
+    def test_to_dataframe_zero_copy(self, sample_races, simulation_engine):
+        """to_dataframeは列をコピーしない"""
+        log = simulation_engine.run_simple(sample_races, 10000).bet_history
+        df = log.to_dataframe()
+        
+        assert len(df) == len(log)
+        assert np.shares_memory(df["amount"].to_numpy(), log.column("amount"))
+        assert list(df["race_id"].astype(str)) == [r.race.race_id for r in log]
+    
+    def test_growth_and_from_records(self, sample_races, simulation_engine):
+        """容量を超えて追記でき、BetRecordから再構築できる"""
+        result = simulation_engine.run_simple(sample_races, 10000)
+        rebuilt = BetLog.from_records(list(result.bet_history))
+        
+        small = BetLog(capacity=1)
+        for record in result.bet_history:
+            small.append(record.race, record.ticket, record.ticket.amount, record.is_hit,
+                         record.payout, record.fund_before, record.fund_after)
+        
+        assert np.array_equal(rebuilt.column("fund_after"), result.bet_history.column("fund_after"))
+        assert np.array_equal(small.column("payout"), result.bet_history.column("payout"))
+
+    
+    def test_concat(self, sample_races, simulation_engine):
+        """連結するとレースのインデックスが振り直される"""
+        first = simulation_engine.run_simple(sample_races[:4], 10000).bet_history
+        second = simulation_engine.run_simple(sample_races[4:], 10000).bet_history
+        merged = BetLog.concat([first, second])
+        
+        assert len(merged) == len(first) + len(second)
+        assert [r.race for r in merged] == [r.race for r in first] + [r.race for r in second]
+
+
+class TestWalkForwardOptimize:
+    """Walk-Forward最適化のテスト"""
+    
+    def test_expand_param_grid(self):
+        """グリッドを戦略・資金管理ごとの組み合わせに展開"""
+        combos = expand_param_grid({"strategy.top_n": [1, 2], "fund_manager.bet_amount": [100]})
+        
+        assert combos == [
+            {"strategy": {"top_n": 1}, "fund_manager": {"bet_amount": 100}},
+            {"strategy": {"top_n": 2}, "fund_manager": {"bet_amount": 100}},
+        ]
+    
+    def test_unknown_target(self):
+        """接頭辞が不正ならエラー"""
+        with pytest.raises(ValueError, match="Unknown parameter target"):
+            expand_param_grid({"top_n": [1]})
+    
+    def test_optimize(self, sample_races, simulation_engine):
+        """学習区間で選んだパラメータを検証区間に適用し、資金を引き継いでつなぐ"""
+        grid = {"strategy.top_n": [1, 2], "fund_manager.bet_amount": [100, 200]}
+        result = simulation_engine.run_walk_forward_optimize(
+            sample_races, 10000, grid, train_size=4, test_size=2
+        )
+        
+        assert result.windows == [(0, 4, 4, 6), (2, 6, 6, 8), (4, 8, 8, 10)]
+        assert len(result.chosen_params) == 3
+        
+        # 学習区間の値は選ばれたパラメータでの実行結果と一致
+        params = result.chosen_params[0]
+        engine = simulation_engine.with_params(params["strategy"], params["fund_manager"])
+        assert result.train_scores[0] == engine.run_simple(sample_races[0:4], 10000).metrics.roi
+        
+        # 検証区間は資金を引き継ぐ
+        assert result.test_results[1].initial_fund == result.test_results[0].final_fund
+        oos = result.out_of_sample
+        assert oos.final_fund == result.test_results[-1].final_fund
+        assert oos.metrics.total_bets == sum(r.metrics.total_bets for r in result.test_results)
+        assert len(oos.fund_history) == oos.metrics.total_bets + 1
+    
+    def test_parallel_is_deterministic(self, sample_races, simulation_engine):
+        """並列実行でも逐次実行と同じ結果"""
+        grid = {"strategy.top_n": [1, 2]}
+        serial = simulation_engine.run_walk_forward_optimize(
+            sample_races, 10000, grid, train_size=3, test_size=1
+        )
+        parallel = simulation_engine.run_walk_forward_optimize(
+            sample_races, 10000, grid, train_size=3, test_size=1, workers=2
+        )
+        
+        assert parallel.chosen_params == serial.chosen_params
+        assert parallel.out_of_sample.fund_history == serial.out_of_sample.fund_history
+    
+    def test_unknown_objective(self, sample_races, simulation_engine):
+        """未知の目的指標でエラー"""
+        with pytest.raises(ValueError, match="Unknown objective"):
+            simulation_engine.run_walk_forward_optimize(
+                sample_races, 10000, {"strategy.top_n": [1]}, objective="drawdown"
+            )
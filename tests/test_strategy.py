@@ -1,8 +1,13 @@
 """戦略のユニットテスト"""
 
+import random
+from dataclasses import replace
+
 import pytest
 
-from betting_simulation.models import Horse, Race, Surface, TicketType
+from betting_simulation.fund_manager import FixedFundManager, FundConstraints
+from betting_simulation.models import Horse, Race, Surface, Ticket, TicketType
+from betting_simulation.race_table import RaceTable
 from betting_simulation.strategy import (
     FavoriteWinStrategy,
     ValueWinStrategy,
@@ -16,6 +21,7 @@ from betting_simulation.strategy import (
     FormationTrioStrategy,
     HoleHorseWinStrategy,
     HoleHorsePlaceStrategy,
+    PortfolioStrategy,
     StrategyFactory,
 )
 
@@ -247,6 +253,26 @@ class TestFormationTrioStrategy:
         # 馬券が生成されることを確認
         assert len(tickets) > 0
         assert all(t.ticket_type == TicketType.TRIO for t in tickets)
+    
+    def test_large_formation(self, random_races):
+        """3-6-10のフォーメーションは3重ループで重複を除いた組み合わせと同じ順序"""
+        strategy = FormationTrioStrategy(params={"first_n": 3, "second_n": 6, "third_n": 10})
+        
+        for race in random_races:
+            top_horses = race.get_top_predicted_safe(10)
+            expected = []
+            if top_horses is not None and len(top_horses) >= 3:
+                numbers = [h.number for h in top_horses]
+                for h1 in numbers[:3]:
+                    for h2 in numbers[:6]:
+                        for h3 in numbers[:10]:
+                            combo = tuple(sorted([h1, h2, h3]))
+                            if len(set(combo)) == 3 and combo not in expected:
+                                expected.append(combo)
+            
+            tickets = strategy.generate_tickets(race)
+            
+            assert [t.horse_numbers for t in tickets] == expected
 
 
 class TestHoleHorseWinStrategy:
@@ -279,3 +305,131 @@ class TestHoleHorsePlaceStrategy:
         
         # 複勝馬券が生成される
         assert all(t.ticket_type == TicketType.PLACE for t in tickets)
+
+
+class TestPortfolioStrategy:
+    """ポートフォリオ戦略のテスト"""
+    
+    def test_merges_duplicate_tickets(self, sample_race):
+        """同じ馬券は最初の位置にまとめて重みを合算"""
+        strategy = PortfolioStrategy({"strategies": [
+            {"name": "box_quinella", "params": {"box_size": 3}, "weight": 0.5},
+            {"name": "flow_quinella", "params": {"num_axis": 1, "num_partners": 3}},
+            {"name": "favorite_win", "params": {"top_n": 1}, "weight": 2.0},
+        ]})
+        
+        tickets = strategy.generate_tickets(sample_race)
+        
+        assert [(t.ticket_type, t.horse_numbers, t.weight) for t in tickets] == [
+            (TicketType.QUINELLA, (1, 2), 1.5),
+            (TicketType.QUINELLA, (1, 3), 1.5),
+            (TicketType.QUINELLA, (2, 3), 0.5),
+            (TicketType.QUINELLA, (1, 4), 1.0),
+            (TicketType.WIN, (1,), 2.0),
+        ]
+    
+    def test_bet_amounts_across_union(self, sample_race):
+        """賭け金は重みで按分し、1レースの上限は全戦略の合計に適用"""
+        strategy = PortfolioStrategy({"strategies": [
+            {"name": "favorite_win", "params": {"top_n": 2}},
+            {"name": "favorite_win", "params": {"top_n": 1}, "weight": 0.5},
+        ]})
+        tickets = strategy.generate_tickets(sample_race)
+        fund_manager = FixedFundManager(
+            params={"bet_amount": 200}, constraints=FundConstraints(max_bet_per_race=400)
+        )
+        fund_manager.set_fund(100000)
+        
+        assert [fund_manager.calculate_bet_amount(t) for t in tickets] == [300, 200]
+        assert fund_manager.calculate_bet_amounts(tickets) == [300, 100]
+    
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="at least one"):
+            PortfolioStrategy({"strategies": []})
+        with pytest.raises(ValueError, match="Unknown strategy"):
+            PortfolioStrategy({"strategies": [{"name": "unknown"}]})
+        with pytest.raises(ValueError, match="dict with a name"):
+            PortfolioStrategy({"strategies": ["favorite_win"]})
+
+
+@pytest.fixture
+def random_races():
+    """頭数・予測順位の重複・オッズの同値を含む200レース"""
+    rng = random.Random(0)
+    races = []
+    for _ in range(200):
+        num_horses = rng.choice([0, 1, 2, 3, 5, 8, 12, 18])
+        ranks = list(range(1, num_horses + 1))
+        rng.shuffle(ranks)
+        if num_horses > 2 and rng.random() < 0.2:
+            ranks[0] = ranks[1]  # 予測順位の重複
+        horses = [
+            Horse(number=n + 1, name=f"馬{n + 1}", odds=rng.choice([1.0, 2.0, 3.3, 5.0, 12.0, 50.0]),
+                  popularity=rng.randint(1, num_horses), actual_rank=n + 1,
+                  predicted_rank=ranks[n], predicted_score=rng.choice([0.1, 0.2, 0.5]),
+                  hole_probability=rng.choice([0.0, 0.1, 0.3, 0.5]))
+            for n in range(num_horses)
+        ]
+        rng.shuffle(horses)
+        races.append(Race(
+            track="東京", year=2025, kaisai_date=501, race_number=1,
+            surface=Surface.TURF, distance=1600, horses=horses
+        ))
+    return races
+
+
+class TestGenerateBatch:
+    """列指向の馬券生成のテスト"""
+    
+    @pytest.mark.parametrize("name, params", [
+        ("favorite_win", {}),
+        ("favorite_win", {"top_n": 3, "min_odds": 2.0, "max_odds": 10.0}),
+        ("popularity_win", {"top_n": 4, "min_odds": 3.0}),
+        ("value_win", {"min_expected_value": 0.5, "max_tickets": 5}),
+        ("favorite_place", {"top_n": 5}),
+        ("box_quinella", {"box_size": 7}),
+        ("box_wide", {}),
+        ("box_trio", {"box_size": 8}),
+        ("flow_quinella", {"num_axis": 2, "num_partners": 4}),
+        ("flow_trio", {"num_partners": 10}),
+        ("wheel_quinella", {"num_axis": 2, "exclude_low_odds": 3}),
+        ("formation_trio", {"first_n": 3, "second_n": 6, "third_n": 10}),
+        ("hole_win", {"min_hole_probability": 0.1, "max_tickets": 3, "min_odds": 2.0}),
+        ("hole_place", {"min_hole_probability": 0.0, "max_tickets": 10}),
+        ("portfolio", {"strategies": [
+            {"name": "box_quinella", "params": {"box_size": 4}, "weight": 0.5},
+            {"name": "flow_quinella", "params": {"num_partners": 5}, "weight": 2.0},
+            {"name": "favorite_win", "params": {"top_n": 2}},
+        ]}),
+    ])
+    def test_matches_generate_tickets(self, random_races, name, params):
+        """レースごとの馬券生成と同じ馬券を同じ順序で生成"""
+        strategy = StrategyFactory.create(name, params)
+        
+        batch = strategy.generate_batch(RaceTable(random_races)).split(len(random_races))
+        
+        assert strategy.has_batch
+        assert batch == [strategy.generate_tickets(race) for race in random_races]
+    
+    def test_subclass_overriding_generate_tickets(self):
+        """generate_tickets だけを上書きしたサブクラスは列指向の生成を使わない"""
+        class CustomWinStrategy(FavoriteWinStrategy):
+            def generate_tickets(self, race: Race) -> list[Ticket]:
+                return []
+        
+        assert not CustomWinStrategy().has_batch
+    
+    def test_default_generate_batch(self, random_races):
+        """列指向の生成を持たない戦略も generate_tickets から同じ馬券を生成"""
+        class CustomPlaceStrategy(FavoriteWinStrategy):
+            def generate_tickets(self, race: Race) -> list[Ticket]:
+                return [
+                    replace(ticket, ticket_type=TicketType.PLACE, weight=0.5)
+                    for ticket in super().generate_tickets(race)
+                ]
+        
+        strategy = CustomPlaceStrategy({"top_n": 2})
+        batch = strategy.generate_batch(RaceTable(random_races)).split(len(random_races))
+        
+        assert not strategy.has_batch
+        assert batch == [strategy.generate_tickets(race) for race in random_races]
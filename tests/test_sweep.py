@@ -0,0 +1,342 @@
+"""パラメータスイープのテスト"""
+
+import itertools
+import random
+
+import pytest
+
+from betting_simulation.config import ConfigLoader, SimulationConfig, expand_range, expand_sweep
+from betting_simulation.fund_manager import FixedFundManager, FundConstraints, PercentageFundManager
+from betting_simulation.models import Horse, Race, RacePayouts, Surface
+from betting_simulation.planner import ExecutionPlanner
+from betting_simulation.simulation_engine import SimulationEngine
+from betting_simulation.strategy import StrategyFactory
+from betting_simulation.sweep import nested_sweep, run_sweep, sort_rows, threshold_sweep
+from tests.conftest import StaticLoader
+
+
+@pytest.fixture
+def random_races():
+    """払戻付きのランダムな60レース（一部は予測順位が重複）"""
+    rng = random.Random(7)
+    races = []
+    for i in range(60):
+        num_horses = rng.randint(5, 9)
+        finish = rng.sample(range(1, num_horses + 1), num_horses)
+        predicted = list(range(1, num_horses + 1))
+        rng.shuffle(predicted)
+        if i % 7 == 0:
+            predicted[predicted.index(rng.randint(2, 4))] = rng.randint(1, 3)  # 重複
+        horses = [
+            Horse(number=n, name=f"馬{n}", odds=round(rng.uniform(1.5, 30.0), 1),
+                  popularity=n, actual_rank=finish[n - 1],
+                  predicted_rank=predicted[n - 1], predicted_score=rng.random(),
+                  hole_probability=round(rng.random(), 2))
+            for n in range(1, num_horses + 1)
+        ]
+        by_rank = sorted(horses, key=lambda h: h.actual_rank)
+        top3 = [h.number for h in by_rank[:3]]
+        races.append(Race(
+            track="東京", year=2025, kaisai_date=101 + i, race_number=1,
+            surface=Surface.TURF, distance=1600, horses=horses,
+            payouts=RacePayouts(
+                win_horse=top3[0], win_payout=by_rank[0].odds * 100,
+                place_horses=top3, place_payouts=[150.0, 210.0, 330.0],
+                quinella_horses=(top3[0], top3[1]), quinella_payout=1250.0,
+                wide_pairs=[(top3[0], top3[1]), (top3[0], top3[2]), (top3[1], top3[2])],
+                wide_payouts=[420.0, 610.0, 880.0],
+                trio_horses=tuple(top3), trio_payout=4870.0,
+            )
+        ))
+    return races
+
+
+class TestExpandSweep:
+    """スイープ指定の展開"""
+    
+    def test_expand_range(self):
+        assert expand_range({"start": 1, "stop": 5, "step": 2}) == [1, 3, 5]
+        assert expand_range({"start": 0.01, "stop": 0.03, "step": 0.01}) == [0.01, 0.02, 0.03]
+        with pytest.raises(ValueError, match="step"):
+            expand_range({"start": 1, "stop": 3, "step": 0})
+    
+    def test_expand_flat_format(self):
+        """フラット形式の戦略・資金管理パラメータのリストと範囲"""
+        data = {
+            "strategy_name": "favorite_win",
+            "strategy_params": {"top_n": [1, 2]},
+            "fund_manager_name": "percentage",
+            "fund_manager_params": {"bet_percentage": {"start": 0.01, "stop": 0.03, "step": 0.01}},
+        }
+        expanded = expand_sweep(data)
+        
+        assert len(expanded) == 6
+        assert expanded[0][0] == {"strategy.top_n": 1, "fund_manager.bet_percentage": 0.01}
+        assert expanded[-1][1]["strategy_params"] == {"top_n": 2}
+        assert expanded[-1][1]["fund_manager_params"] == {"bet_percentage": 0.03}
+        # 元の辞書は変更しない
+        assert data["strategy_params"] == {"top_n": [1, 2]}
+    
+    def test_expand_nested_filter_and_constraints(self):
+        """ネスト形式の資金制約・フィルター（リスト値の項目はリストのリスト）"""
+        data = {
+            "strategy": {"name": "favorite_win", "params": {"top_n": 1}},
+            "fund_manager": {
+                "name": "fixed",
+                "params": {"bet_amount": 100},
+                "constraints": {"max_bet_ratio": [0.1, 0.2]},
+            },
+            "filter": {"tracks": [["東京"], ["中山"]], "surfaces": ["芝"]},
+        }
+        sweep = SimulationConfig.from_sweep_dict(data)
+        
+        assert len(sweep) == 4
+        assert set(sweep[0][0]) == {"fund_manager.constraints.max_bet_ratio", "filter.tracks"}
+        assert sweep[1][1].filter_condition.tracks == ["中山"]
+        assert sweep[2][1].fund_constraints.max_bet_ratio == 0.2
+        # 通常のリスト値はスイープしない
+        assert all(len(config.filter_condition.surfaces) == 1 for _, config in sweep)
+    
+    def test_no_sweep(self):
+        """スイープ指定がなければ1件"""
+        sweep = SimulationConfig.from_sweep_dict({"strategy_params": {"top_n": 1}})
+        assert len(sweep) == 1
+        assert sweep[0][0] == {}
+    
+    def test_load_sweep(self, tmp_path):
+        config_path = tmp_path / "sweep.yaml"
+        config_path.write_text(
+            "strategy_name: box_quinella\nstrategy_params:\n  box_size: {start: 2, stop: 4}\n",
+            encoding="utf-8"
+        )
+        
+        sweep = ConfigLoader.load_sweep(config_path)
+        assert [swept["strategy.box_size"] for swept, _ in sweep] == [2, 3, 4]
+
+
+class TestRunSweep:
+    """スイープの実行"""
+    
+    def test_matches_individual_runs(self, sample_races):
+        """スイープ結果は設定ごとの個別実行と一致し、指標で並べ替えられる"""
+        sweep = SimulationConfig.from_sweep_dict({
+            "data_path": "races.tsv",
+            "strategy_name": "favorite_win",
+            "strategy_params": {"top_n": [1, 2]},
+            "fund_manager_name": "fixed",
+            "fund_manager_params": {"bet_amount": [100, 300]},
+            "filter": {"min_distance": [0, 1700]},
+        })
+        planner = ExecutionPlanner(loader=StaticLoader(sample_races))
+        
+        rows = run_sweep(sweep, planner=planner)
+        expected = planner.execute([config for _, config in sweep])
+        
+        assert len(rows) == 8
+        assert [row["final_fund"] for row in rows] == [r.final_fund for r in expected]
+        assert rows[0]["strategy.top_n"] == 1
+        
+        ranked = sort_rows(rows, "roi")
+        assert [row["roi"] for row in ranked] == sorted((row["roi"] for row in rows), reverse=True)
+        assert sort_rows(rows, "max_drawdown")[0]["max_drawdown"] == min(
+            row["max_drawdown"] for row in rows
+        )
+    
+    def test_joint_kelly_grid(self, sample_races):
+        """同時ケリー基準の資金設定の一括再生は個別実行と一致（的中確率の合計が1以上）"""
+        for race in sample_races:
+            race.horses = [
+                Horse(number=n, name=f"馬{n}", odds=odds, popularity=n, actual_rank=n,
+                      predicted_rank=n, predicted_score=score)
+                for n, (odds, score) in enumerate([(58.5, 0.75), (13.9, 0.53), (10.4, 0.75)], 1)
+            ]
+        sweep = SimulationConfig.from_sweep_dict({
+            "data_path": "races.tsv",
+            "strategy_name": "favorite_win",
+            "strategy_params": {"top_n": 3},
+            "fund_manager_name": "joint_kelly_win",
+            "fund_manager_params": {"kelly_fraction": [0.25, 0.5]},
+        })
+        planner = ExecutionPlanner(loader=StaticLoader(sample_races))
+        
+        rows = run_sweep(sweep, planner=planner)
+        expected = planner.execute([config for _, config in sweep])
+        
+        assert [row["final_fund"] for row in rows] == [r.final_fund for r in expected]
+        assert all(row["total_bets"] > 0 for row in rows)
+    
+    def test_portfolio_config(self, sample_races):
+        """ポートフォリオの子戦略のリストはスイープの軸にならない"""
+        strategies = [
+            {"name": "favorite_win", "params": {"top_n": 1}, "weight": 1.0},
+            {"name": "box_quinella", "params": {"box_size": 2}, "weight": 0.5},
+        ]
+        sweep = SimulationConfig.from_sweep_dict({
+            "data_path": "races.tsv",
+            "strategy_name": "portfolio",
+            "strategy_params": {"strategies": strategies},
+            "fund_manager_name": "fixed",
+            "fund_manager_params": {"bet_amount": [100, 200]},
+        })
+        
+        planner = ExecutionPlanner(loader=StaticLoader(sample_races))
+        
+        rows = run_sweep(sweep, planner=planner)
+        expected = planner.execute([config for _, config in sweep])
+        
+        assert [swept for swept, _ in sweep] == [
+            {"fund_manager.bet_amount": 100}, {"fund_manager.bet_amount": 200}
+        ]
+        assert all(config.strategy_params["strategies"] == strategies for _, config in sweep)
+        assert [row["final_fund"] for row in rows] == [r.final_fund for r in expected]
+        assert rows[0]["total_bets"] > 0
+    
+    def test_unknown_metric(self):
+        with pytest.raises(ValueError, match="Unknown metric"):
+            sort_rows([], "unknown")
+
+
+class TestNestedSweep:
+    """入れ子パラメータのスイープ"""
+    
+    @pytest.mark.parametrize("strategy_name, params, values", [
+        ("favorite_win", {"min_odds": 3.0}, [1, 2, 3, 4, 5]),
+        ("popularity_win", {}, [1, 3, 2]),
+        ("favorite_place", {}, [1, 2, 3]),
+        ("box_quinella", {}, [2, 3, 4, 5]),
+        ("box_wide", {}, [3, 4]),
+        ("box_trio", {}, [3, 4, 5, 6]),
+    ])
+    def test_matches_replay(self, random_races, strategy_name, params, values):
+        """各値の結果は通常の再生と一致"""
+        fund_manager = FixedFundManager(params={"bet_amount": 100})
+        strategy = StrategyFactory.create(strategy_name, params)
+        
+        results = nested_sweep(strategy, values, fund_manager, random_races, 100000)
+        
+        for value, result in zip(values, results):
+            engine = SimulationEngine(
+                StrategyFactory.create(strategy_name, {**params, strategy.nested_param: value}),
+                fund_manager
+            )
+            expected = engine.run_simple(random_races, 100000, record="none")
+            assert result is not None
+            assert result.final_fund == expected.final_fund
+            m, e = result.metrics, expected.metrics
+            assert (m.total_races, m.total_bets, m.total_hits, m.total_invested) == (
+                e.total_races, e.total_bets, e.total_hits, e.total_invested
+            )
+            assert (m.max_drawdown_period, m.max_consecutive_losses, m.max_consecutive_wins) == (
+                e.max_drawdown_period, e.max_consecutive_losses, e.max_consecutive_wins
+            )
+            assert m.roi == pytest.approx(e.roi)
+            assert m.max_drawdown == pytest.approx(e.max_drawdown)
+            assert m.sharpe_ratio == pytest.approx(e.sharpe_ratio)
+    
+    def test_constrained_values_fall_back(self, random_races):
+        """資金制約に掛かる値はNone"""
+        fund_manager = FixedFundManager(
+            params={"bet_amount": 1000},
+            constraints=FundConstraints(max_bet_per_race=5000)
+        )
+        strategy = StrategyFactory.create("box_quinella")
+        
+        results = nested_sweep(strategy, [2, 3, 4], fund_manager, random_races, 100000)
+        
+        # box_size=4 は1レース6点で上限5000円を超える
+        assert results[0] is not None
+        assert results[2] is None
+    
+    def test_requires_fixed_stake(self, random_races):
+        with pytest.raises(ValueError, match="fixed-stake"):
+            nested_sweep(
+                StrategyFactory.create("favorite_win"), [1, 2],
+                PercentageFundManager(), random_races, 100000
+            )
+    
+    def test_run_sweep_uses_nested(self, random_races):
+        """run_sweep の結果は入れ子の一括計算でも個別実行と一致（制約に掛かる値も含む）"""
+        sweep = SimulationConfig.from_sweep_dict({
+            "data_path": "races.tsv",
+            "initial_fund": 3000,
+            "strategy_name": "box_trio",
+            "strategy_params": {"box_size": {"start": 3, "stop": 6}},
+            "fund_manager_name": "fixed",
+            "fund_manager_params": {"bet_amount": [100, 200]},
+        })
+        planner = ExecutionPlanner(loader=StaticLoader(random_races))
+        
+        rows = run_sweep(sweep, planner=planner)
+        expected = planner.execute([config for _, config in sweep], record="none")
+        
+        assert [row["final_fund"] for row in rows] == [r.final_fund for r in expected]
+        assert [row["sharpe_ratio"] for row in rows] == pytest.approx(
+            [r.metrics.sharpe_ratio for r in expected]
+        )
+    
+    def test_run_sweep_uses_bankroll_grid(self, random_races):
+        """資金管理のパラメータ・制約だけが異なる設定の一括再生も個別実行と一致"""
+        sweep = SimulationConfig.from_sweep_dict({
+            "data_path": "races.tsv",
+            "initial_fund": 3000,
+            "strategy": {"name": "box_wide", "params": {}},
+            "fund_manager": {
+                "name": "percentage",
+                "params": {"bet_percentage": [0.01, 0.05, 0.2]},
+                "constraints": {"max_bet_ratio": [0.1, 0.5]},
+            },
+        })
+        planner = ExecutionPlanner(loader=StaticLoader(random_races))
+        
+        rows = run_sweep(sweep, planner=planner)
+        expected = planner.execute([config for _, config in sweep], record="none")
+        
+        assert len(rows) == 6
+        assert [row["final_fund"] for row in rows] == [r.final_fund for r in expected]
+        assert [row["total_bets"] for row in rows] == [r.metrics.total_bets for r in expected]
+        assert [row["max_drawdown"] for row in rows] == pytest.approx(
+            [r.metrics.max_drawdown for r in expected]
+        )
+
+
+class TestThresholdSweep:
+    """閾値パラメータのスイープ"""
+    
+    @pytest.mark.parametrize("strategy_name, params, grid", [
+        ("favorite_win", {"top_n": 3},
+         {"min_odds": [1.0, 2.5, 5.0, 10.0], "max_odds": [5.0, 10.0, 20.0, 999.0]}),
+        ("value_win", {}, {"min_expected_value": [0.5, 1.0, 2.0, 4.0], "max_tickets": [1, 2, 3]}),
+        ("hole_win", {"max_tickets": 2},
+         {"min_hole_probability": [0.0, 0.3, 0.6], "min_odds": [1.0, 5.0, 8.0, 12.0, 20.0]}),
+        ("hole_win", {"min_odds": 6.0}, {"min_hole_probability": [0.2, 0.5]}),
+    ])
+    def test_matches_replay(self, random_races, strategy_name, params, grid):
+        """格子の各点の集計は、その閾値での通常の実行と一致"""
+        fund_manager = FixedFundManager(params={"bet_amount": 100})
+        strategy = StrategyFactory.create(strategy_name, params)
+        
+        result = threshold_sweep(strategy, grid, fund_manager, random_races, 10 ** 9)
+        
+        names = list(grid)
+        rows = result.rows()
+        assert len(rows) == len(list(itertools.product(*grid.values())))
+        for row in rows:
+            values = {name: row[f"strategy.{name}"] for name in names}
+            engine = SimulationEngine(
+                StrategyFactory.create(strategy_name, {**params, **values}), fund_manager
+            )
+            expected = engine.run_simple(random_races, 10 ** 9, record="none").metrics
+            assert (row["total_bets"], row["total_hits"]) == (expected.total_bets, expected.total_hits)
+            assert row["total_invested"] == expected.total_invested
+            assert row["total_payout"] == expected.total_payout
+    
+    def test_unknown_parameter(self, random_races):
+        with pytest.raises(ValueError, match="Unknown threshold parameter"):
+            threshold_sweep(
+                StrategyFactory.create("favorite_win"), {"top_n": [1, 2]},
+                FixedFundManager(), random_races, 100000
+            )
+    
+    def test_strategy_without_threshold_parameters(self, random_races):
+        with pytest.raises(ValueError, match="no threshold parameters"):
+            StrategyFactory.create("box_quinella").threshold_candidates(random_races[0], ())
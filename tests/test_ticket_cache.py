@@ -0,0 +1,152 @@
+"""馬券キャッシュのテスト"""
+
+import pickle
+
+import pytest
+
+from betting_simulation.evaluator import BetEvaluator
+from betting_simulation.fund_manager import FixedFundManager
+from betting_simulation.planner import _init_planner_worker, _planner_state
+from betting_simulation.models import Horse, Race, RacePayouts, Surface
+from betting_simulation.precompute import precompute_outcomes
+from betting_simulation.race_table import RaceTable, TicketArrays
+from betting_simulation.simulation_engine import SimulationEngine
+from betting_simulation.strategy import FavoriteWinStrategy
+from betting_simulation.ticket_cache import (
+    TicketCache,
+    get_default_cache,
+    race_key,
+    set_default_cache,
+    strategy_fingerprint,
+)
+
+
+class CountingStrategy(FavoriteWinStrategy):
+    """馬券を生成したレース数を数える戦略"""
+    
+    def __init__(self, params=None):
+        super().__init__(params)
+        self.generated = 0
+    
+    def generate_batch(self, table: RaceTable) -> TicketArrays:
+        self.generated += len(table)
+        return super().generate_batch(table)
+
+
+@pytest.fixture
+def sample_races():
+    """10レース"""
+    races = []
+    for i in range(10):
+        horses = [
+            Horse(number=n, name=f"馬{n}", odds=2.0 * n + i, popularity=n,
+                  actual_rank=n, predicted_rank=n, predicted_score=0.5)
+            for n in range(1, 5)
+        ]
+        races.append(Race(
+            track="東京", year=2025, kaisai_date=501 + i, race_number=1,
+            surface=Surface.TURF, distance=1600, horses=horses,
+            payouts=RacePayouts(win_horse=1 + i % 4)
+        ))
+    return races
+
+
+def _tickets(outcomes):
+    return [outcome.tickets for outcome in outcomes]
+
+
+class TestTicketCache:
+    """馬券キャッシュのテスト"""
+    
+    def test_reuses_tickets(self, sample_races):
+        """2回目は馬券を生成せず、キャッシュにないレースだけ生成"""
+        cache = TicketCache()
+        strategy = CountingStrategy({"top_n": 2})
+        evaluator = BetEvaluator()
+        
+        first = precompute_outcomes(strategy, evaluator, sample_races[:6], cache=cache)
+        second = precompute_outcomes(strategy, evaluator, sample_races, cache=cache)
+        
+        assert strategy.generated == 10
+        assert (cache.hits, cache.misses) == (6, 10)
+        assert _tickets(second[:6]) == _tickets(first)
+        assert _tickets(second) == _tickets(precompute_outcomes(strategy, evaluator, sample_races))
+    
+    def test_keys(self, sample_races):
+        """パラメータ・出走馬の値が変われば別のキー"""
+        race = sample_races[0]
+        key = race_key(race)
+        
+        assert strategy_fingerprint(FavoriteWinStrategy({"top_n": 1})) == \
+            strategy_fingerprint(FavoriteWinStrategy({"top_n": 1}))
+        assert strategy_fingerprint(FavoriteWinStrategy({"top_n": 1})) != \
+            strategy_fingerprint(FavoriteWinStrategy({"top_n": 2}))
+        race.payouts = RacePayouts(win_horse=2)
+        assert race_key(race) == key
+        race.horses[0].odds = 9.9
+        assert race_key(race) != key
+    
+    def test_lru_eviction(self, sample_races):
+        """上限を超えたら最も古いレースを破棄"""
+        cache = TicketCache(max_races=3)
+        fingerprint = strategy_fingerprint(FavoriteWinStrategy())
+        keys = [race_key(race) for race in sample_races[:4]]
+        
+        cache.put_many(fingerprint, keys[:3], [[], [], []])
+        cache.get_many(fingerprint, keys[:1])
+        cache.put_many(fingerprint, keys[3:], [[]])
+        
+        assert len(cache) == 3
+        assert cache.get_many(fingerprint, keys) == [[], None, [], []]
+    
+    def test_disk_tier(self, sample_races, tmp_path):
+        """ディスクキャッシュは別のインスタンス（別プロセスの再実行）でも使える"""
+        evaluator = BetEvaluator()
+        first = precompute_outcomes(
+            CountingStrategy({"top_n": 3}), evaluator, sample_races,
+            cache=TicketCache(directory=tmp_path)
+        )
+        
+        strategy = CountingStrategy({"top_n": 3})
+        second = precompute_outcomes(
+            strategy, evaluator, sample_races, cache=TicketCache(directory=tmp_path)
+        )
+        
+        assert strategy.generated == 0
+        assert _tickets(second) == _tickets(first)
+    
+    def test_default_cache(self, sample_races):
+        """既定のキャッシュを設定すると資金管理だけを変えた再実行で馬券を生成しない"""
+        strategy = CountingStrategy()
+        set_default_cache(TicketCache())
+        try:
+            first = SimulationEngine(strategy, FixedFundManager(params={"bet_amount": 100})).run_simple(
+                sample_races, 10000
+            )
+            second = SimulationEngine(strategy, FixedFundManager(params={"bet_amount": 200})).run_simple(
+                sample_races, 10000
+            )
+        finally:
+            set_default_cache(None)
+        
+        assert strategy.generated == len(sample_races)
+        assert second.metrics.total_invested == 2 * first.metrics.total_invested
+    
+    def test_worker_inherits_default_cache(self, sample_races, tmp_path):
+        """ワーカーの初期化で親プロセスの既定のキャッシュ（設定のみ）を引き継ぐ"""
+        cache = TicketCache(max_races=5, directory=tmp_path)
+        cache.put_many("fingerprint", [race_key(sample_races[0])], [[]])
+        try:
+            _init_planner_worker({}, [], BetEvaluator(), "none", pickle.loads(pickle.dumps(cache)))
+            worker_cache = get_default_cache()
+        finally:
+            _planner_state.clear()
+            set_default_cache(None)
+        
+        assert (worker_cache.max_races, worker_cache.directory) == (5, tmp_path)
+        assert len(worker_cache) == 0
+        assert worker_cache.get_many("fingerprint", [race_key(sample_races[0])]) == [[]]
+    
+    def test_invalid_max_races(self):
+        with pytest.raises(ValueError, match="max_races"):
+            TicketCache(max_races=0)